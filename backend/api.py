@@ -1,272 +1,265 @@
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-from datetime import datetime, timedelta
-import random
+from collections import OrderedDict
+from datetime import datetime
+import gzip
+import hashlib
+import itertools
 import json
 import os
-import re
-
-from canvasAPI_utils import get_canvas_assignments
-from category_task_scheduler import sort_tasks
+import random
+import threading
+import time
+import uuid
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+from canvas_sync import canvas_sync
+from metrics import CONTENT_TYPE, REQUEST_SECONDS, Callback, render, stage
+from deadline_risk import RISK_MAX_TASKS, RISK_MAX_TRIALS, RISK_TRIALS, deadline_risk
+from flashcards import collect_cards, flashcard_cache, json_body, ndjson_body, note_hash, stream_ndjson
+from task_estimation import estimate_cache, keyword_rules_status, watch_keyword_rules
+from task_index import decode_cursor, encode_cursor
+from sampling_profiler import PROFILE_HEADER, SamplingProfiler, requested as profile_requested
+from task_json import encode_task, encode_tasks, parse_fields
+import task_json
+from task_store import TaskNotFound, TaskStore
+from user_state import MANUAL_RANK, USER_HEADER, TooManyUsers, UserRegistry
+
+CORS_ORIGINS = ["http://localhost:3000"]
+CORS_EXPOSE_HEADERS = ["ETag", "Link", "X-Next-Cursor", "X-Flashcards-Cache",
+                       "X-Profile-File", "X-Profile-Samples"]
+CORS_ALLOW_HEADERS = ["Content-Type", "If-None-Match", "Prefer", USER_HEADER, "X-Note-Hash",
+                      PROFILE_HEADER]
 
 app = Flask(__name__)
-CORS(app, origins=["http://localhost:3000"])
+CORS(app, origins=CORS_ORIGINS, expose_headers=CORS_EXPOSE_HEADERS, allow_headers=CORS_ALLOW_HEADERS)
 
-# Manually added tasks (via Tasks page)
-tasks = []
+# Most tasks one batch request may carry
+BATCH_MAX_TASKS = int(os.getenv("BATCH_MAX_TASKS", "5000"))
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
 
-# Cached Canvas tasks
-canvas_tasks = []
+# Responses at least this big (bytes) are compressed when the client accepts it
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
 
+# Compressed bodies of ETagged responses, by (path + query, etag, encoding):
+# a big /all is compressed once per version, not once per request
+COMPRESS_CACHE_ENTRIES = int(os.getenv("COMPRESS_CACHE_ENTRIES", "32"))
+_compressed = OrderedDict()
+_compressed_lock = threading.Lock()
+_compressed_stats = {"hits": 0, "misses": 0}
 
-# ---------- KEYWORD KNOWLEDGE BASE ---------- #
+# Part of every ETag, so tags from before a restart never match
+BOOT_ID = uuid.uuid4().hex[:8]
 
-DEFAULT_KEYWORD_RULES = {
-    "email":        {"minutes": 25, "type": "communication", "weight": 1.0},
-    "emails":       {"minutes": 25, "type": "communication", "weight": 1.0},
-    "call":         {"minutes": 10, "type": "communication", "weight": 1.0},
-    "phone call":   {"minutes": 15, "type": "communication", "weight": 1.2},
-    "meeting":      {"minutes": 30, "type": "communication", "weight": 1.0},
+# Manually added tasks (via Tasks page), persisted in SQLite
+store = TaskStore()
 
-    "homework":     {"minutes": 60, "type": "deep_work", "weight": 1.5},
-    "hw":           {"minutes": 60, "type": "deep_work", "weight": 1.5},
-    "problem set":  {"minutes": 75, "type": "deep_work", "weight": 1.8},
-    "assignment":   {"minutes": 60, "type": "deep_work", "weight": 1.3},
-    "project":      {"minutes": 90, "type": "deep_work", "weight": 2.0},
-    "paper":        {"minutes": 90, "type": "deep_work", "weight": 2.0},
-    "essay":        {"minutes": 90, "type": "deep_work", "weight": 2.0},
-    "report":       {"minutes": 75, "type": "deep_work", "weight": 1.6},
-    "study":        {"minutes": 45, "type": "study",     "weight": 1.2},
-    "reading":      {"minutes": 30, "type": "study",     "weight": 1.0},
-    "review":       {"minutes": 35, "type": "study",     "weight": 1.0},
+# Canvas tasks live in canvas_sync's snapshot, refreshed by a background
+# worker so requests never wait on Canvas.
 
-    "quiz":         {"minutes": 30, "type": "assessment", "weight": 1.2},
-    "exam":         {"minutes": 90, "type": "assessment", "weight": 2.0},
-    "midterm":      {"minutes": 90, "type": "assessment", "weight": 2.0},
-    "final":        {"minutes": 120, "type": "assessment","weight": 2.2},
+# Per-user state: each user's manual + Canvas tasks (past ones too) kept in
+# sort_tasks() order in their own index, with their own /summary memo and
+# writer lock. Requests say who they're for in the X-User header, which is
+# trusted as-is (see USER_HEADER): only a frontend or proxy that sets it
+# for the signed-in user should be able to reach this API.
+users = UserRegistry(store, canvas_sync, BOOT_ID)
 
-    "application":  {"minutes": 45, "type": "career",   "weight": 1.5},
-    "apply":        {"minutes": 45, "type": "career",   "weight": 1.5},
-    "resume":       {"minutes": 30, "type": "career",   "weight": 1.2},
-    "cover letter": {"minutes": 60, "type": "career",   "weight": 1.6},
-    "network":      {"minutes": 30, "type": "career",   "weight": 1.2},
-    "linkedin":     {"minutes": 30, "type": "career",   "weight": 1.2},
 
-    "clean":        {"minutes": 20, "type": "life",     "weight": 1.0},
-    "laundry":      {"minutes": 30, "type": "life",     "weight": 1.2},
-    "groceries":    {"minutes": 30, "type": "life",     "weight": 1.0},
-    "workout":      {"minutes": 40, "type": "health",   "weight": 1.2},
-    "exercise":     {"minutes": 40, "type": "health",   "weight": 1.2},
-    "walk":         {"minutes": 20, "type": "health",   "weight": 1.0},
-}
+@app.before_request
+def start_canvas_sync():
+    canvas_sync.start()
 
-KEYWORD_RULES = {}
-PHRASE_RULES = []
-WORD_RULES = {}
 
+@app.before_request
+def start_rule_watcher():
+    # picks up edits to task_keywords.json without a restart
+    watch_keyword_rules()
 
-def load_keyword_rules():
-    """
-    Load rules from task_keywords.json if it exists.
-    Lets you maintain a giant JSON with 1000+ patterns later.
-    """
-    global KEYWORD_RULES, PHRASE_RULES, WORD_RULES
 
-    KEYWORD_RULES = DEFAULT_KEYWORD_RULES.copy()
+@app.before_request
+def start_request_timer():
+    g.started = time.perf_counter()
+    if profile_requested(request.headers.get(PROFILE_HEADER)):
+        g.profiler = SamplingProfiler().start()
+
 
+@app.before_request
+def load_user():
     try:
-        base_dir = os.path.dirname(__file__)
-        path = os.path.join(base_dir, "task_keywords.json")
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                user_rules = json.load(f)
-            KEYWORD_RULES.update(user_rules)
-            print(f"Loaded {len(user_rules)} custom keyword rules from task_keywords.json")
-        else:
-            print("task_keywords.json not found, using built-in keyword rules.")
-    except Exception as e:
-        print("Error loading task_keywords.json, using built-in keyword rules:", e)
-
-    # split into phrases vs single words for faster matching
-    PHRASE_RULES = []
-    WORD_RULES = {}
-    for key, info in KEYWORD_RULES.items():
-        key_norm = key.lower().strip()
-        if " " in key_norm:
-            PHRASE_RULES.append((key_norm, info))
-        else:
-            WORD_RULES[key_norm] = info
+        g.user = users.get(request.headers.get(USER_HEADER))
+    except TooManyUsers as e:
+        return jsonify({"error": str(e)}), 503
+
 
+@app.after_request
+def record_request(response):
+    """
+    Request latency per route (registered before compress_response, so
+    it runs after it and compression is included). Profiled requests get
+    their collapsed stacks written out and named in X-Profile-File.
+    """
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.stop()
+        try:
+            response.headers["X-Profile-File"] = profiler.dump(f"{request.method} {route}")
+            response.headers["X-Profile-Samples"] = str(profiler.samples)
+        except OSError as e:
+            print("Error writing profile:", e)
+    started = g.pop("started", None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                                route=route, status=response.status_code)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """
+    gzip or brotli (whichever Accept-Encoding prefers, brotli on a tie)
+    for bodies of at least COMPRESS_MIN_BYTES. ETags become weak, since
+    the bytes now depend on the encoding; the routes compare them weakly.
+    ETagged bodies are compressed once and reused while the tag holds.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or request.method == "HEAD"):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    accept = request.accept_encodings
+    br_q = accept.quality("br") if brotli is not None else 0
+    gzip_q = accept.quality("gzip")
+    if br_q and br_q >= gzip_q:
+        encoding = "br"
+    elif gzip_q:
+        encoding = "gzip"
+    else:
+        return response
+
+    etag, _ = response.get_etag()
+    key = (request.full_path, etag, encoding) if etag else None
+    with _compressed_lock:
+        data = _compressed.get(key) if key else None
+        if data is not None:
+            _compressed.move_to_end(key)
+            _compressed_stats["hits"] += 1
+        elif key:
+            _compressed_stats["misses"] += 1
+    if data is None:
+        with stage("compression"):
+            if encoding == "br":
+                data = brotli.compress(body, quality=BROTLI_QUALITY)
+            else:
+                data = gzip.compress(body, GZIP_LEVEL)
+        if key:
+            with _compressed_lock:
+                _compressed[key] = data
+                while len(_compressed) > COMPRESS_CACHE_ENTRIES:
+                    _compressed.popitem(last=False)
+
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def current_user():
+    """UserState for this request (X-User header, default user if absent)."""
+    return g.user
+
+
+def index_manual(state):
+    """
+    on_write callback for the store: index the written manual tasks inside
+    the store's transaction, so a task that can't be indexed isn't saved.
+    """
+    return lambda tasks: state.index.upsert_many([(("manual", t.id), t) for t in tasks], rank=MANUAL_RANK)
 
-load_keyword_rules()
 
+def sorted_upcoming(state):
+    """
+    Upcoming manual + Canvas tasks in sort_tasks() order, read from the
+    user's current view (same result as sort_tasks() over the combined
+    list, without the re-sort). Writers publish their view before letting
+    go of the write lock, so a route that just wrote always sees its write.
+    """
+    return state.upcoming(datetime.now())
 
 
+def request_fields():
+    """`?fields=id,title,...` projection for task responses (None = every field)."""
+    return parse_fields(request.args.get("fields"))
 
-def parse_due(due_str):
-    """Parse many date formats into a naive datetime, or None."""
-    if not due_str:
-        return None
 
-    try:
-        ds = due_str.replace("Z", "")
-        if len(ds) == 10:
-            return datetime.strptime(ds, "%Y-%m-%d")
-        return datetime.fromisoformat(ds)
-    except Exception:
-        try:
-            return datetime.strptime(due_str[:10], "%Y-%m-%d")
-        except Exception:
-            return None
+def json_response(body):
+    return app.response_class(body + b"\n", mimetype="application/json")
 
 
-def combined_tasks(include_past=False):
+def tasks_response(task_list):
     """
-    Get all manual + Canvas tasks, optionally dropping past-due ones.
-    Also tag them with origin: "manual" or "canvas".
+    Task records -> the JSON list the frontend expects, projected to
+    `fields=`, stitched from each task's cached serialized form.
     """
-    global canvas_tasks
-
-    # Try to refresh Canvas tasks
-    try:
-        canvas_tasks = get_canvas_assignments()
-    except Exception as e:
-        print("Error fetching Canvas assignments in combined_tasks:", e)
-
-    combined = []
-
-    # Manual tasks
-    for t in tasks:
-        c = dict(t)
-        c.setdefault("origin", "manual")
-        combined.append(c)
-
-    # Canvas tasks
-    for t in canvas_tasks or []:
-        c = dict(t)
-        c.setdefault("origin", "canvas")
-        combined.append(c)
-
-    if include_past:
-        return combined
-
-    now = datetime.now()
-    upcoming = []
-    for t in combined:
-        due = parse_due(t.get("due_date"))
-        if not due or due >= now:
-            upcoming.append(t)
-    return upcoming
-
-
-def estimate_minutes(task):
-    """
-    Smart, efficient estimate of how long a task should take (in minutes),
-    using:
-      - Category priors
-      - Keyword knowledge base (phrases + words)
-      - Text complexity
-      - Urgency (due date)
-    """
-    title = (task.get("title") or task.get("name") or "").lower()
-    desc = (task.get("description") or "").lower()
-    text = f"{title} {desc}".strip()
-    cat = (task.get("category") or task.get("Category") or "General")
-
-    # -----  Base by category ----- #
-    if cat == "Assignments":
-        base = 60
-    elif cat == "Career":
-        base = 45
-    elif cat in ("Fun", "Health"):
-        base = 25
-    else:
-        base = 30
-
-    # ----- Keyword contributions ----- #
-    applied = []
-
-    #  phrases like "phone call", "problem set"
-    full_text = text
-    for phrase, info in PHRASE_RULES:
-        if phrase in full_text:
-            applied.append(info)
-
-    #  single words
-    tokens = re.findall(r"[a-zA-Z]+", full_text)
-    for tok in tokens:
-        info = WORD_RULES.get(tok.lower())
-        if info:
-            applied.append(info)
-
-    if applied:
-        
-        num = float(base)
-        den = 1.0
-        for info in applied:
-            m = info.get("minutes", base)
-            w = info.get("weight", 1.0)
-            num += m * w
-            den += w
-        keyword_estimate = num / den
-        base = max(base, keyword_estimate)
-
-    # ----- text complexity adjustment ----- #
-    word_count = len(tokens)
-    if word_count > 8:
-        base *= 1.1
-    if word_count > 20:
-        base *= 1.25
-
-    # ----- urgency adjustment ----- #
-    due = parse_due(task.get("due_date"))
-    if due:
-        days = (due.date() - datetime.now().date()).days
-        if days <= 1:
-            base *= 1.5      # due today/tomorrow
-        elif days <= 3:
-            base *= 1.2      # 2–3 days
-        elif days >= 10:
-            base *= 0.8      # far away, less urgent
-
-    
-    base = int(round(base))
-    return max(10, min(base, 180))   # between 10 min and 3 hours
-
-
-def pert_estimate_from_likely(task):
-    """
-    Soft PERT: use estimate_minutes(task) as 'most likely' (M),
-    derive optimistic (O) and pessimistic (P) from M,
-    then compute PERT expected time and std dev.
-
-    E = (O + 4M + P) / 6
-    σ = (P - O) / 6
-    """
-    M = float(estimate_minutes(task))
-    title = (task.get("title") or task.get("name") or "").lower()
-
-    # Wider uncertainty for big/complex work (projects, exams, papers, etc.)
-    if any(k in title for k in ["exam", "midterm", "final", "project", "paper", "essay"]):
-        low_factor = 0.5   # 50% of M
-        high_factor = 2.0  # 200% of M
-    else:
-        low_factor = 0.7   # 70% of M
-        high_factor = 1.5  # 150% of M
-
-    O = max(5.0, low_factor * M)
-    P = min(240.0, high_factor * M)  # cap worst-case at 4 hours
+    with stage("serialization"):
+        return json_response(encode_tasks(task_list, request_fields()))
 
-    E = (O + 4 * M + P) / 6.0
-    sigma = (P - O) / 6.0
 
-    return {
-        "optimistic": O,
-        "most_likely": M,
-        "pessimistic": P,
-        "expected": E,
-        "stddev": sigma,
-    }
+def read_batch(need_id=False):
+    """
+    Body of a batch request: a JSON array of task objects, or NDJSON (one
+    object per line). Returns (items, None), or (None, error response)
+    listing every item that's wrong, so nothing gets applied.
+    """
+    if request.mimetype in NDJSON_TYPES:
+        items = []
+        for n, line in enumerate(request.stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                return None, (jsonify({"error": f"line {n}: invalid JSON ({e})"}), 400)
+            if len(items) > BATCH_MAX_TASKS:
+                break
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            return None, (jsonify({"error": "expected a JSON array of tasks (or NDJSON)"}), 400)
+
+    if not items:
+        return None, (jsonify({"error": "batch is empty"}), 400)
+    if len(items) > BATCH_MAX_TASKS:
+        return None, (jsonify({"error": f"at most {BATCH_MAX_TASKS} tasks per batch"}), 413)
+
+    errors = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({"index": i, "error": "expected a JSON object"})
+        elif need_id and (not isinstance(item.get("id"), int) or isinstance(item.get("id"), bool)):
+            errors.append({"index": i, "error": "missing or non-integer id"})
+    if errors:
+        return None, (jsonify({"error": f"{len(errors)} invalid tasks", "errors": errors[:100]}), 400)
+    return items, None
+
+
+def wants_minimal():
+    """`?return=minimal` or `Prefer: return=minimal`."""
+    if request.args.get("return") == "minimal":
+        return True
+    prefer = request.headers.get("Prefer", "")
+    return any(p.strip() == "return=minimal" for p in prefer.replace(";", ",").split(","))
 
 
 # ----------------- Routes to manage tasks ----------------- #
@@ -285,16 +278,14 @@ def add_task():
     }
     """
 
+    state = current_user()
     new_task = request.json or {}
-    new_task["id"] = len(tasks) + 1
     new_task.setdefault("completed", False)
     new_task.setdefault("origin", "manual")  #  mark this as a manual task
-    tasks.append(new_task)
-
+    with state.writing():
+        store.add(new_task, user=state.user_id, on_write=index_manual(state))  # the store assigns the id
 
-    all_tasks = combined_tasks()
-    sorted_tasks = sort_tasks(all_tasks)
-    return jsonify(sorted_tasks), 200
+    return tasks_response(sorted_upcoming(state)), 200
 
 
 @app.route("/tasks/<int:task_id>", methods=["PATCH"])
@@ -302,36 +293,120 @@ def update_task(task_id):
     """
     Update fields on a manual task (e.g., completed: true).
     """
+    state = current_user()
     data = request.json or {}
-    updated = None
+    with state.writing():
+        updated = store.update(task_id, data, user=state.user_id, on_write=index_manual(state))
+
+        if not updated:
+            return jsonify({"error": "Task not found"}), 404
+    return json_response(encode_task(updated, request_fields())), 200
+
+
+@app.route("/tasks/<int:task_id>", methods=["DELETE"])
+def delete_task(task_id):
+    """
+    Delete a manual task. Ids are never reused.
+    """
+    state = current_user()
+    with state.writing():
+        if not store.delete(task_id, user=state.user_id):
+            return jsonify({"error": "Task not found"}), 404
+
+        state.index.remove(("manual", task_id))
+    return jsonify({"deleted": task_id}), 200
 
-    for t in tasks:
-        if t.get("id") == task_id:
-            t.update(data)
-            updated = t
-            break
 
-    if not updated:
-        return jsonify({"error": "Task not found"}), 404
+@app.route("/tasks/batch", methods=["POST"])
+def add_tasks_batch():
+    """
+    Add many manual tasks at once (e.g. a planner export): a JSON array of
+    task objects, or NDJSON with Content-Type application/x-ndjson.
+
+    Everything is validated first, then stored in one transaction and put
+    in the index as one change. Returns the upcoming list like POST /tasks,
+    or just {"created": [ids]} with return=minimal (query param or
+    `Prefer: return=minimal` header).
+    """
+    items, error = read_batch()
+    if error:
+        return error
+
+    state = current_user()
+    for item in items:
+        item.setdefault("completed", False)
+        item.setdefault("origin", "manual")
+    with state.writing():
+        tasks = store.add_many(items, user=state.user_id, on_write=index_manual(state))
 
-    return jsonify(updated), 200
+    if wants_minimal():
+        return jsonify({"created": [t.id for t in tasks]}), 200
+    return tasks_response(sorted_upcoming(state)), 200
+
+
+@app.route("/tasks/batch", methods=["PATCH"])
+def update_tasks_batch():
+    """
+    Update many manual tasks at once: a JSON array (or NDJSON) of objects
+    with an "id" plus the fields to change. All or nothing: if any id
+    isn't found, nothing changes and the 404 lists the missing ids.
+
+    Returns the upcoming list, or only the changed tasks with return=minimal.
+    """
+    items, error = read_batch(need_id=True)
+    if error:
+        return error
+
+    state = current_user()
+    with state.writing():
+        try:
+            tasks = store.update_many([(item["id"], item) for item in items], user=state.user_id,
+                                      on_write=index_manual(state))
+        except TaskNotFound as e:
+            return jsonify({"error": "Task not found", "missing": e.ids}), 404
+
+    if wants_minimal():
+        return tasks_response(tasks), 200
+    return tasks_response(sorted_upcoming(state)), 200
 
 
 # ----------------- Canvas-only endpoints ----------------- #
 
 @app.route("/canvas", methods=["POST"])
 def update_canvas_tasks():
-    global canvas_tasks
-    canvas_tasks = request.json or []
+    state = current_user()
+    state.ensure_ready()  # make sure the index exists so it receives the delta
+    state.canvas.replace(request.json or [])
 
-    all_tasks = combined_tasks()
-    sorted_tasks = sort_tasks(all_tasks)
-    return jsonify(sorted_tasks), 200
+    return tasks_response(sorted_upcoming(state)), 200
 
 
 @app.route("/canvas", methods=["GET"])
 def get_canvas_tasks():
-    return jsonify(canvas_tasks), 200
+    return tasks_response(current_user().canvas.snapshot().tasks), 200
+
+
+@app.route("/canvas/refresh", methods=["POST"])
+def refresh_canvas():
+    """
+    Refresh this user's Canvas tasks now and wait for it, instead of
+    waiting for the background worker. Requests that arrive while a
+    refresh is running share it. Returns /canvas/status (502 if it failed).
+
+    Under asgi.py this route is served by an async handler instead.
+    """
+    state = current_user()
+    state.ensure_ready()
+    ok = state.canvas.refresh_now()
+    return jsonify(state.canvas.status()), 200 if ok else 502
+
+
+@app.route("/canvas/status", methods=["GET"])
+def get_canvas_status():
+    """
+    Snapshot version, age and last sync error of the background Canvas worker.
+    """
+    return jsonify(current_user().canvas.status()), 200
 
 
 # ----------------- All tasks (Today and Upcoming list) ----------------- #
@@ -341,17 +416,57 @@ def get_all_tasks():
     """
     Return sorted, upcoming tasks (manual + Canvas).
     This powers the Today & Upcoming list on the homepage.
+
+    Optional query params:
+      limit  - page size (default: everything)
+      cursor - opaque value from the previous page's X-Next-Cursor header
+      fields - comma-separated task fields to return (default: all of them),
+               e.g. fields=id,title,due_date,category,priority,completed
+
+    The body is always the plain task list. When there are more tasks, the
+    next page is advertised in X-Next-Cursor and a Link rel="next" header.
+    Responses carry an ETag (weak once compressed); If-None-Match with the
+    current one gets 304 Not Modified without reading any tasks.
     """
     try:
-        upcoming = combined_tasks(include_past=False)
-        sorted_tasks = sort_tasks(upcoming)
+        limit = request.args.get("limit", type=int)
+        if limit is not None and limit <= 0:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        cursor = request.args.get("cursor")
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        
-        for t in sorted_tasks:
-            if isinstance(t.get("due_date"), datetime):
-                t["due_date"] = t["due_date"].strftime("%Y-%m-%d")
+        state = current_user()
+        view = state.view()
+        now = datetime.now()
 
-        return jsonify(sorted_tasks), 200
+        # The upcoming list can only change when the index changes or when
+        # `now` passes the next due date, so those two make up the tag.
+        next_due = view.next_due_after(now)
+        etag = f"{state.tag}-{view.version}-{int(next_due.timestamp()) if next_due else 0}"
+        fields = request_fields()
+        if fields:
+            etag += "-" + hashlib.sha1(",".join(fields).encode()).hexdigest()[:8]
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        page, last_key = view.upcoming_page(now, after, limit)
+
+        response = tasks_response(page)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"  # always revalidate
+        if last_key is not None:
+            next_cursor = encode_cursor(last_key)
+            response.headers["X-Next-Cursor"] = next_cursor
+            fields_part = f"&fields={','.join(fields)}" if fields else ""
+            response.headers["Link"] = (
+                f'<{request.base_url}?limit={limit}&cursor={next_cursor}{fields_part}>; rel="next"'
+            )
+        return response, 200
     except Exception as e:
         print("Error combining tasks in /all:", e)
         return jsonify({"error": str(e)}), 500
@@ -364,134 +479,214 @@ def get_summary():
     """
     Return:
     - tasks_total, tasks_completed
-    - focus_points_total, focus_points_earned
+    - focus_points_total, focus_points_earned (compute_focus_points() formula)
     - per_category counts (total, next_two_days)
     - schedule: list of work/break blocks for next few days
+    - unschedulable: tasks that can't be finished before their due date
     Uses Soft PERT to decide how long tasks should take.
+
+    Memoized per user: repeat calls with nothing changed reuse the last
+    result, and If-None-Match with its ETag gets 304 Not Modified.
     """
     try:
-        upcoming = combined_tasks(include_past=False)
+        result, etag = current_user().summary_result()
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        with stage("serialization"):
+            response = jsonify(result)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response, 200
 
-        enriched = []
-        now = datetime.now()
+    except Exception as e:
+        print("Error building summary:", e)
+        return jsonify({"error": str(e)}), 500
 
-        for t in upcoming:
-            obj = dict(t)
-            obj["_due"] = parse_due(t.get("due_date"))
-            enriched.append(obj)
-
-        sorted_tasks = sort_tasks(enriched)
-
-        # ---- basic stats ---- #
-        tasks_total = len(sorted_tasks)
-        tasks_completed = sum(1 for t in sorted_tasks if t.get("completed"))
-
-        # Focus points: scale by total expected minutes from PERT
-        total_minutes = 0.0
-        for t in sorted_tasks:
-            pert = pert_estimate_from_likely(t)
-            total_minutes += pert["expected"]
-
-        focus_points_total = int(round(total_minutes / 3))  # just a scaling factor
-        focus_points_earned = tasks_completed * 10          # simple: 10 pts per completed task
-
-        # ---- per-category stats ---- #
-        per_category = {}
-        two_days = now + timedelta(days=2)
-
-        for t in sorted_tasks:
-            cat = t.get("category") or t.get("Category") or "General"
-            d = t.get("_due")
-            info = per_category.setdefault(cat, {"total": 0, "next_two_days": 0})
-            info["total"] += 1
-            if d and now <= d <= two_days:
-                info["next_two_days"] += 1
-
-        # ---- schedule / roadmap ---- #
-        # Next 4 days, up to 4 work blocks/day.
-        # Each block: 30 min work + 10 min break.
-        # Each task gets Soft PERT expected minutes and may span multiple blocks.
-        schedule = []
-        if sorted_tasks:
-            start_base = datetime(now.year, now.month, now.day, 10, 0)  # start 10:00 today
-
-            max_days = 4
-            blocks_per_day = 4
-            block_minutes = 30
-            break_minutes = 10
-
-            task_index = 0
-            remaining_for_task = 0.0
-            current_task = None
-
-            for day_offset in range(max_days):
-                day_start = start_base + timedelta(days=day_offset)
-                block_start = day_start
-
-                for _ in range(blocks_per_day):
-                    # No current task and nothing remaining so done
-                    if task_index >= len(sorted_tasks) and remaining_for_task <= 0:
-                        break
-
-                    # Pick next task if needed
-                    if remaining_for_task <= 0:
-                        if task_index >= len(sorted_tasks):
-                            break
-                        current_task = sorted_tasks[task_index]
-                        task_index += 1
-                        pert = pert_estimate_from_likely(current_task)
-                        remaining_for_task = pert["expected"]  # Soft PERT expected minutes
-
-                    title = current_task.get("title") or current_task.get("name") or "Task"
-                    category = current_task.get("category") or current_task.get("Category") or "General"
-
-                    this_block = min(block_minutes, remaining_for_task)
-                    work_end = block_start + timedelta(minutes=this_block)
-
-                    # Work block
-                    schedule.append(
-                        {
-                            "type": "work",
-                            "title": title,
-                            "category": category,
-                            "start": block_start.isoformat(),
-                            "end": work_end.isoformat(),
-                        }
-                    )
-
-                    remaining_for_task -= this_block
-
-                    # Break block after each work block
-                    break_start = work_end
-                    break_end = break_start + timedelta(minutes=break_minutes)
-                    schedule.append(
-                        {
-                            "type": "break",
-                            "title": "Break",
-                            "category": "Break",
-                            "start": break_start.isoformat(),
-                            "end": break_end.isoformat(),
-                        }
-                    )
-
-                    block_start = break_end
-
-        result = {
-            "tasks_total": tasks_total,
-            "tasks_completed": tasks_completed,
-            "focus_points_total": focus_points_total,
-            "focus_points_earned": focus_points_earned,
-            "per_category": per_category,
-            "schedule": schedule,
-        }
 
+@app.route("/summary/risk", methods=["GET"])
+def get_summary_risk():
+    """
+    Monte Carlo deadline risk for the upcoming tasks, using the full PERT
+    spread (not just E): per-task probability of finishing before due_date
+    and percentiles of the overall schedule slack.
+
+    Optional query params:
+      trials - number of simulated trials (default RISK_TRIALS)
+      limit  - how many tasks to simulate, in scheduling order (default RISK_MAX_TASKS)
+      seed   - random seed (default 0, so the same tasks give the same answer)
+    """
+    try:
+        trials = request.args.get("trials", RISK_TRIALS, type=int)
+        limit = request.args.get("limit", RISK_MAX_TASKS, type=int)
+        seed = request.args.get("seed", 0, type=int)
+        if not 0 < trials <= RISK_MAX_TRIALS:
+            return jsonify({"error": f"trials must be between 1 and {RISK_MAX_TRIALS}"}), 400
+        if limit <= 0:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+
+        state = current_user()
+        view = state.view()
+        now = datetime.now()
+        next_due = view.next_due_after(now)
+        key = (view.version, estimate_cache.generation, f"{now:%Y%m%d%H}", next_due, trials, limit, seed)
+        memo = state.risk_memo
+        if memo is not None and memo[0] == key:
+            return jsonify(memo[1]), 200
+
+        upcoming = view.upcoming(now)
+        result = deadline_risk(upcoming, now, trials=trials, max_tasks=limit, seed=seed)
+        state.risk_memo = (key, result)
         return jsonify(result), 200
-
     except Exception as e:
-        print("Error building summary:", e)
+        print("Error simulating deadline risk:", e)
         return jsonify({"error": str(e)}), 500
 
 
+# ----------------- Cache stats ----------------- #
+
+@app.route("/stats/cache", methods=["GET"])
+def get_cache_stats():
+    """
+    Hit/miss counters for the task estimate cache and the /summary memo,
+    and where the keyword rules behind the estimates were loaded from.
+    """
+    return jsonify({
+        "estimates": estimate_cache.stats(),
+        "keyword_rules": keyword_rules_status(),
+        "flashcards": flashcard_cache.stats(),
+        "summary": current_user().summary.stats(),
+    }), 200
+
+
+# ----------------- Metrics ----------------- #
+
+def cache_counts():
+    """[(cache name, hits, misses)] for every cache the app keeps."""
+    states = users.states()
+    return [
+        ("estimates", estimate_cache.hits, estimate_cache.misses),
+        ("summary", sum(s.summary.hits for s in states), sum(s.summary.misses for s in states)),
+        ("task_json", task_json.cache_stats["hits"], task_json.cache_stats["misses"]),
+        ("compressed", _compressed_stats["hits"], _compressed_stats["misses"]),
+        ("flashcards", flashcard_cache.hits, flashcard_cache.misses),
+    ]
+
+
+Callback("manageable_cache_hits_total", "Cache hits by cache.",
+         lambda: [({"cache": name}, hits) for name, hits, _ in cache_counts()], kind="counter")
+Callback("manageable_cache_misses_total", "Cache misses by cache.",
+         lambda: [({"cache": name}, misses) for name, _, misses in cache_counts()], kind="counter")
+Callback("manageable_cache_hit_ratio", "Hits / lookups since start, by cache.",
+         lambda: [({"cache": name}, round(hits / (hits + misses), 4) if hits + misses else None)
+                  for name, hits, misses in cache_counts()])
+Callback("manageable_canvas_snapshot_age_seconds", "Age of the Canvas snapshot of the configured account.",
+         lambda: [({}, canvas_sync.snapshot().age())])
+Callback("manageable_canvas_snapshot_tasks", "Tasks in the Canvas snapshot of the configured account.",
+         lambda: [({}, len(canvas_sync.snapshot().tasks))])
+Callback("manageable_users", "Users with state loaded in this process.", lambda: [({}, len(users))])
+Callback("manageable_user_evictions_total", "Idle users whose state was dropped to make room.",
+         lambda: [({}, users.evictions)], kind="counter")
+
+
+def canvas_client_status():
+    fetch = canvas_sync.fetch
+    return fetch.client_status() if hasattr(fetch, "client_status") else None
+
+
+Callback("manageable_canvas_circuit_open", "1 while the Canvas circuit breaker is open or half-open.",
+         lambda: [({}, int(s["circuit"]["state"] != "closed")) for s in [canvas_client_status()] if s])
+Callback("manageable_canvas_concurrency_limit", "Canvas requests allowed in flight by the rate-limit throttle.",
+         lambda: [({}, s["throttle"]["limit"]) for s in [canvas_client_status()] if s])
+Callback("manageable_canvas_rate_limit_remaining", "Last X-Rate-Limit-Remaining from Canvas.",
+         lambda: [({}, s["throttle"]["rate_limit_remaining"]) for s in [canvas_client_status()] if s])
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Prometheus text format: request latency per route, time per stage
+    (canvas_fetch, combine, sort, estimation, schedule, risk_simulation,
+    serialization, compression), Canvas requests by status code and
+    cache hit ratios.
+    """
+    return app.response_class(render(), content_type=CONTENT_TYPE)
+
+
+# ----------------- Flashcards (Revision page) ----------------- #
+
+# Bytes of a raw note read at a time
+FLASHCARD_CHUNK = 64 * 1024
+NDJSON = "application/x-ndjson"
+
+
+@app.route("/flashcards/generate", methods=["POST"])
+def generate_flashcards():
+    """
+    Flashcards for a note, with the rules of the Next.js route
+    app/api/flashcards/generate (see flashcards.py).
+
+    The note is either a JSON body {content, title}, like the Next.js
+    route takes, or the raw text as the body (any other Content-Type) with
+    ?title=. A raw body is read in chunks while cards go out, so a note of
+    any size takes the same memory.
+
+    The answer is NDJSON: one card per line, sent as soon as it's made,
+    then {"done": true, "count", "hash", "cached"}. With ?format=json it
+    is {"success": true, "flashcards": [...]} in one piece instead.
+
+    Cards are cached by the note's content hash. JSON bodies are looked up
+    before any work; a raw body can send the "hash" of an earlier answer
+    in X-Note-Hash, and while that's cached the body isn't even read.
+    X-Flashcards-Cache says hit or miss.
+    """
+    as_json = request.args.get("format") == "json"
+    if request.is_json:
+        body = request.get_json(silent=True)
+        content = body.get("content") if isinstance(body, dict) else None
+        if not content or not isinstance(content, str):
+            return jsonify({"success": False, "error": "Invalid Content"}), 400
+        title = body.get("title") if isinstance(body.get("title"), str) else None
+        key = note_hash(title, content)
+    else:
+        content = None
+        title = request.args.get("title")
+        key = request.headers.get("X-Note-Hash")
+
+    cards = flashcard_cache.get(key) if key else None
+    if cards is not None:
+        data, content_type = (json_body(cards), "application/json") if as_json else (ndjson_body(key, cards), NDJSON)
+        response = app.response_class(data, content_type=content_type)
+        response.headers["X-Flashcards-Cache"] = "hit"
+        return response
+
+    if content is not None:
+        chunks = (content[i:i + FLASHCARD_CHUNK] for i in range(0, len(content), FLASHCARD_CHUNK))
+    else:
+        key = None      # a raw body is hashed as it's read, not taken on trust
+        stream = request.stream
+        first = stream.read(FLASHCARD_CHUNK)
+        if not first:
+            return jsonify({"success": False, "error": "Invalid Content"}), 400
+        chunks = itertools.chain([first], iter(lambda: stream.read(FLASHCARD_CHUNK), b""))
+
+    try:
+        if as_json:
+            _, cards = collect_cards(chunks, title, key)
+            response = app.response_class(json_body(cards), content_type="application/json")
+        else:
+            response = app.response_class(stream_with_context(stream_ndjson(chunks, title, key)),
+                                          content_type=NDJSON)
+            response.headers["X-Accel-Buffering"] = "no"    # let proxies pass cards on as they come
+    except Exception as e:
+        print("Error generating flashcards:", e)
+        return jsonify({"success": False, "error": "Internal Server error"}), 500
+    response.headers["X-Flashcards-Cache"] = "miss"
+    return response
+
+
 # ----------------- Mochi motivation ----------------- #
 
 @app.route("/motivation", methods=["GET"])
@@ -0,0 +1,201 @@
+"""
+Production entry point (ASGI):
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+Same routes and JSON as `python api.py`. The difference is where requests
+wait on Canvas:
+
+  - Canvas is fetched with the aiohttp client (canvas_async) on one event
+    loop, so every course and page of a refresh is in flight at once and
+    a slow Canvas holds sockets, not threads.
+  - POST /canvas/refresh is served by an async handler: it awaits the
+    shared refresh instead of parking a thread on it, so any number of
+    users can be waiting on Canvas while other requests keep flowing.
+    It gives up after REQUEST_TIMEOUT seconds (504), and a refresh that
+    every waiter has given up on (timeout or client disconnect) is
+    cancelled, down to its open Canvas requests.
+  - Every other route, /canvas, /all and /summary included, is the
+    unchanged synchronous Flask view, run on a pool of FLASK_WORKERS
+    threads.
+
+What that does not give you:
+
+  - Only POST /canvas/refresh overlaps its Canvas wait with other
+    requests. The other routes don't wait on Canvas at all (they read the
+    background worker's snapshot, the same as under `python api.py`), so
+    there is nothing of theirs to overlap, but each one holds a worker
+    thread for as long as it runs. At most FLASK_WORKERS of them run at
+    once; the rest queue.
+  - A client that disconnects or times out only cancels work in
+    POST /canvas/refresh. A Flask view keeps running to the end (e.g. a
+    /summary rebuild), and its answer is dropped.
+"""
+import asyncio
+import os
+import time
+
+# must be set before canvas_sync builds the shared worker
+os.environ.setdefault("CANVAS_CLIENT", "async")
+
+from a2wsgi import WSGIMiddleware  # noqa: E402
+from flask import jsonify  # noqa: E402
+
+from api import app, canvas_sync, users  # noqa: E402
+from metrics import REQUEST_SECONDS  # noqa: E402
+from task_estimation import watch_keyword_rules  # noqa: E402
+from user_state import USER_HEADER, TooManyUsers  # noqa: E402
+
+# Seconds an async handler may wait on Canvas before answering 504
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "30"))
+
+# Threads running the plain Flask views
+FLASK_WORKERS = int(os.getenv("FLASK_WORKERS", "16"))
+
+
+
+def input_terminated(wsgi_app):
+    """
+    a2wsgi's wsgi.input ends where the request body does (the ASGI server
+    has already undone chunked encoding), so tell Werkzeug it may read
+    bodies without a Content-Length (streamed POST /flashcards/generate).
+    """
+    def wrapped(environ, start_response):
+        environ["wsgi.input_terminated"] = True
+        return wsgi_app(environ, start_response)
+    return wrapped
+
+
+flask_app = WSGIMiddleware(input_terminated(app), workers=FLASK_WORKERS)
+
+
+def header(scope, name):
+    name = name.lower().encode("latin1")
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin1")
+    return None
+
+
+async def send_json(scope, send, payload, status):
+    """
+    Answer with `payload` exactly as the Flask view would (jsonify, then
+    Flask's after_request hooks, i.e. CORS headers).
+    """
+    headers = [(k.decode("latin1"), v.decode("latin1")) for k, v in scope.get("headers", ())]
+    with app.test_request_context(scope["path"], method=scope["method"], headers=headers):
+        response = app.process_response(app.make_response((jsonify(payload), status)))
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in response.headers.items()],
+    })
+    await send({"type": "http.response.body", "body": response.get_data()})
+
+
+async def disconnected(receive):
+    """Returns once the client has gone away."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def wait_for_refresh(canvas):
+    """Wait for (joining or starting) a Canvas refresh; True on success."""
+    if not canvas.is_async:
+        # users without the async fetcher (no Canvas account): answers at once
+        return await asyncio.get_running_loop().run_in_executor(None, canvas.refresh_now)
+    job = canvas.refresh_job()
+    try:
+        # shield: giving up here must not cancel it for the other waiters;
+        # release_job() cancels it once nobody is left
+        return await asyncio.shield(asyncio.wrap_future(job))
+    finally:
+        canvas.release_job(job)
+
+
+# ---------- async routes ---------- #
+
+async def refresh_canvas(scope, receive, send):
+    """POST /canvas/refresh, same contract as api.refresh_canvas()."""
+    canvas_sync.start()
+    loop = asyncio.get_running_loop()
+    try:
+        state = users.get(header(scope, USER_HEADER))
+    except TooManyUsers as e:
+        await send_json(scope, send, {"error": str(e)}, 503)
+        return
+    await loop.run_in_executor(None, state.ensure_ready)
+
+    waiter = asyncio.ensure_future(wait_for_refresh(state.canvas))
+    gone = asyncio.ensure_future(disconnected(receive))
+    try:
+        done, _ = await asyncio.wait({waiter, gone}, timeout=REQUEST_TIMEOUT,
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        gone.cancel()
+        if not waiter.done():
+            waiter.cancel()   # timeout, disconnect or server shutdown
+
+    if waiter not in done:
+        if gone in done:
+            return  # nobody to answer
+        await send_json(scope, send, {"error": f"Canvas refresh timed out after {REQUEST_TIMEOUT:g}s"}, 504)
+        return
+    ok = waiter.result()
+    await send_json(scope, send, state.canvas.status(), 200 if ok else 502)
+
+
+ASYNC_ROUTES = {
+    ("POST", "/canvas/refresh"): refresh_canvas,
+}
+
+
+# ---------- ASGI app ---------- #
+
+async def timed(handler, scope, receive, send):
+    """Run an async route, recording it like api.record_request() does (499 = client gone)."""
+    started = time.perf_counter()
+    status = {}
+
+    async def send_and_note(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        await send(message)
+
+    try:
+        await handler(scope, receive, send_and_note)
+    finally:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"],
+                                route=scope["path"], status=status.get("code", 499))
+
+
+def shutdown():
+    canvas_sync.stop()
+    if canvas_sync.is_async:
+        canvas_sync.fetch.close()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            canvas_sync.start()
+            watch_keyword_rules()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.get_running_loop().run_in_executor(None, shutdown)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    handler = ASYNC_ROUTES.get((scope.get("method"), scope.get("path")))
+    if handler is not None:
+        await timed(handler, scope, receive, send)
+        return
+
+    await flask_app(scope, receive, send)
@@ -0,0 +1,142 @@
+"""
+Benchmark: old bare requests.get path vs CanvasClient for one 500-assignment course.
+
+Starts a local stub Canvas server (Link pagination, fixed latency per request)
+so nothing hits a real Canvas instance.
+
+    python benchmarks/bench_canvas_client.py [--assignments 500] [--latency 0.08]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from canvasAPI_utils import CanvasClient  # noqa: E402
+
+COURSE_ID = "1"
+
+
+def make_stub(n_assignments, latency):
+    groups = [{"id": g, "name": f"Group {g}", "group_weight": 25} for g in range(1, 5)]
+    assignments = [
+        {
+            "id": i,
+            "name": f"Assignment {i}",
+            "description": "<p>Read chapter and answer the questions.</p>",
+            "due_at": "2030-01-01T23:59:00Z",
+            "assignment_group_id": 1 + i % 4,
+            "html_url": f"http://canvas.local/courses/1/assignments/{i}",
+        }
+        for i in range(1, n_assignments + 1)
+    ]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, like real Canvas
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            per_page = int(query.get("per_page", ["10"])[0])
+            page = int(query.get("page", ["1"])[0])
+
+            if url.path.endswith("/assignment_groups"):
+                items = groups
+            elif url.path.endswith("/assignments"):
+                items = assignments
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            last = max(1, -(-len(items) // per_page))
+            chunk = items[(page - 1) * per_page: page * per_page]
+            base = f"http://{self.headers['Host']}{url.path}?per_page={per_page}"
+            links = [f'<{base}&page=1>; rel="first"', f'<{base}&page={last}>; rel="last"']
+            if page < last:
+                links.append(f'<{base}&page={page + 1}>; rel="next"')
+
+            body = json.dumps(chunk).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Link", ", ".join(links))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def old_path(base_url):
+    """What canvasAPI_utils did before: bare requests.get, first page only, serial."""
+    requests.get(f"{base_url}/courses/{COURSE_ID}/assignment_groups")
+    return requests.get(f"{base_url}/courses/{COURSE_ID}/assignments").json()
+
+
+def old_path_all_pages(base_url):
+    """Old client style but following every "next" link (to get complete data)."""
+    requests.get(f"{base_url}/courses/{COURSE_ID}/assignment_groups")
+    items = []
+    url = f"{base_url}/courses/{COURSE_ID}/assignments"
+    while url:
+        r = requests.get(url)
+        items.extend(r.json())
+        url = r.links.get("next", {}).get("url")
+    return items
+
+
+def timed(fn, runs):
+    times = []
+    result = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return times[len(times) // 2], len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assignments", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.08, help="seconds per stub request")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    server = make_stub(args.assignments, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}/api/v1"
+
+    rows = [
+        ("requests.get, first page only (old)", lambda: old_path(base_url)),
+        ("requests.get, follow next (serial)", lambda: old_path_all_pages(base_url)),
+    ]
+    for per_page in (10, 50, 100):
+        client = CanvasClient(base_url=base_url, headers={}, per_page=per_page)
+        rows.append((f"CanvasClient per_page={per_page}", lambda c=client: c.get_assignments(COURSE_ID)))
+
+    print(f"{args.assignments} assignments, {args.latency * 1000:.0f} ms per request, median of {args.runs}")
+    print(f"{'path':40} {'median ms':>10} {'items':>7}")
+    for name, fn in rows:
+        median, count = timed(fn, args.runs)
+        print(f"{name:40} {median * 1000:10.1f} {count:7d}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
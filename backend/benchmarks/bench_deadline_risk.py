@@ -0,0 +1,79 @@
+"""
+deadline_risk.simulate(): check against a plain per-trial loop, then time
+the batched version.
+
+    python benchmarks/bench_deadline_risk.py [--tasks 500] [--trials 10000]
+
+The reference draws each trial's durations with numpy's own beta sampler
+and walks the task list in Python. On-time probabilities from both must
+agree within Monte Carlo noise.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deadline_risk import simulate  # noqa: E402
+
+
+def random_pert(rng, n):
+    M = np.round(rng.uniform(10, 180, n))
+    big = rng.random(n) < 0.2
+    O = np.maximum(5.0, np.where(big, 0.5, 0.7) * M)
+    P = np.minimum(240.0, np.where(big, 2.0, 1.5) * M)
+    E = (O + 4 * M + P) / 6
+    # deadlines around where the expected finish lands, some with no deadline
+    W = np.cumsum(E) * rng.uniform(0.85, 1.2, n)
+    W[rng.random(n) < 0.1] = np.inf
+    return O, M, P, W
+
+
+def reference(O, M, P, W, trials, seed):
+    rng = np.random.default_rng(seed)
+    a = 1 + 4 * (M - O) / (P - O)
+    b = 1 + 4 * (P - M) / (P - O)
+    on_time = np.zeros(len(O))
+    for _ in range(trials):
+        finish = 0.0
+        for i in range(len(O)):
+            finish += O[i] + (P[i] - O[i]) * rng.beta(a[i], b[i])
+            if finish <= W[i]:
+                on_time[i] += 1
+    return on_time / trials
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--trials", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    O, M, P, W = random_pert(rng, 40)
+    ref = reference(O, M, P, W, 4000, args.seed)
+    fast, _ = simulate(O, M, P, W, trials=40000, seed=args.seed)
+    worst = float(np.abs(ref - fast).max())
+    if worst >= 0.04:   # not an assert: `python -O` would skip it
+        raise AssertionError(f"on-time probabilities differ by {worst:.3f}")
+    print(f"check: 40 tasks, batched vs per-trial loop, max difference {worst:.3f}")
+
+    O, M, P, W = random_pert(rng, args.tasks)
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        p_on_time, worst_slack = simulate(O, M, P, W, trials=args.trials, seed=args.seed)
+        best = min(best, time.perf_counter() - t0)
+
+    p5, p50, p95 = np.percentile(worst_slack, [5, 50, 95])
+    print(f"{args.trials} trials x {args.tasks} tasks: {best * 1000:.0f} ms "
+          f"(mean on-time {p_on_time.mean():.3f}, worst slack p5/p50/p95 "
+          f"{p5:.0f}/{p50:.0f}/{p95:.0f} min)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: flashcard generation for big notes, the JS route's approach
+(whole note in memory, split into lines, every card collected) vs the
+streaming generator in flashcards.py, plus POST /flashcards/generate cold
+and cached.
+
+    python benchmarks/bench_flashcards.py [--sizes 1,8,32] [--repeat 3]
+
+Notes are seeded and look like class notes: headings, "Topic:" lines,
+bullets, definitions, comparisons and paragraphs. Peak memory is
+tracemalloc's peak while generating, above what the note itself takes.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("MANAGEABLE_DB", ":memory:")
+os.environ.setdefault("CANVAS_SYNC_MODE", "full")
+
+import api  # noqa: E402
+from flashcards import generate_flashcards, read_lines  # noqa: E402
+from synthetic import FILLER, SYLLABLES  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def make_note(rng, megabytes):
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(300)] + FILLER
+
+    def phrase(n):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    kinds = [
+        lambda: f"# {phrase(2).title()}",
+        lambda: f"{phrase(2)}:",
+        lambda: f"- {phrase(rng.randint(2, 8))}",
+        lambda: f"{phrase(2)} - {phrase(rng.randint(3, 10))}",
+        lambda: f"{phrase(2)} is {phrase(rng.randint(3, 10))}",
+        lambda: f"{phrase(2)} vs {phrase(2)}",
+        lambda: f"{phrase(3)} because {phrase(4)}",
+        lambda: phrase(rng.randint(12, 40)),
+        lambda: "",
+    ]
+    weights = [1, 3, 30, 10, 8, 2, 3, 20, 10]
+    lines, size = [], 0
+    while size < megabytes * 2 ** 20:
+        line = rng.choices(kinds, weights)[0]()
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def whole_note(content, title):
+    """The JS route's shape: split everything, collect every card."""
+    return list(generate_flashcards(content.split("\n"), title))
+
+
+def streamed(data, title):
+    """Bytes in 64 KB chunks through read_lines(); cards consumed as made."""
+    chunks = (data[i:i + CHUNK] for i in range(0, len(data), CHUNK))
+    return sum(1 for _ in generate_flashcards(read_lines(chunks), title))
+
+
+def measure(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1,8,32", type=lambda s: [float(x) for x in s.split(",") if x],
+                        help="note sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    client = api.app.test_client()
+    print(f"  {'note':>8}  {'approach':<14} {'time':>9} {'MB/s':>7} {'peak mem':>10}")
+    for mb in args.sizes:
+        content = make_note(random.Random(f"{args.seed}-{mb}"), mb)
+        data = content.encode()
+        for name, fn in [("whole note", lambda: whole_note(content, "Notes")),
+                         ("streamed", lambda: streamed(data, "Notes"))]:
+            best, peak = measure(fn, args.repeat)
+            print(f"  {mb:>6g}MB  {name:<14} {best * 1000:7.0f}ms {len(data) / 2 ** 20 / best:7.1f} "
+                  f"{peak / 2 ** 20:8.1f}MB")
+
+        key = None
+        for label in ("POST cold", "POST cached"):
+            t0 = time.perf_counter()
+            r = client.post("/flashcards/generate?title=Notes", data=data, content_type="text/plain",
+                            headers={"X-Note-Hash": key} if key else {})
+            body = r.get_data()
+            elapsed = time.perf_counter() - t0
+            key = json.loads(body.rsplit(b"\n", 2)[-2])["hash"]
+            print(f"  {mb:>6g}MB  {label:<14} {elapsed * 1000:7.0f}ms  ({r.headers['X-Flashcards-Cache']}, "
+                  f"{len(body) / 2 ** 20:.1f} MB of NDJSON)")
+    api.canvas_sync.stop()
+
+
+if __name__ == "__main__":
+    main()
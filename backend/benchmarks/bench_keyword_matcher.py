@@ -0,0 +1,97 @@
+"""
+Benchmark: per-task keyword matching cost, old per-rule loop vs KeywordMatcher.
+
+    python benchmarks/bench_keyword_matcher.py [--tasks 2000]
+
+The old path is the pre-automaton estimate_minutes() logic: `phrase in text`
+for every phrase rule, then a dict lookup per token.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+from task_estimation import DEFAULT_KEYWORD_RULES  # noqa: E402
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "te", "su", "pen", "dor", "vi", "na", "qua", "zel"]
+
+
+def fake_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_rules(n, rng):
+    rules = dict(list(DEFAULT_KEYWORD_RULES.items())[:n])
+    while len(rules) < n:
+        words = [fake_word(rng) for _ in range(rng.choice((1, 1, 2, 3)))]
+        rules[" ".join(words)] = {"minutes": rng.randint(10, 120), "weight": round(rng.uniform(0.5, 2.0), 2)}
+    return rules
+
+
+def make_texts(n, rules, rng):
+    vocab = list(DEFAULT_KEYWORD_RULES) + list(rules)[:200] + ["the", "for", "and", "chapter", "notes"]
+    return [
+        " ".join(rng.choice(vocab) for _ in range(rng.randint(3, 40))).lower()
+        for _ in range(n)
+    ]
+
+
+def old_match(text, phrase_rules, word_rules):
+    applied = []
+    for phrase, info in phrase_rules:
+        if phrase in text:
+            applied.append(info)
+    tokens = re.findall(r"[a-zA-Z]+", text)
+    for tok in tokens:
+        info = word_rules.get(tok.lower())
+        if info:
+            applied.append(info)
+    return applied, len(tokens)
+
+
+def per_task_us(fn, texts):
+    t0 = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return (time.perf_counter() - t0) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    print(f"{'rules':>7} {'old us/task':>12} {'matcher us/task':>16} {'build ms':>9}")
+    for n_rules in (10, 1000, 20000):
+        rules = make_rules(n_rules, rng)
+        phrase_rules = [(k, v) for k, v in rules.items() if " " in k]
+        word_rules = {k: v for k, v in rules.items() if " " not in k}
+        texts = make_texts(args.tasks, rules, rng)
+
+        t0 = time.perf_counter()
+        matcher = KeywordMatcher(phrase_rules + list(word_rules.items()))
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        # same applied rules as the old loop once phrases need word boundaries
+        for text in texts[:200]:
+            padded = " " + " ".join(re.findall(r"[a-zA-Z]+", text)) + " "
+            bounded = [(f" {p} ", info) for p, info in phrase_rules]
+            old_infos, old_count = old_match(padded, bounded, word_rules)
+            new_infos, new_count = matcher.match(text)
+            # not asserts: `python -O` would skip them
+            if old_count != new_count or sorted(map(id, old_infos)) != sorted(map(id, new_infos)):
+                raise AssertionError(f"matcher differs from the old loop on {text!r}")
+
+        old_us = per_task_us(lambda t: old_match(t, phrase_rules, word_rules), texts)
+        new_us = per_task_us(matcher.match, texts)
+        print(f"{n_rules:7d} {old_us:12.1f} {new_us:16.1f} {build_ms:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark: keyword-rule startup with a big rules file, compiled from JSON
+vs loaded from the compiled artifact (rule_cache.py), plus a hot reload
+under load.
+
+    python benchmarks/bench_rule_startup.py [--rules 50000] [--repeat 3]
+
+Each start is a fresh `python -c "import task_estimation"` pointed at a
+synthetic rules file (KEYWORD_RULES_PATH) and a throwaway artifact
+directory (KEYWORD_CACHE_DIR):
+  cold      no artifact: parse JSON, build the matcher, write the artifact
+  warm      artifact matches the file: one read + unpickle
+  touched   file rewritten with the same rules (new mtime): compiled again
+
+The reload part edits the file while threads keep estimating tasks, and
+checks every estimate came from either the old or the new rules.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+import rule_cache  # noqa: E402
+import task_estimation  # noqa: E402
+from synthetic import Synthetic  # noqa: E402
+from task_estimation import static_features  # noqa: E402
+
+PROBE = """
+import time
+t0 = time.perf_counter()
+import task_estimation
+total = time.perf_counter() - t0
+import json
+print(json.dumps(dict(task_estimation.keyword_rules_status(), import_ms=round(total * 1000, 1))))
+"""
+
+
+def start(env):
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def startups(rules_path, cache_dir, repeat):
+    env = dict(os.environ, KEYWORD_RULES_PATH=rules_path, KEYWORD_CACHE_DIR=cache_dir)
+    rows = {"cold": [], "warm": [], "touched": []}
+    for _ in range(repeat):
+        for name in os.listdir(cache_dir):
+            os.unlink(os.path.join(cache_dir, name))
+        rows["cold"].append(start(env))
+        rows["warm"].append(start(env))
+        with open(rules_path, "rb") as f:
+            data = f.read()
+        time.sleep(0.01)
+        with open(rules_path, "wb") as f:
+            f.write(data)
+        rows["touched"].append(start(env))
+    return rows
+
+
+def reload_under_load(gen, rules_path, cache_dir, seconds):
+    rule_cache.RULE_CACHE_DIR = cache_dir
+    task_estimation.load_keyword_rules(rules_path)
+    tasks = [t.to_dict() for t in gen.tasks(2000)]
+    old = [static_features(t)[0] for t in tasks]
+
+    # the new rules: every custom rule twice as long
+    new_rules = {k: dict(v, minutes=v["minutes"] * 2) for k, v in gen.rules.items()}
+    stop = threading.Event()
+    seen = {"old": 0, "new": 0, "other": 0}
+
+    def worker():
+        while not stop.is_set():
+            for i, t in enumerate(tasks[:50]):
+                base = static_features(t)[0]
+                seen["old" if base == old[i] else "new" if base == new[i] else "other"] += 1
+            time.sleep(0.01)   # requests come and go, not a busy loop
+
+    with open(rules_path, "w", encoding="utf-8") as f:
+        json.dump(new_rules, f)
+    task_estimation.load_keyword_rules(rules_path)
+    new = [static_features(t)[0] for t in tasks]
+    with open(rules_path, "w", encoding="utf-8") as f:
+        json.dump(gen.rules, f)
+    t0 = time.perf_counter()
+    task_estimation.reload_keyword_rules(rules_path)
+    idle = time.perf_counter() - t0
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for th in threads:
+        th.start()
+    swaps = []
+    deadline = time.monotonic() + seconds
+    flip = True
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        with open(rules_path, "w", encoding="utf-8") as f:
+            json.dump(new_rules if flip else gen.rules, f)
+        task_estimation.reload_keyword_rules(rules_path)
+        swaps.append(time.perf_counter() - t0)
+        flip = not flip
+        time.sleep(0.2)
+    stop.set()
+    for th in threads:
+        th.join()
+    return idle, swaps, seen
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reload-seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    gen = Synthetic(args.seed, args.rules)
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_path = gen.write_rules(os.path.join(tmp, "task_keywords.json"))
+        cache_dir = os.path.join(tmp, "cache")
+        os.makedirs(cache_dir)
+        print(f"{len(gen.rules)} rules, {os.path.getsize(rules_path) / 1e6:.1f} MB of JSON")
+
+        rows = startups(rules_path, cache_dir, args.repeat)
+        artifact = sum(os.path.getsize(os.path.join(cache_dir, n)) for n in os.listdir(cache_dir))
+        print(f"compiled artifact: {artifact / 1e6:.1f} MB\n")
+        print(f"  {'start':<10} {'rules load':>12} {'import':>12}   (median of {args.repeat})")
+        for name, runs in rows.items():
+            if not all(r["source"] == ("cache" if name == "warm" else "compiled") for r in runs):
+                raise AssertionError(f"{name} start loaded rules from the wrong place: {runs}")
+            print(f"  {name:<10} {statistics.median(r['load_ms'] for r in runs):9.1f} ms "
+                  f"{statistics.median(r['import_ms'] for r in runs):9.1f} ms")
+
+        idle, swaps, seen = reload_under_load(gen, rules_path, cache_dir, args.reload_seconds)
+        print(f"\nhot reload (edit + compile + swap): {idle * 1000:.1f} ms idle; "
+              f"{len(swaps)} swaps while 4 threads estimated, median {statistics.median(swaps) * 1000:.1f} ms")
+        print(f"  estimates from old rules {seen['old']}, new rules {seen['new']}, neither {seen['other']}")
+        if seen["other"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+plan_schedule(): validity checks on random plans, then timing of a 30-day
+plan for 10k tasks.
+
+    python benchmarks/bench_scheduler.py [--tasks 10000] [--days 30] [--checks 300]
+
+Every checked plan must have:
+  - work blocks inside the working windows, never overlapping,
+  - at most daily_capacity work minutes per day,
+  - every scheduled task finishing before its deadline (when it is fully
+    placed), and no task both scheduled and reported unschedulable.
+A task that doesn't fit must not stop a smaller one after it from being
+placed. Any failed check raises AssertionError (exit status 1), with or
+without -O.
+"""
+import argparse
+import os
+import random
+import sys
+import time as clock
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_task_scheduler import get_deadline, plan_schedule  # noqa: E402
+from task_model import Task  # noqa: E402
+
+CATEGORIES = ["Assignments", "Career", "Health", "Fun", "General", None]
+START = datetime(2026, 3, 2, 9, 30)
+
+
+def random_tasks(rng, n, days):
+    items = []
+    for i in range(n):
+        due = START + timedelta(days=rng.uniform(0, days * 1.5), hours=rng.randint(0, 23))
+        due_date = rng.choice([
+            due.strftime("%Y-%m-%d"),
+            due.strftime("%Y-%m-%dT%H:%M:%S"),
+            None,
+        ])
+        task = Task.from_dict({
+            "id": i,
+            "title": f"task {i}",
+            "category": rng.choice(CATEGORIES),
+            "priority": rng.randint(1, 5),
+            "due_date": due_date,
+            "completed": rng.random() < 0.1,
+        })
+        items.append((task, rng.choice([8.5, 15.0, 31.7, 45.0, 72.3, 120.0, 200.0])))
+    return items
+
+
+def random_config(rng):
+    windows = rng.choice([
+        [(time(10), time(22))],
+        [(time(9), time(12)), (time(13, 30), time(17))],
+        [(time(8), time(8, 45)), (time(19), time.max)],
+    ])
+    return {
+        "horizon_days": rng.randint(1, 10),
+        "block_minutes": rng.choice([25, 30, 50]),
+        "break_minutes": rng.choice([5, 10]),
+        "daily_capacity": rng.choice([60, 120, 240]),
+        "windows": windows,
+    }
+
+
+def in_windows(start, end, windows):
+    for w_start, w_end in windows:
+        lo = datetime.combine(start.date(), w_start)
+        hi = (datetime.combine(start.date() + timedelta(days=1), time.min)
+              if w_end == time.max else datetime.combine(start.date(), w_end))
+        if lo <= start and end <= hi:
+            return True
+    return False
+
+
+def expect(ok, message):
+    # not an assert: `python -O` would skip the check and pass
+    if not ok:
+        raise AssertionError(message)
+
+
+def check_plan(items, plan, config):
+    by_id = {t.id: t for t, _ in items}
+    work = [b for b in plan["schedule"] if b["type"] == "work"]
+    spans = sorted((datetime.fromisoformat(b["start"]), datetime.fromisoformat(b["end"]), b["task_id"])
+                   for b in work)
+
+    per_day = defaultdict(float)
+    placed = defaultdict(float)
+    finish = {}
+    for i, (start, end, task_id) in enumerate(spans):
+        expect(start >= START, "block before plan start")
+        expect(in_windows(start, end, config["windows"]), f"block outside windows: {start}-{end}")
+        if i:
+            expect(spans[i - 1][1] <= start, "overlapping blocks")
+        minutes = (end - start).total_seconds() / 60
+        per_day[start.date()] += minutes
+        placed[task_id] += minutes
+        finish[task_id] = end
+
+    for day, minutes in per_day.items():
+        expect(minutes <= config["daily_capacity"] + 1e-6, f"{day} over capacity ({minutes})")
+
+    wanted = {t.id: m for t, m in items}
+    for task_id, minutes in placed.items():
+        expect(not by_id[task_id].completed, "completed task scheduled")
+        if minutes >= wanted[task_id] - 1e-6:
+            deadline = get_deadline(by_id[task_id])
+            expect(deadline is None or finish[task_id] <= deadline, "finishes after its deadline")
+
+    reported = {u["task_id"] for u in plan["unschedulable"]}
+    expect(not reported & set(placed), "task both scheduled and unschedulable")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--checks", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for _ in range(args.checks):
+        config = random_config(rng)
+        items = random_tasks(rng, rng.randint(0, 80), config["horizon_days"])
+        check_plan(items, plan_schedule(items, start=START, **config), config)
+    # a task too big for the horizon must not crowd out a small one due the same day
+    due = (START + timedelta(days=1)).strftime("%Y-%m-%d")
+    big, small = Task.from_dict({"id": "big", "due_date": due}), Task.from_dict({"id": "small", "due_date": due})
+    plan = plan_schedule([(big, 1000), (small, 20)], start=START, horizon_days=4)
+    expect([u["task_id"] for u in plan["unschedulable"]] == ["big"], "small task reported along with a big one")
+    print(f"validity: {args.checks} random plans ok")
+
+    items = random_tasks(rng, args.tasks, args.days)
+    config = {
+        "horizon_days": args.days,
+        "block_minutes": 30,
+        "break_minutes": 10,
+        "daily_capacity": 240,
+        "windows": [(time(9), time(12)), (time(13), time(18))],
+    }
+    best = float("inf")
+    for _ in range(5):
+        t0 = clock.perf_counter()
+        plan = plan_schedule(items, start=START, **config)
+        best = min(best, clock.perf_counter() - t0)
+    check_plan(items, plan, config)
+
+    work = sum(1 for b in plan["schedule"] if b["type"] == "work")
+    print(f"{args.tasks} tasks, {args.days}-day plan: {best * 1000:.1f} ms "
+          f"({work} work blocks, {len(plan['unschedulable'])} unschedulable, "
+          f"{len(plan['considered'])} considered)")
+
+
+if __name__ == "__main__":
+    main()
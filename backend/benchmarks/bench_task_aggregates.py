@@ -0,0 +1,137 @@
+"""
+TaskAggregates: randomized check against compute_focus_points() and a
+plain recount, then timing of single-task updates and reads at several
+task counts.
+
+    python benchmarks/bench_task_aggregates.py [--ops 3000] [--sizes 1000,10000,100000]
+
+Reads should cost the same whatever the task count; the old way (loop over
+every task) is timed next to them for comparison. A mismatch raises
+AssertionError (exit status 1), with or without -O.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_task_scheduler import compute_focus_points  # noqa: E402
+from task_model import Task  # noqa: E402
+from task_summary import TaskAggregates  # noqa: E402
+
+CATEGORIES = ["Assignments", "Career", "Health", "Fun", "General", "Other", None]
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+def random_task(rng, task_id):
+    due = NOW + timedelta(days=rng.uniform(-2, 10))
+    return Task.from_dict({
+        "id": task_id,
+        "title": f"task {task_id}",
+        "category": rng.choice(CATEGORIES),
+        "priority": rng.choice([1, 2, 3, 4, 5, None]),
+        "due_date": rng.choice([None, due.strftime("%Y-%m-%d"), due.strftime("%Y-%m-%dT%H:%M:%S")]),
+        "completed": rng.random() < 0.3,
+        "points_possible": rng.choice([None, 5, 20]),
+    })
+
+
+def recount(tasks, now):
+    upcoming = [t for t in tasks.values() if not t.due or t.due >= now]
+    earned, total = compute_focus_points(upcoming)
+    per_category = {}
+    for t in upcoming:
+        info = per_category.setdefault(t.category or "General", {"total": 0, "next_two_days": 0})
+        info["total"] += 1
+        if t.due and now <= t.due <= now + timedelta(days=2):
+            info["next_two_days"] += 1
+    return {
+        "tasks_total": len(upcoming),
+        "tasks_completed": sum(1 for t in upcoming if t.completed),
+        "focus_points_total": total,
+        "focus_points_earned": earned,
+        "per_category": per_category,
+    }
+
+
+def check(ops, seed):
+    rng = random.Random(seed)
+    agg = TaskAggregates()
+    agg.rebuild([])
+    tasks = {}
+    now = NOW
+    for step in range(ops):
+        op = rng.random()
+        if op < 0.4 or not tasks:
+            uid = ("manual", step)
+            tasks[uid] = random_task(rng, step)
+        elif op < 0.7:
+            uid = rng.choice(list(tasks))
+            tasks[uid] = random_task(rng, uid[1])
+        elif op < 0.85:
+            uid = rng.choice(list(tasks))
+            tasks[uid] = Task.from_dict(dict(tasks[uid].to_dict(), completed=True))
+        else:
+            uid = rng.choice(list(tasks))
+            del tasks[uid]
+            agg.apply(uid, None, now)
+            continue
+        agg.apply(uid, tasks[uid], now)
+
+        if step % 10 == 0:
+            now += timedelta(minutes=rng.randint(0, 90))   # let some tasks go past-due
+            agg.expire(now)
+            if agg.snapshot(now) != recount(tasks, now):
+                raise AssertionError(f"aggregates differ from a recount at step {step}")
+
+    entries = [(uid, t) for uid, t in tasks.items() if not t.due or t.due >= now]
+    if agg.reconcile(entries, now):
+        raise AssertionError("reconcile found drift")
+    return len(tasks)
+
+
+def timing(n, seed):
+    rng = random.Random(seed)
+    tasks = {("manual", i): random_task(rng, i) for i in range(n)}
+    agg = TaskAggregates()
+    agg.rebuild([(uid, t) for uid, t in tasks.items() if not t.due or t.due >= NOW])
+
+    uids = list(tasks)
+    updates = [(uids[i % n], random_task(rng, uids[i % n][1])) for i in range(1000)]
+    t0 = time.perf_counter()
+    for uid, task in updates:
+        agg.apply(uid, task, NOW)
+    apply_us = (time.perf_counter() - t0) / 1000 * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        agg.snapshot(NOW)
+    read_us = (time.perf_counter() - t0) / 1000 * 1e6
+
+    t0 = time.perf_counter()
+    recount(tasks, NOW)
+    loop_us = (time.perf_counter() - t0) * 1e6
+    return apply_us, read_us, loop_us
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=3000)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    remaining = check(args.ops, args.seed)
+    print(f"consistency: {args.ops} random ops, aggregates == full recount ({remaining} tasks left)")
+
+    for n in (int(s) for s in args.sizes.split(",")):
+        apply_us, read_us, loop_us = timing(n, args.seed)
+        print(f"{n:>7} tasks: apply {apply_us:.1f} us, read {read_us:.1f} us, "
+              f"full recount {loop_us / 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
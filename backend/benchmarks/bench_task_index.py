@@ -0,0 +1,145 @@
+"""
+TaskIndex: randomized consistency check against sort_tasks(), then timing
+of single-task inserts/updates vs re-sorting the whole list.
+
+    python benchmarks/bench_task_index.py [--ops 5000] [--tasks 10000]
+
+The check applies random insert / update / complete / remove operations to
+both a TaskIndex and a plain list (new tasks appended, updates in place) and
+checks after every step that the index order equals sort_tasks(list).
+Manual tasks are added, updated and deleted through an in-memory TaskStore
+(":memory:"), which has to end up holding the same tasks as the index. A
+mismatch raises AssertionError (exit status 1), with or without -O.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_task_scheduler import sort_tasks  # noqa: E402
+from task_index import TaskIndex  # noqa: E402
+from task_model import Task  # noqa: E402
+from task_store import TaskStore  # noqa: E402
+
+CATEGORIES = ["Assignments", "Career", "Health", "Fun", "General", "Other", None]
+
+
+def random_fields(rng):
+    base = datetime(2026, 1, 1)
+    return {
+        "title": f"task {rng.randint(0, 999)}",
+        "category": rng.choice(CATEGORIES),
+        # few distinct dates/priorities so ties (and tie-breaking) are common
+        "due_date": rng.choice([None, "bad-date"]
+                               + [(base + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(5)]),
+        "priority": rng.choice([1, 2, 3, 4, 5, None, "2"]),
+        "completed": False,
+    }
+
+
+def check(ops, seed):
+    rng = random.Random(seed)
+    index = TaskIndex()
+    store = TaskStore(":memory:")   # manual tasks go through it, like the task routes
+    tasks = {}        # uid -> Task
+    order = []        # uids in insertion order, like the combined list
+    next_id = 0
+
+    def change(uid, patch):
+        if uid[0] == "manual":
+            tasks[uid] = store.update(uid[1], patch)
+        else:
+            tasks[uid].update(patch)
+        index.upsert(uid, tasks[uid])
+
+    for step in range(ops):
+        op = rng.random()
+        if op < 0.45 or not order:
+            if rng.random() < 0.5:
+                task = store.add(random_fields(rng))
+                uid = ("manual", task.id)
+            else:
+                next_id += 1
+                task = Task.from_dict(dict(random_fields(rng), id=next_id))
+                uid = ("canvas", next_id)
+            tasks[uid] = task
+            order.append(uid)
+            index.upsert(uid, task)
+        elif op < 0.75:
+            uid = rng.choice(order)
+            fields = random_fields(rng)
+            change(uid, {k: fields[k] for k in rng.sample(list(fields), rng.randint(1, 3))})
+        elif op < 0.85:
+            change(rng.choice(order), {"completed": True})
+        else:
+            uid = order.pop(rng.randrange(len(order)))
+            del tasks[uid]
+            if uid[0] == "manual":
+                store.delete(uid[1])
+            index.remove(uid)
+
+        expected = sort_tasks([tasks[u] for u in order])
+        actual = index.items()
+        if [id(t) for t in actual] != [id(t) for t in expected]:
+            # not an assert: `python -O` would skip the check and pass
+            raise AssertionError(f"index order differs from sort_tasks() at step {step}")
+
+    # what the store kept must be what the index was given
+    stored = {("manual", t.id): t for t in store.all()}
+    if set(stored) != {uid for uid in order if uid[0] == "manual"}:
+        raise AssertionError("store and index hold different manual tasks")
+    for uid, task in stored.items():
+        if task.to_dict() != tasks[uid].to_dict():
+            raise AssertionError(f"stored {uid} differs from the indexed one")
+    return len(order)
+
+
+def timing(n, seed):
+    rng = random.Random(seed)
+    records = [Task.from_dict(dict(random_fields(rng), id=i)) for i in range(n)]
+    index = TaskIndex()
+    for i, t in enumerate(records):
+        index.upsert(("manual", i), t)
+
+    new = [Task.from_dict(dict(random_fields(rng), id=n + i)) for i in range(200)]
+
+    t0 = time.perf_counter()
+    for i, t in enumerate(new):
+        index.upsert(("manual", n + i), t)
+    index_us = (time.perf_counter() - t0) / len(new) * 1e6
+
+    pool = list(records)
+    t0 = time.perf_counter()
+    for t in new[:20]:
+        pool.append(t)
+        sort_tasks(pool)
+    resort_us = (time.perf_counter() - t0) / 20 * 1e6
+
+    t0 = time.perf_counter()
+    for _ in range(200):
+        index.top(20)
+    top_us = (time.perf_counter() - t0) / 200 * 1e6
+    return index_us, resort_us, top_us
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    remaining = check(args.ops, args.seed)
+    print(f"consistency: {args.ops} random ops, index == sort_tasks() after every op ({remaining} left)")
+
+    index_us, resort_us, top_us = timing(args.tasks, args.seed)
+    print(f"{args.tasks} tasks: insert one via index {index_us:.1f} us, "
+          f"append + sort_tasks() {resort_us:.1f} us, top-20 read {top_us:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Task list encoding on a realistic inbox: bytes on the wire and encode
+time for the old jsonify() path against task_json (orjson, cached per-task
+forms), with and without a fields= projection and compression.
+
+    python benchmarks/bench_task_json.py [--canvas 1800] [--manual 200]
+
+Canvas tasks carry description HTML of a few KB like real assignments do.
+Every encoding is checked to parse back to the same list first.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_json  # noqa: E402
+from task_json import encode_tasks, parse_fields  # noqa: E402
+from task_model import Task  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# What the inbox list actually renders
+LIST_FIELDS = "id,title,due_date,category,priority,completed,origin,html_url"
+
+WORDS = ("read", "chapter", "answer", "questions", "submit", "pdf", "rubric", "points", "late",
+         "policy", "group", "discussion", "reflection", "citations", "APA", "draft", "peer", "review")
+
+
+def description(rng):
+    paragraphs = []
+    for _ in range(rng.randint(3, 12)):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+        paragraphs.append(f'<p style="margin: 0 0 1em;">{words.capitalize()}.</p>')
+    paragraphs.append('<ul><li>Due at 11:59pm</li><li>Submit on Canvas — no emailed work</li></ul>')
+    return "\n".join(paragraphs)
+
+
+def inbox(n_canvas, n_manual, seed):
+    rng = random.Random(seed)
+    tasks = []
+    for i in range(n_canvas):
+        course = 70000 + i % 6
+        tasks.append(Task.from_dict({
+            "id": 900000 + i,
+            "title": f"{rng.choice(['Homework', 'Quiz', 'Reading', 'Lab', 'Essay'])} {i}",
+            "description": description(rng),
+            "due_date": f"2030-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "category": "Assignments",
+            "priority": 1,
+            "group_weight": rng.choice([10, 20, 25, 40]),
+            "html_url": f"https://american.instructure.com/courses/{course}/assignments/{900000 + i}",
+            "course_id": course,
+            "course_name": f"Course {course}",
+        }, "canvas"))
+    for i in range(n_manual):
+        tasks.append(Task.from_dict({
+            "id": i + 1,
+            "title": rng.choice(["Update resume", "Gym", "Email advisor", "Laundry"]),
+            "description": rng.choice([None, "Fix bullet points for internship"]),
+            "due_date": rng.choice([None, "2030-02-01", "2030-02-01T10:00:00"]),
+            "category": rng.choice(["Career", "Health", "Fun", "General"]),
+            "priority": rng.randint(1, 5),
+            "completed": rng.random() < 0.2,
+        }, "manual"))
+    return tasks
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def clear_cache(tasks):
+    for t in tasks:
+        t._json = None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--canvas", type=int, default=1800)
+    parser.add_argument("--manual", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tasks = inbox(args.canvas, args.manual, args.seed)
+    app = Flask(__name__)
+    fields = parse_fields(LIST_FIELDS)
+
+    with app.app_context():
+        old_s, old = best_of(lambda: jsonify([t.to_dict() for t in tasks]).get_data())
+
+    def cold(fields=None):
+        clear_cache(tasks)
+        return encode_tasks(tasks, fields)
+
+    cold_s, new = best_of(cold)
+    warm_s, _ = best_of(lambda: encode_tasks(tasks))
+    proj_cold_s, projected = best_of(lambda: cold(fields))
+    proj_warm_s, _ = best_of(lambda: encode_tasks(tasks, fields))
+
+    fast = task_json.orjson
+    task_json.orjson = None     # the fallback path, for comparison
+    stdlib_s, stdlib_out = best_of(cold)
+    task_json.orjson = fast
+
+    reference = json.loads(old)
+    # not asserts: `python -O` would skip them
+    if json.loads(new) != reference or json.loads(stdlib_out) != reference:
+        raise AssertionError("encoded tasks differ from the old json.dumps output")
+    if json.loads(projected) != [{k: t[k] for k in fields if k in t} for t in reference]:
+        raise AssertionError("fields= projection differs from the full output")
+
+    print(f"{len(tasks)} tasks ({args.canvas} Canvas with HTML descriptions, {args.manual} manual); "
+          f"encoder: {'orjson' if fast else 'json (orjson not installed)'}")
+    print("\nencode time (best of 5)")
+    print(f"  jsonify (before)              {old_s * 1000:8.2f} ms")
+    print(f"  task_json, stdlib, cold       {stdlib_s * 1000:8.2f} ms")
+    print(f"  task_json, cold               {cold_s * 1000:8.2f} ms")
+    print(f"  task_json, warm (cached)      {warm_s * 1000:8.2f} ms   {old_s / warm_s:6.1f}x faster")
+    print(f"  fields=..., cold              {proj_cold_s * 1000:8.2f} ms")
+    print(f"  fields=..., warm              {proj_warm_s * 1000:8.2f} ms   {old_s / proj_warm_s:6.1f}x faster")
+
+    print(f"\nbytes (fields = {LIST_FIELDS})")
+    rows = [("jsonify (before)", old), ("all fields", new), ("fields=", projected)]
+    for name, body in rows:
+        gz_s, gz = best_of(lambda: gzip.compress(body, 6), 3)
+        line = (f"  {name:<18} raw {len(body) / 1024:8.1f} KB   gzip {len(gz) / 1024:7.1f} KB "
+                f"({gz_s * 1000:5.1f} ms)")
+        if brotli is not None:
+            br_s, br = best_of(lambda: brotli.compress(body, quality=4), 3)
+            line += f"   br {len(br) / 1024:7.1f} KB ({br_s * 1000:5.1f} ms)"
+        print(line)
+    with_br = brotli.compress(projected, quality=4) if brotli is not None else gzip.compress(projected, 6)
+    print(f"\n  before -> fields= + {'br' if brotli is not None else 'gzip'}: "
+          f"{len(old) / 1024:.0f} KB -> {len(with_br) / 1024:.1f} KB "
+          f"({100 * (1 - len(with_br) / len(old)):.1f}% fewer bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: plain task dicts vs Task records on 100k tasks.
+
+Memory is measured with tracemalloc. Throughput is one /all-style pass:
+the dict path copies every task, re-parses due dates to drop past ones and
+sorts with sort_tasks() (strptime in the key); the Task path does the same
+on records whose dates were parsed once at creation.
+
+    python benchmarks/bench_task_model.py [--tasks 100000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from category_task_scheduler import sort_tasks  # noqa: E402
+from task_estimation import parse_due  # noqa: E402
+from task_model import Task  # noqa: E402
+
+CATEGORIES = ["Assignments", "Career", "Health", "Fun", "General"]
+
+
+def make_dicts(n, seed=7):
+    rng = random.Random(seed)
+    today = datetime.now()
+    out = []
+    for i in range(n):
+        due = (today + timedelta(days=rng.randint(-10, 60))).strftime("%Y-%m-%d")
+        t = {
+            "id": i,
+            "title": f"Task {i}",
+            "description": "Read the chapter and write a summary.",
+            "due_date": due,
+            "category": rng.choice(CATEGORIES),
+            "priority": rng.randint(1, 5),
+            "completed": False,
+            "origin": "manual",
+        }
+        if i % 3 == 0:
+            t.update({"origin": "canvas", "group_weight": 25, "html_url": f"https://canvas/a/{i}"})
+        out.append(t)
+    return out
+
+
+def measure_memory(build):
+    gc.collect()
+    tracemalloc.start()
+    objs = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objs, size
+
+
+def dict_pass(raw):
+    now = datetime.now()
+    combined = [dict(t) for t in raw]
+    upcoming = []
+    for t in combined:
+        due = parse_due(t.get("due_date"))
+        if not due or due >= now:
+            upcoming.append(t)
+    return sort_tasks(upcoming)
+
+
+def task_pass(records):
+    now = datetime.now()
+    upcoming = [t for t in records if not t.due or t.due >= now]
+    return sort_tasks(upcoming)
+
+
+def best_of(fn, arg, runs=3):
+    best = None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(arg)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=100000)
+    args = parser.parse_args()
+
+    raw, dict_bytes = measure_memory(lambda: make_dicts(args.tasks))
+    records, task_bytes = measure_memory(lambda: [Task.from_dict(t) for t in make_dicts(args.tasks)])
+
+    fresh = make_dicts(args.tasks)
+    t0 = time.perf_counter()
+    records = [Task.from_dict(t) for t in fresh]
+    build_s = time.perf_counter() - t0
+
+    if [t["id"] for t in dict_pass(raw)] != [t.id for t in task_pass(records)]:
+        raise AssertionError("Task records sort differently from the dicts")
+
+    print(f"{args.tasks} tasks")
+    print(f"{'':28} {'dicts':>10} {'Task':>10}")
+    print(f"{'memory (MB)':28} {dict_bytes / 1e6:10.1f} {task_bytes / 1e6:10.1f}")
+    print(f"{'filter + sort pass (ms)':28} {best_of(dict_pass, raw) * 1000:10.1f} "
+          f"{best_of(task_pass, records) * 1000:10.1f}")
+    print(f"{'one-time Task creation (ms)':28} {'':>10} {build_s * 1000:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Local stand-in for the Canvas endpoints the backend uses, for offline
+development and load tests:
+
+    GET /api/v1/courses?enrollment_state=active
+    GET /api/v1/courses/<id>/assignment_groups
+    GET /api/v1/courses/<id>/assignments
+
+    python benchmarks/fake_canvas.py [--port 8900] [--courses 6] [--assignments 300]
+                                     [--latency 0.08] [--error-rate 0.01] [--throttle-rate 0.02]
+    CANVAS_BASE_URL=http://127.0.0.1:8900/api/v1 python api.py
+
+Data comes from synthetic.py (seeded, any size). Lists are paginated the
+Canvas way: per_page (default 10, max 100) and page, with a Link header
+carrying current/next/prev/first/last ("last" can be left out, as Canvas
+does for expensive lists). Every response carries X-Request-Cost and
+X-Rate-Limit-Remaining like Canvas's leaky-bucket throttling. With
+--rate-limit set, requests that would overflow the bucket get Canvas's
+403 "Rate Limit Exceeded".
+
+Faults: --latency/--jitter per request, --error-rate random 500s, and
+--throttle-rate random 429s with Retry-After. --churn edits that many
+assignments a minute (new name and updated_at), for incremental syncs.
+
+In-process use (benchmarks):
+
+    canvas = FakeCanvas(courses=1, assignments=2000, latency=0.3).start()
+    ... canvas.base_url ... canvas.stats ...
+    canvas.stop()
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import COURSES, Synthetic  # noqa: E402
+
+API_PREFIX = "/api/v1"
+DEFAULT_PER_PAGE = 10   # Canvas's defaults
+MAX_PER_PAGE = 100
+
+
+class FakeCanvas:
+    """
+    The fake Canvas: data, fault injection and stats, served by a
+    ThreadingHTTPServer (keep-alive, one thread per connection).
+    """
+
+    def __init__(self, courses=6, assignments=300, groups=4, seed=1, latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, rate_limit=0.0, leak_rate=10.0, request_cost=1.0,
+                 last_link=True, token=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit        # bucket size; 0 = never throttle
+        self.leak_rate = leak_rate          # bucket units drained per second
+        self.request_cost = request_cost
+        self.last_link = last_link
+        self.token = token
+
+        self.gen = Synthetic(seed)
+        self._rng = random.Random(f"{seed}-faults")
+        self._lock = threading.Lock()
+        self._bucket = 0.0
+        self._bucket_at = time.monotonic()
+        self._pages = {}    # (path, per_page, page) -> (body, links); dropped on edits
+        self.stats = Counter()
+        self._build(courses, assignments, groups, seed)
+        self.server = None
+
+    # ---------- data ---------- #
+
+    def _build(self, n_courses, n_assignments, n_groups, seed):
+        rng = random.Random(f"{seed}-canvas")
+        self.courses = []
+        self.groups = {}
+        self.assignments = {}
+        for c in range(n_courses):
+            cid = 70001 + c
+            name = COURSES[c % len(COURSES)] + (f" ({c // len(COURSES) + 1})" if c >= len(COURSES) else "")
+            self.courses.append({"id": cid, "name": name, "course_code": f"C{cid}",
+                                 "workflow_state": "available"})
+            weights = [rng.choice([10, 15, 20, 25, 30, 40]) for _ in range(n_groups)]
+            self.groups[cid] = [
+                {"id": cid * 100 + g, "name": f"Group {g + 1}", "group_weight": w, "position": g + 1}
+                for g, w in enumerate(weights)
+            ]
+            group_ids = [g["id"] for g in self.groups[cid]]
+            self.assignments[cid] = [
+                self.gen.raw_assignment(rng, cid, group_ids, c * n_assignments + i)
+                for i in range(n_assignments)
+            ]
+        # one course you can't see yet: listed, but access-restricted (the client skips it)
+        self.courses.append({"id": 79999, "name": "Next Term Seminar", "access_restricted_by_date": True})
+
+    def churn(self, n):
+        """Edit n random assignments (new name, bumped updated_at)."""
+        now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+        everything = [a for items in self.assignments.values() for a in items]
+        with self._lock:
+            for a in self._rng.sample(everything, min(n, len(everything))):
+                a["name"] = a["name"].split(" (edited")[0] + f" (edited {now})"
+                a["updated_at"] = now
+            self._pages.clear()
+            self.stats["edits"] += n
+
+    def items_for(self, path):
+        """The full list behind an API path, or None for unknown paths."""
+        parts = path[len(API_PREFIX):].strip("/").split("/")
+        if parts == ["courses"]:
+            return self.courses
+        if len(parts) == 3 and parts[0] == "courses" and parts[1].isdigit():
+            cid = int(parts[1])
+            if parts[2] == "assignment_groups":
+                return self.groups.get(cid)
+            if parts[2] == "assignments":
+                return self.assignments.get(cid)
+        return None
+
+    def page(self, host, path, per_page, page):
+        """(JSON body bytes, Link header) for one page, cached until the next edit."""
+        key = (path, per_page, page)
+        cached = self._pages.get(key)
+        if cached is not None:
+            return cached
+        items = self.items_for(path)
+        last = max(1, -(-len(items) // per_page))
+        chunk = items[(page - 1) * per_page: page * per_page]
+
+        def url(p):
+            return f"http://{host}{path}?" + urlencode({"page": p, "per_page": per_page})
+
+        links = [f'<{url(page)}>; rel="current"']
+        if page < last:
+            links.append(f'<{url(page + 1)}>; rel="next"')
+        if page > 1:
+            links.append(f'<{url(page - 1)}>; rel="prev"')
+        links.append(f'<{url(1)}>; rel="first"')
+        if self.last_link:
+            links.append(f'<{url(last)}>; rel="last"')
+        out = self._pages[key] = (json.dumps(chunk).encode(), ",".join(links))
+        return out
+
+    # ---------- faults ---------- #
+
+    def charge(self):
+        """
+        Leaky bucket, like Canvas: every request adds its cost, the bucket
+        drains at leak_rate per second. Returns (allowed, remaining).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._bucket = max(0.0, self._bucket - (now - self._bucket_at) * self.leak_rate)
+            self._bucket_at = now
+            quota = self.rate_limit or 700.0
+            if self.rate_limit and self._bucket + self.request_cost > quota:
+                return False, quota - self._bucket
+            self._bucket += self.request_cost
+            return True, quota - self._bucket
+
+    def fault(self):
+        """None, or the (status, body, extra headers) to fail this request with."""
+        r = self._rng.random()
+        if r < self.error_rate:
+            return 500, {"errors": [{"message": "An error occurred."}]}, {}
+        if r < self.error_rate + self.throttle_rate:
+            return 429, {"errors": [{"message": "Too Many Requests"}]}, {"Retry-After": "1"}
+        return None
+
+    # ---------- server ---------- #
+
+    def handler(self):
+        canvas = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like real Canvas
+
+            def send(self, status, body, headers=()):
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in dict(headers).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                canvas.stats[status] += 1
+
+            def do_GET(self):
+                canvas.stats["requests"] += 1
+                if canvas.latency or canvas.jitter:
+                    time.sleep(max(0.0, canvas.latency + canvas._rng.uniform(-canvas.jitter, canvas.jitter)))
+
+                if canvas.token and self.headers.get("Authorization") != f"Bearer {canvas.token}":
+                    self.send(401, {"errors": [{"message": "Invalid access token."}]})
+                    return
+
+                allowed, remaining = canvas.charge()
+                rate_headers = {"X-Request-Cost": f"{canvas.request_cost:.4f}",
+                                "X-Rate-Limit-Remaining": f"{remaining:.4f}"}
+                if not allowed:
+                    self.send(403, b"403 Forbidden (Rate Limit Exceeded)", rate_headers)
+                    return
+                failure = canvas.fault()
+                if failure is not None:
+                    status, body, headers = failure
+                    self.send(status, body, {**rate_headers, **headers})
+                    return
+
+                url = urlparse(self.path)
+                if canvas.items_for(url.path) is None:
+                    self.send(404, {"errors": [{"message": "The specified resource does not exist."}]},
+                              rate_headers)
+                    return
+                query = parse_qs(url.query)
+                try:
+                    per_page = min(MAX_PER_PAGE, max(1, int(query.get("per_page", [DEFAULT_PER_PAGE])[0])))
+                    page = max(1, int(query.get("page", ["1"])[0]))
+                except ValueError:
+                    self.send(400, {"errors": [{"message": "invalid page or per_page"}]}, rate_headers)
+                    return
+                body, links = canvas.page(self.headers.get("Host", "localhost"), url.path, per_page, page)
+                self.send(200, body, {**rate_headers, "Link": links})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="fake-canvas", daemon=True).start()
+        return self
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--assignments", type=int, default=300, help="per course")
+    parser.add_argument("--groups", type=int, default=4, help="assignment groups per course")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds on top of --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that get a 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests that get a 429")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="leaky-bucket size (Canvas uses 700); 0 = never 403")
+    parser.add_argument("--leak-rate", type=float, default=10.0, help="bucket units drained per second")
+    parser.add_argument("--request-cost", type=float, default=1.0)
+    parser.add_argument("--no-last-link", action="store_true", help='leave rel="last" out of Link headers')
+    parser.add_argument("--token", help="require this bearer token")
+    parser.add_argument("--churn", type=int, default=0, help="assignments edited per minute")
+    args = parser.parse_args()
+
+    canvas = FakeCanvas(args.courses, args.assignments, args.groups, args.seed, args.latency, args.jitter,
+                        args.error_rate, args.throttle_rate, args.rate_limit, args.leak_rate,
+                        args.request_cost, not args.no_last_link, args.token)
+    canvas.start(args.host, args.port)
+    total = sum(len(a) for a in canvas.assignments.values())
+    print(f"fake Canvas: {len(canvas.courses) - 1} courses, {total} assignments")
+    print(f"  CANVAS_BASE_URL={canvas.base_url} python api.py")
+    try:
+        while True:
+            time.sleep(60)
+            if args.churn:
+                canvas.churn(args.churn)
+            print("  " + ", ".join(f"{k}: {v}" for k, v in sorted(canvas.stats.items(), key=str)))
+    except KeyboardInterrupt:
+        canvas.stop()
+
+
+if __name__ == "__main__":
+    main()
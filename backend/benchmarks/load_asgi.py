@@ -0,0 +1,198 @@
+"""
+Load test: the sync Flask server (what `python api.py` runs, minus the
+debugger) against the ASGI app under uvicorn, with a fake Canvas
+(fake_canvas.py) that answers every request after --latency seconds.
+
+    python benchmarks/load_asgi.py [--latency 0.3] [--concurrency 64] [--seconds 10]
+
+Each server runs in its own process on a fresh database. The client keeps
+--concurrency requests in flight for --seconds, spread over --users users:
+mostly /all and /summary reads, some POST /tasks, and a share of POST
+/canvas/refresh (these wait on the stub Canvas). Before the load, the
+JSON from a handful of routes is compared between the two servers.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from fake_canvas import FakeCanvas
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --server name -> (CANVAS_CLIENT, python args); "sync" is the threaded Flask server of `python api.py`
+SERVERS = {
+    "sync": (
+        "sync",
+        ["-c", "import logging, sys, api; from werkzeug.serving import run_simple; "
+               "logging.getLogger('werkzeug').setLevel(logging.WARNING); "
+               "run_simple('127.0.0.1', int(sys.argv[1]), api.app, threaded=True)"],
+    ),
+    "asgi": (
+        "async",
+        ["-m", "uvicorn", "asgi:application", "--host", "127.0.0.1", "--log-level", "warning", "--port"],
+    ),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(name, canvas_url, db, **env):
+    """Backend `name` in a subprocess, on a free port; extra env vars override the defaults."""
+    client, argv = SERVERS[name]
+    port = free_port()
+    env = dict(
+        os.environ,
+        CANVAS_CLIENT=client,
+        CANVAS_BASE_URL=canvas_url,
+        CANVAS_SYNC_MODE="full",
+        CANVAS_SYNC_INTERVAL="3600",
+        MANAGEABLE_DB=db,
+        **env,
+    )
+    proc = subprocess.Popen([sys.executable, *argv, str(port)], cwd=BACKEND, env=env)
+    return proc, f"http://127.0.0.1:{port}"
+
+
+async def wait_up(session, base, timeout=20):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with session.get(f"{base}/canvas/status") as r:
+                if r.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{base} did not come up")
+        await asyncio.sleep(0.1)
+
+
+async def shapes(session, base):
+    """What the frontend would see from a few routes (minus volatile values)."""
+    async with session.post(f"{base}/canvas/refresh") as r:
+        status = await r.json()
+        refresh = (r.status, sorted(status))
+    async with session.post(f"{base}/tasks", json={"title": "essay", "due_date": "2030-01-02"}) as r:
+        added = (r.status, len(await r.json()))
+    async with session.get(f"{base}/all?limit=5") as r:
+        page = [dict(t, id=None) for t in await r.json()]
+        all_page = (r.status, page, "X-Next-Cursor" in r.headers)
+    async with session.get(f"{base}/summary") as r:
+        summary = await r.json()
+        summary_keys = (r.status, sorted(summary), summary["tasks_total"])
+    async with session.post(f"{base}/canvas/refresh", headers={"X-User": "nobody"}) as r:
+        no_account = (r.status, (await r.json())["last_error"])
+    return refresh, added, all_page, summary_keys, no_account
+
+
+async def load(session, base, args):
+    rng = random.Random(args.seed)
+    users = [f"user{i}@example.edu" for i in range(args.users)]
+    stats = {}
+    stop_at = time.monotonic() + args.seconds
+
+    async def one():
+        r = rng.random()
+        user = rng.choice(users)
+        if r < args.refresh_share:
+            route, method, url, body, user = "POST /canvas/refresh", "POST", "/canvas/refresh", None, None
+        elif r < args.refresh_share + 0.1:
+            route, method, url = "POST /tasks", "POST", "/tasks"
+            body = {"title": "hw", "due_date": "2030-01-0%d" % rng.randint(1, 9), "category": "Health"}
+        elif r < args.refresh_share + 0.5:
+            route, method, url, body = "GET /all", "GET", "/all?limit=50", None
+        else:
+            route, method, url, body = "GET /summary", "GET", "/summary", None
+        headers = {"X-User": user} if user else {}
+        t0 = time.perf_counter()
+        async with session.request(method, base + url, json=body, headers=headers) as resp:
+            await resp.read()
+            code = resp.status
+        entry = stats.setdefault(route, {"latencies": [], "codes": {}})
+        entry["latencies"].append(time.perf_counter() - t0)
+        entry["codes"][code] = entry["codes"].get(code, 0) + 1
+
+    async def worker():
+        while time.monotonic() < stop_at:
+            await one()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return stats, time.perf_counter() - t0
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+async def run_server(name, canvas, args):
+    db = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    proc, base = start_server(name, canvas.base_url, db, CANVAS_COURSE_IDS=str(canvas.courses[0]["id"]))
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        timeout = aiohttp.ClientTimeout(total=120)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            await wait_up(session, base)
+            seen = await shapes(session, base)
+            stats, elapsed = await load(session, base, args)
+    finally:
+        proc.terminate()
+        proc.wait()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db + suffix):
+                os.unlink(db + suffix)
+    return seen, stats, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.3, help="stub Canvas seconds per request")
+    parser.add_argument("--assignments", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--refresh-share", type=float, default=0.2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    canvas = FakeCanvas(courses=1, assignments=args.assignments, seed=args.seed, latency=args.latency).start()
+    print(f"fake Canvas: {args.assignments} assignments, {args.latency * 1000:.0f} ms per request; "
+          f"{args.concurrency} clients for {args.seconds:.0f}s")
+
+    results = {}
+    for name in SERVERS:
+        results[name] = asyncio.run(run_server(name, canvas, args))
+    canvas.stop()
+
+    shapes_seen = [seen for seen, _, _ in results.values()]
+    if any(s != shapes_seen[0] for s in shapes_seen):
+        print("FAILED: servers answered differently:")
+        for name, (seen, _, _) in results.items():
+            print(f"  {name}: {seen}")
+        sys.exit(1)
+    print("responses: identical JSON from both servers")
+
+    for name, (_, stats, elapsed) in results.items():
+        total = sum(len(e["latencies"]) for e in stats.values())
+        print(f"\n{name}: {total / elapsed:.0f} req/s ({total} requests)")
+        for route, entry in sorted(stats.items()):
+            lat = entry["latencies"]
+            print(f"  {route:<22} {len(lat):>6}  p50 {percentile(lat, 50) * 1000:7.1f} ms  "
+                  f"p99 {percentile(lat, 99) * 1000:7.1f} ms  {entry['codes']}")
+
+
+if __name__ == "__main__":
+    main()
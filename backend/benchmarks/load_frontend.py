@@ -0,0 +1,275 @@
+"""
+End-to-end load test: replays what the frontend does against a backend
+fed by the fake Canvas, and reports throughput and latency percentiles.
+
+    python benchmarks/load_frontend.py [--server asgi] [--clients 32] [--seconds 20]
+                                       [--courses 6] [--assignments 300] [--canvas-latency 0.05]
+    python benchmarks/load_frontend.py --url http://127.0.0.1:5000     # a server you started
+
+Without --url, a fake Canvas (fake_canvas.py) and a backend process
+(--server sync|asgi, fresh database, CANVAS_BASE_URL pointed at the fake)
+are started first. The store gets --manual tasks and one Canvas refresh.
+
+Each client then loops over page actions picked by --mix weights,
+issuing the same requests the pages do:
+  home        GET /all, /summary and /motivation at once (home/page.js load)
+  tasks       GET /all (tasks/page.js load)
+  add         POST /tasks, then GET /all
+  toggle      PATCH /tasks/<id> {completed}, then GET /summary (home, manual task)
+  toggle_canvas  GET /summary (home, Canvas task: toggled locally)
+  toggle_list PATCH /tasks/<id> {completed} (tasks page)
+Task ids come from the client's last /all, like in the browser.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import aiohttp
+
+from fake_canvas import FakeCanvas
+from load_asgi import SERVERS, percentile, start_server, wait_up
+from synthetic import Synthetic
+
+DEFAULT_MIX = "home=35,tasks=15,add=10,toggle=20,toggle_canvas=10,toggle_list=10"
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r} (known: {', '.join(ACTIONS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Client:
+    """One browser tab: its last task list, and the requests it makes."""
+
+    def __init__(self, session, base, stats, rng, gen, user=None):
+        self.session = session
+        self.base = base
+        self.stats = stats
+        self.rng = rng
+        self.gen = gen
+        self.headers = {"X-User": user} if user else {}
+        self.tasks = []
+
+    async def request(self, route, method, path, body=None):
+        t0 = time.perf_counter()
+        try:
+            async with self.session.request(method, self.base + path, json=body, headers=self.headers) as r:
+                data = await r.read()
+                code = r.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            data, code = None, type(e).__name__
+        entry = self.stats.setdefault(route, {"latencies": [], "codes": {}})
+        entry["latencies"].append(time.perf_counter() - t0)
+        entry["codes"][code] = entry["codes"].get(code, 0) + 1
+        return code, data
+
+    async def get_all(self):
+        code, data = await self.request("GET /all", "GET", "/all")
+        if code == 200:
+            self.tasks = json.loads(data)
+
+    def pick(self, origin):
+        choices = [t for t in self.tasks if (t.get("origin") == "manual") == (origin == "manual")]
+        return self.rng.choice(choices) if choices else None
+
+    async def toggle(self, task):
+        code, data = await self.request("PATCH /tasks/<id>", "PATCH", f"/tasks/{task['id']}",
+                                        {"completed": not task.get("completed")})
+        if code == 200:
+            task.update(json.loads(data))
+
+    # ---------- page actions ---------- #
+
+    async def home(self):
+        await asyncio.gather(self.get_all(), self.request("GET /summary", "GET", "/summary"),
+                             self.request("GET /motivation", "GET", "/motivation"))
+
+    async def tasks_page(self):
+        await self.get_all()
+
+    async def add(self):
+        data = self.gen.manual_dict(self.rng)
+        body = {
+            "title": data["title"],
+            "description": data["description"] or "",
+            "due_date": data["due_date"] or "",
+            "priority": data["priority"],
+            "category": data["category"] or "Assignments",
+        }
+        code, _ = await self.request("POST /tasks", "POST", "/tasks", body)
+        if code == 200:
+            await self.get_all()
+
+    async def toggle_home(self):
+        task = self.pick("manual")
+        if task is not None:
+            await self.toggle(task)
+        await self.request("GET /summary", "GET", "/summary")
+
+    async def toggle_canvas(self):
+        await self.request("GET /summary", "GET", "/summary")
+
+    async def toggle_list(self):
+        task = self.pick("manual")
+        if task is not None:
+            await self.toggle(task)
+
+
+ACTIONS = {
+    "home": Client.home,
+    "tasks": Client.tasks_page,
+    "add": Client.add,
+    "toggle": Client.toggle_home,
+    "toggle_canvas": Client.toggle_canvas,
+    "toggle_list": Client.toggle_list,
+}
+
+
+async def seed(session, base, gen, n_manual, users):
+    """Manual tasks for every user, then one Canvas sync, before the clock starts."""
+    rng = random.Random(f"{gen.seed}-seed")
+    for user in users:
+        headers = {"X-User": user} if user else {}
+        tasks = [gen.manual_dict(rng) for _ in range(n_manual)]
+        async with session.post(f"{base}/tasks/batch?return=minimal", json=tasks, headers=headers) as r:
+            if r.status != 200:
+                raise RuntimeError(f"seeding tasks failed: {r.status} {await r.text()}")
+    async with session.post(f"{base}/canvas/refresh") as r:
+        status = await r.json()
+        print(f"Canvas refresh: {r.status}, {status.get('tasks')} tasks"
+              + (f", last error: {status['last_error']}" if status.get("last_error") else ""))
+
+
+async def run(base, args, gen):
+    mix = args.mix
+    names, weights = list(mix), list(mix.values())
+    users = [None] if args.users <= 1 else [f"user{i}@example.edu" for i in range(args.users)]
+    stats, actions = {}, {}
+    connector = aiohttp.TCPConnector(limit=args.clients)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        await wait_up(session, base)
+        if not args.no_seed:
+            await seed(session, base, gen, args.manual, users)
+
+        clients = [Client(session, base, stats, random.Random(f"{args.seed}-{i}"), gen, users[i % len(users)])
+                   for i in range(args.clients)]
+        await asyncio.gather(*(c.home() for c in clients))   # everyone starts on the home page
+        stats.clear()
+        stop_at = time.monotonic() + args.seconds
+
+        async def loop(client):
+            while time.monotonic() < stop_at:
+                name = client.rng.choices(names, weights)[0]
+                t0 = time.perf_counter()
+                await ACTIONS[name](client)
+                actions.setdefault(name, []).append(time.perf_counter() - t0)
+                if args.think:
+                    await asyncio.sleep(client.rng.expovariate(1 / args.think))
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(loop(c) for c in clients))
+        return stats, actions, time.perf_counter() - t0
+
+
+def report(stats, actions, elapsed):
+    def row(name, lat, extra=""):
+        return (f"  {name:<18} {len(lat):>7}  p50 {percentile(lat, 50) * 1000:8.1f}  "
+                f"p90 {percentile(lat, 90) * 1000:8.1f}  p99 {percentile(lat, 99) * 1000:8.1f}  "
+                f"max {max(lat) * 1000:8.1f} ms  {extra}")
+
+    total = sum(len(e["latencies"]) for e in stats.values())
+    failed = sum(n for e in stats.values() for code, n in e["codes"].items()
+                 if not isinstance(code, int) or code >= 400)
+    n_actions = sum(len(v) for v in actions.values())
+    print(f"\n{total / elapsed:.1f} req/s, {n_actions / elapsed:.1f} page actions/s "
+          f"({total} requests in {elapsed:.1f}s, {failed} failed)")
+    print("\nrequests")
+    for route, entry in sorted(stats.items()):
+        print(row(route, entry["latencies"], entry["codes"]))
+    print("\npage actions")
+    for name, lat in sorted(actions.items()):
+        print(row(name, lat))
+    return {
+        "elapsed": elapsed,
+        "requests": total,
+        "failed": failed,
+        "routes": {route: {"count": len(e["latencies"]), "codes": {str(k): v for k, v in e["codes"].items()},
+                           **{f"p{q}_ms": percentile(e["latencies"], q) * 1000 for q in (50, 90, 99)}}
+                   for route, e in stats.items()},
+        "actions": {name: {"count": len(lat), **{f"p{q}_ms": percentile(lat, q) * 1000 for q in (50, 90, 99)}}
+                    for name, lat in actions.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="load this running backend instead of starting one")
+    parser.add_argument("--server", choices=list(SERVERS), default="asgi")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent browser tabs")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--think", type=float, default=0.0, help="mean seconds between a tab's actions")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--users", type=int, default=1,
+                        help="X-User accounts to spread tabs over (1 = no header, like the frontend)")
+    parser.add_argument("--manual", type=int, default=200, help="manual tasks seeded per user")
+    parser.add_argument("--no-seed", action="store_true")
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--assignments", type=int, default=300, help="per course")
+    parser.add_argument("--canvas-latency", type=float, default=0.05)
+    parser.add_argument("--canvas-error-rate", type=float, default=0.0)
+    parser.add_argument("--canvas-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the results as JSON here")
+    args = parser.parse_args()
+
+    gen = Synthetic(args.seed)
+    canvas = proc = db = None
+    if args.url:
+        base = args.url.rstrip("/")
+    else:
+        canvas = FakeCanvas(args.courses, args.assignments, seed=args.seed, latency=args.canvas_latency,
+                            error_rate=args.canvas_error_rate, throttle_rate=args.canvas_throttle_rate).start()
+        db = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        proc, base = start_server(args.server, canvas.base_url, db)
+        print(f"{args.server} backend on {base}; fake Canvas on {canvas.base_url} "
+              f"({args.courses} courses x {args.assignments} assignments, "
+              f"{args.canvas_latency * 1000:.0f} ms per request)")
+    print(f"{args.clients} clients for {args.seconds:.0f}s, mix "
+          + ", ".join(f"{k}={v:g}" for k, v in args.mix.items()))
+
+    try:
+        stats, actions, elapsed = asyncio.run(run(base, args, gen))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(db + suffix):
+                    os.unlink(db + suffix)
+        if canvas is not None:
+            canvas.stop()
+
+    results = report(stats, actions, elapsed)
+    if canvas is not None:
+        print("\nfake Canvas: " + ", ".join(f"{k}: {v}" for k, v in sorted(canvas.stats.items(), key=str)))
+    if args.out:
+        results["args"] = {k: v for k, v in vars(args).items() if k != "mix"}
+        results["args"]["mix"] = args.mix
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=1)
+        print(f"results -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
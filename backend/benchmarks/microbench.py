@@ -0,0 +1,249 @@
+"""
+Microbenchmarks for the estimation / sort / schedule hot paths and the
+routes built on them, at several inbox sizes, with a regression check.
+
+    python benchmarks/microbench.py [--sizes 100,10000,100000] [--rules 2000]
+                                    [--repeat 5] [--only summary]
+    python benchmarks/microbench.py --save-baseline      # record a new baseline
+
+Data comes from synthetic.py (seeded: same tasks and keyword rules every
+run). Functions are timed over the whole task list; routes go through the
+Flask test client against an in-memory store and a Canvas snapshot that
+never touches the network.
+
+Results (best and median ms per benchmark and size) are written to --out.
+When --baseline exists, every result is compared to it, and the script
+exits 1 if one got slower than baseline * (1 + --threshold) by more than
+--min-delta-ms. Baselines are per machine: record one before a change,
+then run again after it.
+"""
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+# Throwaway store, and no Canvas mirror on disk
+os.environ.setdefault("MANAGEABLE_DB", ":memory:")
+os.environ.setdefault("CANVAS_SYNC_MODE", "full")
+
+import api  # noqa: E402
+import task_estimation  # noqa: E402
+from canvas_sync import CanvasSync  # noqa: E402
+from category_task_scheduler import build_schedule, compute_focus_points, sort_tasks  # noqa: E402
+from synthetic import Synthetic  # noqa: E402
+from task_estimation import estimate_batch, estimate_cache, estimate_minutes, pert_estimate_from_likely  # noqa: E402
+from task_store import TaskStore  # noqa: E402
+from user_state import UserRegistry  # noqa: E402
+
+RESULTS_DIR = os.path.join(HERE, "results")
+LIST_FIELDS = "id,title,due_date,category,priority,completed,origin,html_url"
+
+
+def timeit(fn, setup=None, repeat=5, budget=None):
+    """
+    Run setup() (untimed) then fn(), `repeat` times; per-run seconds.
+    Stops early (after at least two runs) once `budget` seconds are spent.
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+        if budget is not None and len(runs) >= 2 and sum(runs) > budget:
+            break
+    return runs
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+
+    def wanted(self, name):
+        return not self.args.only or any(fnmatch.fnmatch(name, f"*{p}*") for p in self.args.only)
+
+    def bench(self, name, size, fn, setup=None, repeat=None):
+        if not self.wanted(name):
+            return
+        runs = timeit(fn, setup, repeat or self.args.repeat, self.args.budget)
+        row = {
+            "name": name,
+            "size": size,
+            "best_ms": round(min(runs) * 1000, 4),
+            "median_ms": round(statistics.median(runs) * 1000, 4),
+            "runs": len(runs),
+        }
+        self.results.append(row)
+        print(f"  {name:<34} {row['best_ms']:10.2f} ms  (median {row['median_ms']:.2f}, {len(runs)} runs)")
+
+    # ---------- functions ---------- #
+
+    def functions(self, tasks):
+        n = len(tasks)
+        self.bench("estimate_minutes (cold cache)", n,
+                   lambda: [estimate_minutes(t) for t in tasks], setup=estimate_cache.clear)
+        self.bench("estimate_minutes", n, lambda: [estimate_minutes(t) for t in tasks])
+        self.bench("pert_estimate_from_likely", n, lambda: [pert_estimate_from_likely(t) for t in tasks])
+        self.bench("estimate_batch", n, lambda: estimate_batch(tasks))
+        self.bench("sort_tasks", n, lambda: sort_tasks(tasks))
+        self.bench("build_schedule", n, lambda: build_schedule(tasks))
+        self.bench("compute_focus_points", n, lambda: compute_focus_points(tasks))
+
+    # ---------- routes ---------- #
+
+    def load_app(self, manual, canvas):
+        """Point api at a fresh store + Canvas snapshot holding this data."""
+        store = TaskStore(":memory:")
+        store.add_many(manual)
+        sync = CanvasSync(fetch=lambda: canvas)
+        sync.replace(canvas)
+        old = api.canvas_sync
+        api.store, api.canvas_sync = store, sync
+        api.users = UserRegistry(store, sync, api.BOOT_ID)
+        old.stop()
+        # the worker's first refresh happens now, not in the middle of a timing
+        sync.start()
+        sync.refresh_now()
+        return store
+
+    def routes(self, manual, canvas):
+        n = len(manual) + len(canvas)
+        store = self.load_app(manual, canvas)
+        client = api.app.test_client()
+        manual_ids = [t.id for t in store.all()]
+        flips = iter(range(10 ** 9))
+
+        def get(path, **kw):
+            response = client.get(path, **kw)
+            if response.status_code not in (200, 304):
+                raise AssertionError(f"GET {path}: {response.status_code}")
+            return response
+
+        def touch():
+            """One small edit (what the Tasks page does all day) so memos are stale."""
+            i = next(flips)
+            task_id = manual_ids[i % len(manual_ids)]
+            client.patch(f"/tasks/{task_id}", json={"priority": 1 + i % 5})
+
+        # First requests pay for building the index, estimates and JSON forms
+        estimate_cache.clear()
+        self.bench("GET /summary (first)", n, lambda: get("/summary"), repeat=1)
+        self.bench("GET /all (first)", n, lambda: get("/all"), repeat=1)
+
+        self.bench("GET /all", n, lambda: get("/all"))
+        self.bench("GET /all?fields=&limit=50", n, lambda: get(f"/all?fields={LIST_FIELDS}&limit=50"))
+        etag = get("/all").headers["ETag"]
+        self.bench("GET /all (304)", n, lambda: get("/all", headers={"If-None-Match": etag}))
+        self.bench("GET /all after PATCH", n, lambda: get("/all"), setup=touch)
+        self.bench("GET /summary", n, lambda: get("/summary"))
+        self.bench("GET /summary after PATCH", n, lambda: get("/summary"), setup=touch)
+        self.bench("GET /summary/risk after PATCH", n, lambda: get("/summary/risk"), setup=touch)
+
+    def run(self):
+        gen = Synthetic(self.args.seed, self.args.rules)
+        with tempfile.TemporaryDirectory() as tmp:
+            task_estimation.load_keyword_rules(gen.write_rules(os.path.join(tmp, "task_keywords.json")))
+        for size in self.args.sizes:
+            print(f"\n{size} tasks, {len(gen.rules)} keyword rules")
+            self.functions(gen.tasks(size))
+            self.routes(*gen.dicts(size))
+        api.canvas_sync.stop()
+
+
+# ---------- baseline comparison ---------- #
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print each result against the baseline; returns the regressions."""
+    base = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nvs baseline from {baseline['meta'].get('timestamp', '?')} "
+          f"(fail at +{threshold:.0%} and +{min_delta_ms:g} ms)")
+    for r in results:
+        old = base.get((r["name"], r["size"]))
+        if old is None:
+            print(f"  {r['name']:<34} {r['size']:>7}  new")
+            continue
+        change = r["best_ms"] / old["best_ms"] - 1 if old["best_ms"] else 0.0
+        slower = (r["best_ms"] > old["best_ms"] * (1 + threshold)
+                  and r["best_ms"] - old["best_ms"] > min_delta_ms)
+        mark = "  REGRESSION" if slower else ""
+        print(f"  {r['name']:<34} {r['size']:>7}  {old['best_ms']:10.2f} -> {r['best_ms']:10.2f} ms "
+              f"({change:+.0%}){mark}")
+        if slower:
+            regressions.append(r)
+    return regressions
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,10000,100000",
+                        type=lambda s: [int(x) for x in s.split(",") if x])
+    parser.add_argument("--rules", type=int, default=2000, help="keyword rules to generate")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=5.0,
+                        help="seconds per benchmark before it stops repeating (min 2 runs)")
+    parser.add_argument("--only", action="append", help="run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--out", default=os.path.join(RESULTS_DIR, "microbench-latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_DIR, "microbench-baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="ignore slowdowns smaller than this (timer noise on tiny benchmarks)")
+    args = parser.parse_args()
+
+    suite = Suite(args)
+    suite.run()
+    data = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+            "seed": args.seed,
+            "rules": args.rules,
+            "sizes": args.sizes,
+            "repeat": args.repeat,
+            "budget": args.budget,
+        },
+        "results": suite.results,
+    }
+    write_json(args.out, data)
+    print(f"\nresults -> {args.out}")
+    if args.save_baseline:
+        write_json(args.baseline, data)
+        print(f"baseline -> {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline} (record one with --save-baseline)")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(suite.results, baseline, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s)")
+        sys.exit(1)
+    print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Concurrency stress test for per-user state: many reader and writer threads
+across several users, while one user keeps importing large Canvas
+batches from two threads at once (like POST /canvas racing the worker).
+
+    python benchmarks/stress_user_state.py [--users 8] [--readers 16] [--seconds 10] [--read-pause 0.001]
+                                           [--importers 2] [--db :memory:]
+
+Checks, while it runs:
+  - every view a reader gets is in sort order and its version never goes
+    backwards for that reader,
+  - a view never shows half of a Canvas import (all imported tasks carry
+    the same batch tag),
+and at the end:
+  - each user's index matches their rows in the store + Canvas snapshot,
+  - the /summary aggregates agree with a full recount.
+Reader latency is reported separately for the importing user and the rest.
+Any failed check exits with status 1.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from canvas_sync import CanvasSync  # noqa: E402
+from task_store import TaskStore  # noqa: E402
+from task_summary import is_upcoming  # noqa: E402
+from user_state import MANUAL_RANK, UserRegistry  # noqa: E402
+
+IMPORT_USER = "importer"
+
+
+def random_task(rng):
+    due = datetime.now() + timedelta(days=rng.uniform(-1, 14))
+    return {
+        "title": rng.choice(["essay", "hw", "email prof", "final project", "laundry"]),
+        "category": rng.choice(["Assignments", "Career", "Health", "Fun", None]),
+        "priority": rng.randint(1, 5),
+        "due_date": rng.choice([None, due.strftime("%Y-%m-%d"), due.strftime("%Y-%m-%dT%H:%M:%S")]),
+        "completed": False,
+    }
+
+
+def canvas_batch(tag, n, rng):
+    now = datetime.now()
+    return [
+        {
+            "id": 10_000_000 + i,
+            "title": f"{tag} assignment {i}",
+            "due_date": (now + timedelta(days=rng.randint(0, 30))).strftime("%Y-%m-%d"),
+            "category": "Assignments",
+            "priority": 1,
+            "batch": tag,
+        }
+        for i in range(n)
+    ]
+
+
+class Stress:
+    def __init__(self, args):
+        self.args = args
+        self.stop = threading.Event()
+        self.errors = []
+        self.latencies = {"importer": [], "others": []}
+        self.counts = {"reads": 0, "writes": 0, "imports": 0}
+        self._stat_lock = threading.Lock()
+
+        # a throwaway SQLite file (WAL, a connection per thread, like the
+        # server) unless --db :memory: asks for the in-memory store
+        self.db = args.db or tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        self.store = TaskStore(self.db)
+        canvas = CanvasSync(fetch=lambda: [])   # never started; imports go through replace()
+        self.users = UserRegistry(self.store, canvas, "stress", canvas_user=IMPORT_USER)
+        self.user_ids = [IMPORT_USER] + [f"user{i}@example.edu" for i in range(args.users - 1)]
+
+    def fail(self, message):
+        self.errors.append(message)
+        self.stop.set()
+
+    def record(self, kind, key, value=None):
+        with self._stat_lock:
+            self.counts[kind] += 1
+            if value is not None:
+                self.latencies[key].append(value)
+
+    # ---------- threads ---------- #
+
+    def reader(self, seed):
+        rng = random.Random(seed)
+        seen = {}
+        while not self.stop.is_set():
+            user = rng.choice(self.user_ids)
+            state = self.users.get(user)
+            t0 = time.perf_counter()
+            view = state.view()
+            page, _ = view.page(None, 50, lambda t: is_upcoming(t, datetime.now()))
+            state.summary_result()
+            elapsed = time.perf_counter() - t0
+            self.record("reads", "importer" if user == IMPORT_USER else "others", elapsed)
+            time.sleep(self.args.read_pause)
+
+            if view.version < seen.get(user, -1):
+                self.fail(f"{user}: view version went backwards")
+            if view.version == seen.get(user):
+                continue    # views are immutable: this one was checked already
+            seen[user] = view.version
+            if any(view.keys[i] > view.keys[i + 1] for i in range(len(view.keys) - 1)):
+                self.fail(f"{user}: view out of order")
+            batches = {t.get("batch") for _, uid, t in view.entries if uid[0] == "canvas"}
+            if len(batches) > 1:
+                self.fail(f"{user}: saw a half-applied import {batches}")
+
+    def writer(self, seed):
+        rng = random.Random(seed)
+        mine = {u: [] for u in self.user_ids}
+        while not self.stop.is_set():
+            user = rng.choice(self.user_ids)
+            state = self.users.get(user)
+            op = rng.random()
+            with state.writing():
+                if op < 0.5 or not mine[user]:
+                    task = self.store.add(random_task(rng), user=user)
+                    state.index.upsert(("manual", task.id), task, rank=MANUAL_RANK)
+                    mine[user].append(task.id)
+                elif op < 0.8:
+                    task_id = rng.choice(mine[user])
+                    task = self.store.update(task_id, rng.choice([{"completed": True}, random_task(rng)]), user=user)
+                    state.index.upsert(("manual", task_id), task, rank=MANUAL_RANK)
+                else:
+                    task_id = mine[user].pop(rng.randrange(len(mine[user])))
+                    self.store.delete(task_id, user=user)
+                    state.index.remove(("manual", task_id))
+            self.record("writes", None)
+
+    def importer(self, seed):
+        rng = random.Random(seed)
+        state = self.users.get(IMPORT_USER)
+        state.ensure_ready()
+        tag = 0
+        while not self.stop.is_set():
+            tag += 1
+            state.canvas.replace(canvas_batch(f"b{seed}.{tag}", self.args.import_size, rng))
+            self.record("imports", None)
+
+    # ---------- run ---------- #
+
+    def run(self):
+        a = self.args
+        threads = [threading.Thread(target=self.reader, args=(i,)) for i in range(a.readers)]
+        threads += [threading.Thread(target=self.writer, args=(1000 + i,)) for i in range(a.writers)]
+        threads += [threading.Thread(target=self.importer, args=(7 + i,)) for i in range(a.importers)]
+        for t in threads:
+            t.start()
+        self.stop.wait(a.seconds)
+        self.stop.set()
+        for t in threads:
+            t.join()
+
+        if not self.errors:
+            self.verify()
+        if self.db != ":memory:":
+            os.unlink(self.db)
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(self.db + suffix):
+                    os.unlink(self.db + suffix)
+
+    def verify(self):
+        for user in self.user_ids:
+            state = self.users.get(user)
+            expected = {("manual", t.id) for t in self.store.all(user)}
+            expected |= {("canvas", t.id) for t in state.canvas.snapshot().tasks}
+            actual = {uid for _, uid, _ in state.index.export()[1]}
+            if actual != expected:
+                self.fail(f"{user}: index differs from store + Canvas ({len(actual)} vs {len(expected)})")
+            state.summary_result()
+            drift = state.summary.reconcile()
+            if drift:
+                self.fail(f"{user}: summary aggregates drifted: {drift}")
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--db", choices=[":memory:"],
+                        help="use the in-memory task store instead of a temporary SQLite file")
+    parser.add_argument("--read-pause", type=float, default=0.001,
+                        help="seconds each reader waits between reads, like the gap between requests")
+    parser.add_argument("--import-size", type=int, default=5000)
+    parser.add_argument("--importers", type=int, default=2,
+                        help="threads replacing the importing user's Canvas tasks at the same time")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    stress = Stress(args)
+    stress.run()
+    if stress.errors:
+        print("FAILED:", *stress.errors[:5], sep="\n  ")
+        sys.exit(1)
+
+    c = stress.counts
+    print(f"{args.users} users, {args.readers} readers, {args.writers} writers, "
+          f"{args.import_size}-task imports for {args.seconds:.0f}s: "
+          f"{c['reads']} reads, {c['writes']} writes, {c['imports']} imports, all checks passed")
+    for key, values in stress.latencies.items():
+        print(f"  read latency ({key}): p50 {percentile(values, 50) * 1000:.2f} ms, "
+              f"p99 {percentile(values, 99) * 1000:.2f} ms, max {max(values or [0]) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Seeded synthetic data for the benchmarks: manual and Canvas-shaped tasks
+and keyword-rule files. Same seed, same data, on any machine.
+
+    from synthetic import Synthetic
+    gen = Synthetic(seed=1, rules=5000)
+    tasks = gen.tasks(10000)                   # Task records, ~60% Canvas
+    gen.write_rules("/tmp/task_keywords.json")
+
+    python benchmarks/synthetic.py --tasks 5 --rules 20     # print a sample
+
+Canvas tasks look like what canvas_ingest produces (course ids, group
+weights, html_url, HTML descriptions of a few hundred bytes to a few KB);
+manual ones look like what the Tasks page posts (short titles, mostly no
+description, date-only or datetime due dates, some with no date at all).
+Due dates spread from two weeks overdue to a semester ahead, bunched
+near the present like a real inbox.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_estimation import DEFAULT_KEYWORD_RULES  # noqa: E402
+from task_model import Task  # noqa: E402
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "te", "su", "pen", "dor", "vi", "na", "qua", "zel"]
+FILLER = ["the", "for", "and", "with", "each", "your", "chapter", "notes", "section", "page",
+          "submit", "pdf", "rubric", "points", "late", "policy", "group", "citations", "draft"]
+
+COURSES = ["Calculus II", "Intro to Microeconomics", "Organic Chemistry", "World History",
+           "Data Structures", "Public Speaking", "Statistics", "Spanish III"]
+CANVAS_KINDS = ["Homework", "Problem Set", "Quiz", "Reading Response", "Lab Report", "Essay",
+                "Discussion Post", "Midterm Exam", "Final Project", "Paper", "Study Guide"]
+MANUAL_TITLES = ["Email {who} about {what}", "Call {who}", "Laundry", "Groceries", "Workout",
+                 "Update resume", "Apply to {org} internship", "Cover letter for {org}",
+                 "Study for {what} exam", "Read chapter {n}", "Clean room", "Walk",
+                 "LinkedIn networking", "Meeting with {who}", "Review {what} notes"]
+WHO = ["prof", "advisor", "mom", "TA", "landlord", "study group"]
+WHAT = ["midterm", "lab", "essay", "project", "scholarship", "housing"]
+ORGS = ["Acme", "Globex", "Initech", "Hooli", "Umbrella"]
+MANUAL_CATEGORIES = ["Career", "Health", "Fun", "General", None]
+RULE_TYPES = ["deep_work", "study", "assessment", "communication", "career", "life", "health"]
+
+
+class Synthetic:
+    """
+    One seeded generator. `rules` is the size of the keyword-rule set;
+    part of its vocabulary is sprinkled into titles and descriptions so
+    the rules actually match, like a real rule file tuned to real tasks.
+    """
+
+    def __init__(self, seed=1, rules=len(DEFAULT_KEYWORD_RULES), now=None):
+        self.seed = seed
+        self.now = now or datetime.now().replace(minute=0, second=0, microsecond=0)
+        self.rules = self._rules(random.Random(f"{seed}-rules"), rules)
+        custom = [k for k in self.rules if k not in DEFAULT_KEYWORD_RULES]
+        self.vocab = list(DEFAULT_KEYWORD_RULES) + custom[:500] + FILLER * 4
+
+    # ---------- keyword rules ---------- #
+
+    @staticmethod
+    def _word(rng):
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+    def _rules(self, rng, n):
+        rules = dict(DEFAULT_KEYWORD_RULES)
+        while len(rules) < n:
+            key = " ".join(self._word(rng) for _ in range(rng.choice((1, 1, 1, 2, 3))))
+            rules[key] = {
+                "minutes": rng.randint(10, 150),
+                "type": rng.choice(RULE_TYPES),
+                "weight": round(rng.uniform(0.5, 2.2), 2),
+            }
+        return rules
+
+    def write_rules(self, path):
+        """Write the rule set as a task_keywords.json-style file."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.rules, f)
+        return path
+
+    # ---------- tasks ---------- #
+
+    def _due(self, rng):
+        # mostly the next few weeks, a tail to ~4 months, some overdue
+        days = rng.choice((-rng.uniform(0, 14), rng.expovariate(1 / 10), rng.uniform(0, 120)))
+        return self.now + timedelta(days=days, hours=rng.randint(0, 23))
+
+    def _words(self, rng, n):
+        return " ".join(rng.choice(self.vocab) for _ in range(n))
+
+    def _html(self, rng):
+        paragraphs = [f'<p style="margin: 0 0 1em;">{self._words(rng, rng.randint(15, 50)).capitalize()}.</p>'
+                      for _ in range(rng.randint(1, 6))]
+        if rng.random() < 0.5:
+            items = "".join(f"<li>{self._words(rng, rng.randint(3, 8))}</li>" for _ in range(rng.randint(2, 5)))
+            paragraphs.append(f"<ul>{items}</ul>")
+        paragraphs.append("<p><strong>Due at 11:59pm</strong> — submit on Canvas, no emailed work.</p>")
+        return "\n".join(paragraphs)
+
+    def canvas_dict(self, rng, i):
+        course_id = 70000 + i % len(COURSES)
+        due = self._due(rng)
+        return {
+            "id": 900000 + i,
+            "title": f"{rng.choice(CANVAS_KINDS)} {1 + i // len(COURSES)}: {self._words(rng, rng.randint(1, 4))}",
+            "description": self._html(rng) if rng.random() < 0.9 else None,
+            "due_date": rng.choice((due.strftime("%Y-%m-%dT%H:%M:%SZ"), due.strftime("%Y-%m-%d"))),
+            "category": "Assignments",
+            "priority": 1,
+            "group_weight": rng.choice([0, 10, 15, 20, 25, 40]),
+            "html_url": f"https://american.instructure.com/courses/{course_id}/assignments/{900000 + i}",
+            "course_id": course_id,
+            "course_name": COURSES[course_id - 70000],
+        }
+
+    def raw_assignment(self, rng, course_id, group_ids, i):
+        """One assignment as the Canvas API returns it (what fake_canvas.py serves)."""
+        due = self._due(rng)
+        assignment_id = 900000 + i
+        return {
+            "id": assignment_id,
+            "name": f"{rng.choice(CANVAS_KINDS)} {1 + i // len(COURSES)}: {self._words(rng, rng.randint(1, 4))}",
+            "description": self._html(rng) if rng.random() < 0.9 else None,
+            "due_at": due.strftime("%Y-%m-%dT%H:%M:%SZ") if rng.random() < 0.95 else None,
+            "points_possible": rng.choice([0, 5, 10, 20, 25, 50, 100]),
+            "assignment_group_id": rng.choice(group_ids),
+            "course_id": course_id,
+            "html_url": f"https://american.instructure.com/courses/{course_id}/assignments/{assignment_id}",
+            "updated_at": (self.now - timedelta(days=rng.uniform(0, 60))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "published": True,
+        }
+
+    def manual_dict(self, rng):
+        title = rng.choice(MANUAL_TITLES).format(
+            who=rng.choice(WHO), what=rng.choice(WHAT), org=rng.choice(ORGS), n=rng.randint(1, 20))
+        due = self._due(rng)
+        return {
+            "title": title,
+            "description": self._words(rng, rng.randint(3, 25)) if rng.random() < 0.3 else None,
+            "due_date": rng.choice((due.strftime("%Y-%m-%d"), due.strftime("%Y-%m-%dT%H:%M:%S"), None)),
+            "category": rng.choice(MANUAL_CATEGORIES),
+            "priority": rng.randint(1, 5),
+            "completed": rng.random() < 0.2,
+        }
+
+    def dicts(self, n, canvas_share=0.6):
+        """(manual dicts without ids, Canvas dicts) for n tasks in total."""
+        rng = random.Random(f"{self.seed}-tasks-{n}")
+        n_canvas = int(n * canvas_share)
+        canvas = [self.canvas_dict(rng, i) for i in range(n_canvas)]
+        manual = [self.manual_dict(rng) for _ in range(n - n_canvas)]
+        return manual, canvas
+
+    def tasks(self, n, canvas_share=0.6):
+        """n Task records, manual ones numbered from 1, in no particular order."""
+        manual, canvas = self.dicts(n, canvas_share)
+        out = [Task.from_dict(dict(d, id=i + 1), "manual") for i, d in enumerate(manual)]
+        out += [Task.from_dict(d, "canvas") for d in canvas]
+        random.Random(f"{self.seed}-shuffle-{n}").shuffle(out)
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=5)
+    parser.add_argument("--rules", type=int, default=len(DEFAULT_KEYWORD_RULES))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rules-out", help="also write the keyword rules to this file")
+    args = parser.parse_args()
+
+    gen = Synthetic(args.seed, args.rules)
+    for t in gen.tasks(args.tasks):
+        print(json.dumps(t.to_dict(), ensure_ascii=False)[:300])
+    if args.rules_out:
+        gen.write_rules(args.rules_out)
+        print(f"{len(gen.rules)} rules -> {args.rules_out}")
+
+
+if __name__ == "__main__":
+    main()
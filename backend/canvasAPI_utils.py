@@ -1,65 +1,279 @@
 import requests
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
-# Replace this with your own Canvas API access token
-ACCESS_TOKEN = ""
+from requests.adapters import HTTPAdapter
+
+from canvas_throttle import RETRIES, CircuitBreaker, Throttle, backoff, is_retryable, retry_after
+from metrics import CANVAS_REQUEST_SECONDS, CANVAS_REQUESTS, CANVAS_RETRIES
+
+# Replace this with your own Canvas API access token (or set CANVAS_ACCESS_TOKEN)
+ACCESS_TOKEN = os.getenv("CANVAS_ACCESS_TOKEN", "")
 
 # Canvas course ID - Ypi can find it within the canvas url for the course
 COURSE_ID = "73977"
 
-BASE_URL = "https://american.instructure.com/api/v1"
+BASE_URL = os.getenv("CANVAS_BASE_URL", "https://american.instructure.com/api/v1")
 
 # Standard request headers with authorization - From Canvas API 
 HEADERS = {
     "Authorization": f"Bearer {ACCESS_TOKEN}"
 }
 
+# Canvas defaults to 10 items per page; 100 is the max it allows.
+PER_PAGE = 100
+
+# Max parallel page requests (also the size of the keep-alive pool)
+MAX_WORKERS = 8
+
+# Seconds to wait on a single Canvas request
+REQUEST_TIMEOUT = 15
+
+
+class CanvasError(Exception):
+    """Raised when Canvas answers with an error or can't be reached."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CanvasClient:
+    """
+    Canvas API client with a keep-alive connection pool and Link pagination.
+
+    - One requests.Session, so TLS connections get reused across calls.
+    - get_paginated() asks for PER_PAGE items per page; once the first page
+      tells us the "last" page number, the remaining pages are fetched in
+      parallel instead of following "next" links one by one.
+    - Requests go through a Throttle (concurrency and pacing follow Canvas's
+      rate-limit headers), are retried with backoff on throttling, 5xx and
+      network errors, and stop altogether while the CircuitBreaker is open.
+    """
+
+    def __init__(self, base_url=BASE_URL, headers=HEADERS, per_page=PER_PAGE,
+                 max_workers=MAX_WORKERS, timeout=REQUEST_TIMEOUT, retries=RETRIES, breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.per_page = per_page
+        self.timeout = timeout
+        self.retries = retries
+        self.throttle = Throttle(max_workers * 2)
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers * 2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers)
+
+        # _pages only runs single HTTP requests; _calls runs whole (possibly
+        # paginated) calls. Keeping them apart means a call waiting on its
+        # pages can never starve the pool its pages need.
+        self._pages = ThreadPoolExecutor(max_workers, thread_name_prefix="canvas-page")
+        self._calls = ThreadPoolExecutor(max_workers, thread_name_prefix="canvas-call")
+
+    def close(self):
+        self._pages.shutdown(wait=False)
+        self._calls.shutdown(wait=False)
+        self.session.close()
+
+    # ---------- low level ---------- #
+
+    def _get(self, url, params=None):
+        if not self.breaker.allow():
+            raise CanvasError(f"Canvas circuit open after {self.breaker.failures} failures, "
+                              f"next try in {self.breaker.retry_in():.1f}s")
+        for attempt in range(self.retries + 1):
+            response, error, wait = self._attempt(url, params)
+            if error is None:
+                self.breaker.record_success()
+                return response
+            if wait is None:
+                self.breaker.record_success()   # Canvas is up, it just said no
+                raise error
+            if attempt == self.retries:
+                break
+            CANVAS_RETRIES.inc(status=error.status_code or "error")
+            time.sleep(backoff(attempt, wait))
+        self.breaker.record_failure()
+        raise error
+
+    def _attempt(self, url, params):
+        """
+        One GET through the throttle -> (response, None, None) on 200, else
+        (None, CanvasError, wait) where wait is None for errors not worth
+        retrying, or the Retry-After seconds (0 if none) for ones that are.
+        """
+        self.throttle.acquire()
+        t0 = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.throttle.release(None)
+            CANVAS_REQUESTS.inc(status="error")
+            return None, CanvasError(str(e)), 0.0
+        status = response.status_code
+        body = response.text if status in (403, 429) else ""
+        self.throttle.release(status, response.headers, body)
+        CANVAS_REQUEST_SECONDS.observe(time.perf_counter() - t0)
+        CANVAS_REQUESTS.inc(status=status)
+        if status == 200:
+            return response, None, None
+        path = urlparse(url).path
+        error = CanvasError(f"{path} returned {status}" + (f" ({body.strip()[:80]})" if body else ""), status)
+        if not is_retryable(status, body):
+            return None, error, None
+        return None, error, retry_after(response.headers) or 0.0
+
+    def get_paginated(self, path, params=None):
+        """GET every page of a Canvas list endpoint and return the items as one list."""
+        params = dict(params or {})
+        params.setdefault("per_page", self.per_page)
+        first = self._get(f"{self.base_url}/{path.lstrip('/')}", params)
+        items = list(first.json())
+
+        links = first.links
+        page_urls = _page_urls_from_last(links.get("last", {}).get("url"))
+        if page_urls:
+            # All page numbers known up front: fetch them concurrently, keep order
+            for page in self._pages.map(lambda u: self._get(u).json(), page_urls):
+                items.extend(page)
+            return items
+
+        # No usable "last" link (Canvas omits it for expensive lists): walk "next"
+        next_url = links.get("next", {}).get("url")
+        while next_url:
+            response = self._get(next_url)
+            items.extend(response.json())
+            next_url = response.links.get("next", {}).get("url")
+        return items
+
+    # ---------- Canvas endpoints ---------- #
+
+    def get_active_courses(self):
+        """Courses the token's user is actively enrolled in: [{"id", "name"}, ...]"""
+        courses = self.get_paginated("courses", {"enrollment_state": "active"})
+        return [
+            {"id": c["id"], "name": c.get("name") or c.get("course_code") or str(c["id"])}
+            for c in courses
+            # date-restricted courses come back as stubs without a name
+            if c.get("id") is not None and not c.get("access_restricted_by_date")
+        ]
+
+    def get_assignment_groups(self, course_id=COURSE_ID):
+        groups = self.get_paginated(f"courses/{course_id}/assignment_groups")
+        # Map group_id -> group_weight
+        return {g["id"]: g.get("group_weight", 0) for g in groups}
+
+    def get_raw_assignments(self, course_id=COURSE_ID):
+        """Raw Canvas assignment JSON plus the group_id -> weight map, as a tuple."""
+        # Groups and assignments don't depend on each other, so run them together
+        groups_future = self._calls.submit(self.get_assignment_groups, course_id)
+        data = self.get_paginated(f"courses/{course_id}/assignments")
+        return data, groups_future.result()
+
+    def get_assignments(self, course_id=COURSE_ID):
+        """Course assignments as task dicts, with their group weights attached."""
+        data, groups = self.get_raw_assignments(course_id)
+        return [assignment_to_task(a, groups) for a in data]
+
+
+def _page_urls_from_last(last_url):
+    """
+    Given the rel="last" link of page 1, build the URLs for pages 2..last.
+    Returns [] when the link is missing or uses opaque (non-numeric) page tokens.
+    """
+    if not last_url:
+        return []
+    parts = urlparse(last_url)
+    query = parse_qs(parts.query)
+    try:
+        last_page = int(query.get("page", [""])[0])
+    except ValueError:
+        return []
+
+    urls = []
+    for page in range(2, last_page + 1):
+        query["page"] = [str(page)]
+        urls.append(urlunparse(parts._replace(query=urlencode(query, doseq=True))))
+    return urls
+
+
+def assignment_to_task(a, groups):
+    """Convert one raw Canvas assignment into our task dict shape."""
+    # Extract and format due date
+    due_date = a.get("due_at")
+    if due_date:
+        due_date = due_date[:10]  # Format: YYYY-MM-DD
+
+    return {
+        "id": a.get("id"),
+        "title": a.get("name"),
+        "description": a.get("description"),
+        "due_date": due_date,
+        "category": "Assignments",  # Important for sorting
+        "priority": 1,              # Giving all canvas assignments a priority of 1 for now #
+        "group_weight": groups.get(a.get("assignment_group_id"), 0),
+        "html_url": a.get("html_url"),
+    }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Shared CanvasClient, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CanvasClient()
+    return _client
+
+
 def get_assignment_groups():
     # Fetch Canvas assignment groups AND their weights
-    url = f"{BASE_URL}/courses/{COURSE_ID}/assignment_groups"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code != 200:
-        print(f"Error fetching assignment groups: {response.status_code}")
+    try:
+        return fetch_assignment_groups()
+    except CanvasError as e:
+        print(f"Error fetching assignment groups: {e}")
         return {}
-    groups = response.json()
-    # Map group_id -> group_weight
-    return {g["id"]: g.get("group_weight", 0) for g in groups}
+
+
+def fetch_assignment_groups():
+    # Same as get_assignment_groups() but raises CanvasError instead of returning {}
+    return get_client().get_assignment_groups(COURSE_ID)
+
+
+# Last list get_canvas_assignments() fetched successfully
+_last_assignments = []
+
+
 def get_canvas_assignments():
     #fetch Canvas assignments and attach their group weights
+    # On failure (Canvas down, throttled, circuit open) the last good list is
+    # returned instead of [], so callers don't see every task vanish.
+    global _last_assignments
     try:
-        groups = get_assignment_groups()
-        url = f"{BASE_URL}/courses/{COURSE_ID}/assignments"
-        response = requests.get(url, headers=HEADERS)
-        if response.status_code != 200:
-            print(f"Error fetching Canvas assignments: {response.status_code}")
-            return []
-
-        data = response.json()
-        assignments = []
-
-        for a in data:
-            # Extract and format due date
-            due_date = a.get("due_at")
-            if due_date:
-                due_date = due_date[:10]  # Format: YYYY-MM-DD
-
-            assignments.append({
-                "id": a.get("id"),
-                "title": a.get("name"),
-                "description": a.get("description"),
-                "due_date": due_date,
-                "category": "Assignments",  # Important for sorting
-                "priority": 1,              # Giving all canvas assignments a priority of 1 for now #
-                "group_weight": groups.get(a.get("assignment_group_id"), 0),
-                "html_url": a.get("html_url"),
-            })
-
-        return assignments
-
+        _last_assignments = fetch_canvas_assignments()
     except Exception as e:
-        print("Error fetching Canvas data:", e)
-        return []
-    
+        print("Error fetching Canvas data, keeping the last good list:", e)
+    return _last_assignments
+
+
+def fetch_canvas_assignments():
+    """
+    Fetch Canvas assignments and attach their group weights.
+    Unlike get_canvas_assignments(), errors are raised (CanvasError) so the
+    caller can tell "Canvas is down" apart from "no assignments".
+    """
+    return get_client().get_assignments(COURSE_ID)
+
 
 
 
@@ -0,0 +1,249 @@
+import asyncio
+import threading
+import time
+
+import aiohttp
+
+from canvasAPI_utils import (
+    BASE_URL,
+    HEADERS,
+    MAX_WORKERS,
+    PER_PAGE,
+    REQUEST_TIMEOUT,
+    CanvasError,
+    _page_urls_from_last,
+)
+from canvas_ingest import COURSE_IDS, COURSE_TIMEOUT, CourseIngest
+from canvas_throttle import RETRIES, AsyncThrottle, CircuitBreaker, backoff, is_retryable, retry_after
+from metrics import CANVAS_REQUEST_SECONDS, CANVAS_REQUESTS, CANVAS_RETRIES
+
+# Open connections to Canvas at once (shared by every course and page)
+MAX_CONNECTIONS = MAX_WORKERS * 2
+
+
+class CanvasLoop:
+    """
+    One event loop, on its own daemon thread, that all async Canvas I/O runs
+    on. Callers on any thread (or any other loop) hand it coroutines with
+    submit() and get a concurrent.futures.Future back; cancelling that
+    future cancels the coroutine.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="canvas-loop", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+canvas_loop = CanvasLoop()
+
+
+class AsyncCanvasClient:
+    """
+    aiohttp version of CanvasClient: same endpoints and return values, as
+    coroutines. Every page of every call is just another request on the one
+    connection pool, so a slow Canvas ties up sockets, not threads.
+
+    Same throttling, retries and circuit breaker as CanvasClient.
+
+    Must be used from a single event loop (the session is bound to it).
+    """
+
+    def __init__(self, base_url=BASE_URL, headers=HEADERS, per_page=PER_PAGE,
+                 max_connections=MAX_CONNECTIONS, timeout=REQUEST_TIMEOUT, retries=RETRIES, breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.headers = dict(headers)
+        self.per_page = per_page
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.throttle = AsyncThrottle(max_connections)
+        self.breaker = breaker or CircuitBreaker()
+        self._session = None
+
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    # ---------- low level ---------- #
+
+    async def _get(self, url, params=None):
+        """GET one page -> (json, {rel: url}), with retries (see CanvasClient._get)."""
+        if not self.breaker.allow():
+            raise CanvasError(f"Canvas circuit open after {self.breaker.failures} failures, "
+                              f"next try in {self.breaker.retry_in():.1f}s")
+        try:
+            for attempt in range(self.retries + 1):
+                result, error, wait = await self._attempt(url, params)
+                if error is None:
+                    self.breaker.record_success()
+                    return result
+                if wait is None:
+                    self.breaker.record_success()   # Canvas is up, it just said no
+                    raise error
+                if attempt == self.retries:
+                    break
+                CANVAS_RETRIES.inc(status=error.status_code or "error")
+                await asyncio.sleep(backoff(attempt, wait))
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        self.breaker.record_failure()
+        raise error
+
+    async def _attempt(self, url, params):
+        """One GET through the throttle -> same contract as CanvasClient._attempt()."""
+        await self.throttle.acquire()
+        status, headers, body = None, None, ""
+        t0 = time.perf_counter()
+        try:
+            async with self.session().get(url, params=params) as response:
+                status, headers = response.status, response.headers
+                CANVAS_REQUEST_SECONDS.observe(time.perf_counter() - t0)
+                CANVAS_REQUESTS.inc(status=status)
+                if status == 200:
+                    data = await response.json(content_type=None)
+                    links = {rel: str(link["url"]) for rel, link in response.links.items()}
+                    return (data, links), None, None
+                if status in (403, 429):
+                    body = await response.text()
+                path = response.url.path
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            CANVAS_REQUESTS.inc(status="error")
+            return None, CanvasError(str(e) or type(e).__name__), 0.0
+        finally:
+            self.throttle.release(status, headers, body)
+
+        error = CanvasError(f"{path} returned {status}" + (f" ({body.strip()[:80]})" if body else ""), status)
+        if not is_retryable(status, body):
+            return None, error, None
+        return None, error, retry_after(headers) or 0.0
+
+    async def get_paginated(self, path, params=None):
+        """GET every page of a Canvas list endpoint and return the items as one list."""
+        params = dict(params or {})
+        params.setdefault("per_page", self.per_page)
+        items, links = await self._get(f"{self.base_url}/{path.lstrip('/')}", params)
+        items = list(items)
+
+        page_urls = _page_urls_from_last(links.get("last"))
+        if page_urls:
+            # All page numbers known up front: fetch them all at once, keep order
+            for page, _ in await asyncio.gather(*(self._get(u) for u in page_urls)):
+                items.extend(page)
+            return items
+
+        # No usable "last" link: walk "next"
+        next_url = links.get("next")
+        while next_url:
+            page, links = await self._get(next_url)
+            items.extend(page)
+            next_url = links.get("next")
+        return items
+
+    # ---------- Canvas endpoints ---------- #
+
+    async def get_active_courses(self):
+        courses = await self.get_paginated("courses", {"enrollment_state": "active"})
+        return [
+            {"id": c["id"], "name": c.get("name") or c.get("course_code") or str(c["id"])}
+            for c in courses
+            if c.get("id") is not None and not c.get("access_restricted_by_date")
+        ]
+
+    async def get_assignment_groups(self, course_id):
+        groups = await self.get_paginated(f"courses/{course_id}/assignment_groups")
+        return {g["id"]: g.get("group_weight", 0) for g in groups}
+
+    async def get_raw_assignments(self, course_id):
+        """Raw Canvas assignment JSON plus the group_id -> weight map, as a tuple."""
+        data, groups = await asyncio.gather(
+            self.get_paginated(f"courses/{course_id}/assignments"),
+            self.get_assignment_groups(course_id),
+        )
+        return data, groups
+
+
+class AsyncCourseIngest(CourseIngest):
+    """
+    CourseIngest with every course fetched as a coroutine on `loop`
+    (canvas_loop by default) instead of on a thread pool. Same merge rules:
+    a round waits at most `course_timeout`, courses still running keep
+    going and are picked up by the next round, failures keep old tasks.
+
+    CanvasSync sees fetch_async() and runs refreshes on the loop directly;
+    calling the object still works (it blocks until the round is done).
+    """
+
+    def __init__(self, client=None, course_ids=COURSE_IDS, course_timeout=COURSE_TIMEOUT,
+                 mirror=None, loop=None):
+        super().__init__(client, course_ids, max_workers=1, course_timeout=course_timeout, mirror=mirror)
+        self.client = client or AsyncCanvasClient()
+        self.loop = loop or canvas_loop
+
+    async def courses_async(self):
+        if self.course_ids:
+            return [{"id": cid, "name": str(cid)} for cid in self.course_ids]
+        return await self.client.get_active_courses()
+
+    async def fetch_async(self):
+        courses = await self.courses_async()
+
+        tasks = {}
+        for course in courses:
+            cid = course["id"]
+            task = self._inflight.get(cid)
+            if task is None:
+                task = asyncio.ensure_future(self.client.get_raw_assignments(cid))
+            tasks[cid] = task
+
+        try:
+            done, _ = await asyncio.wait(tasks.values(), timeout=self.course_timeout)
+        except asyncio.CancelledError:
+            # nobody wants this round any more: stop its requests too
+            for task in tasks.values():
+                task.cancel()
+            self._inflight = {}
+            raise
+
+        results = {}
+        errors = {}
+        self._inflight = {}
+        for cid, task in tasks.items():
+            if task not in done:
+                self._inflight[cid] = task
+                errors[cid] = f"timed out after {self.course_timeout}s"
+                continue
+            try:
+                results[cid] = task.result()
+            except Exception as e:
+                print(f"Error fetching Canvas course {cid}:", e)
+                errors[cid] = str(e)
+        return self._merge(courses, results, errors)
+
+    def __call__(self):
+        return self.loop.submit(self.fetch_async()).result()
+
+    def close(self, timeout=5):
+        self.loop.submit(self.client.close()).result(timeout)
@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from canvasAPI_utils import CanvasError, get_client
+from canvas_mirror import MIRROR_PATH, CanvasDelta, CanvasMirror
+
+# How many courses to fetch at the same time
+COURSE_WORKERS = int(os.getenv("CANVAS_COURSE_WORKERS", "4"))
+
+# Seconds to wait for all courses before merging what we have
+COURSE_TIMEOUT = float(os.getenv("CANVAS_COURSE_TIMEOUT", "20"))
+
+# Optional comma-separated course ids; skips course discovery when set
+COURSE_IDS = [c.strip() for c in os.getenv("CANVAS_COURSE_IDS", "").split(",") if c.strip()]
+
+# "incremental": keep an on-disk mirror and only rebuild changed assignments
+# "full": in-memory mirror only, nothing persisted between restarts
+SYNC_MODE = os.getenv("CANVAS_SYNC_MODE", "incremental")
+
+
+class CourseIngest:
+    """
+    Fetch assignments for every active course concurrently and merge them
+    into one task list tagged with course_id / course_name.
+
+    Callable, so it can be used directly as CanvasSync's fetch function.
+    Each call also leaves a CanvasDelta of what changed in `last_delta`.
+
+    A slow or failing course never blocks or empties the others:
+      - each round waits at most `course_timeout` seconds,
+      - a course that errors or is still running keeps its tasks from the
+        last round that succeeded (and is listed in `last_errors`),
+      - a course still in flight from an earlier round isn't submitted again.
+    """
+
+    def __init__(self, client=None, course_ids=COURSE_IDS, max_workers=COURSE_WORKERS,
+                 course_timeout=COURSE_TIMEOUT, mirror=None):
+        self.client = client
+        self.course_ids = list(course_ids)
+        self.course_timeout = course_timeout
+        if mirror is None:
+            mirror = CanvasMirror(MIRROR_PATH if SYNC_MODE == "incremental" else None)
+        self.mirror = mirror
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="canvas-course")
+        self._inflight = {}    # course_id -> Future still running from an earlier round
+        self.last_errors = {}  # course_id -> error message from the last round
+        self.last_delta = CanvasDelta()
+
+    def courses(self):
+        if self.course_ids:
+            return [{"id": cid, "name": str(cid)} for cid in self.course_ids]
+        return (self.client or get_client()).get_active_courses()
+
+    def client_status(self):
+        """Circuit breaker and throttle state of the Canvas client in use."""
+        client = self.client or get_client()
+        return {"circuit": client.breaker.status(), "throttle": client.throttle.status()}
+
+    def cached_tasks(self):
+        """Tasks from the mirror as of the last sync (used to warm-start)."""
+        return self.mirror.tasks(), self.mirror.synced_at
+
+    def _fetch_course(self, course):
+        return (self.client or get_client()).get_raw_assignments(course["id"])
+
+    def __call__(self):
+        courses = self.courses()   # if even this fails, the whole sync fails
+
+        futures = {}
+        for course in courses:
+            cid = course["id"]
+            fut = self._inflight.get(cid)
+            if fut is None:
+                fut = self._pool.submit(self._fetch_course, course)
+            futures[cid] = (course, fut)
+
+        done, _ = wait([fut for _, fut in futures.values()], timeout=self.course_timeout)
+
+        results = {}
+        errors = {}
+        self._inflight = {}
+        for cid, (course, fut) in futures.items():
+            if fut not in done:
+                self._inflight[cid] = fut
+                errors[cid] = f"timed out after {self.course_timeout}s"
+                continue
+            try:
+                results[cid] = fut.result()
+            except Exception as e:
+                print(f"Error fetching Canvas course {cid}:", e)
+                errors[cid] = str(e)
+        return self._merge(courses, results, errors)
+
+    def _merge(self, courses, results, errors):
+        """
+        Fold one round into the mirror. results: course_id -> (raw, groups)
+        for the courses that finished; errors: course_id -> message for the rest.
+        """
+        self.last_errors = errors
+        if courses and len(errors) == len(courses):
+            # before touching the mirror: a failed round must not change it,
+            # or its deletions would never reach the snapshot in a delta
+            raise CanvasError(f"all {len(courses)} courses failed: {errors}")
+
+        delta = CanvasDelta()
+        for course in courses:
+            if course["id"] in results:
+                raw, groups = results[course["id"]]
+                delta.merge(self.mirror.apply_course(course, raw, groups))
+
+        # forget courses the user is no longer enrolled in
+        delta.merge(self.mirror.retain_courses([c["id"] for c in courses]))
+
+        self.mirror.mark_synced()
+        self.mirror.save()
+        self.last_delta = delta
+        return self.mirror.tasks()
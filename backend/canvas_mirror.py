@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from canvasAPI_utils import assignment_to_task
+
+# Where the local mirror of Canvas assignments is kept between restarts
+MIRROR_PATH = os.getenv(
+    "CANVAS_MIRROR_PATH", os.path.join(os.path.dirname(__file__), "canvas_mirror.json")
+)
+
+# Bump when the stored shape changes; older files are ignored
+MIRROR_FORMAT = 1
+
+
+class CanvasDelta:
+    """Ids inserted, updated and deleted by one sync."""
+
+    __slots__ = ("inserted", "updated", "deleted")
+
+    def __init__(self, inserted=(), updated=(), deleted=()):
+        self.inserted = list(inserted)
+        self.updated = list(updated)
+        self.deleted = list(deleted)
+
+    @property
+    def changed_ids(self):
+        return self.inserted + self.updated + self.deleted
+
+    def merge(self, other):
+        self.inserted.extend(other.inserted)
+        self.updated.extend(other.updated)
+        self.deleted.extend(other.deleted)
+        return self
+
+    def __bool__(self):
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def to_dict(self):
+        return {"inserted": self.inserted, "updated": self.updated, "deleted": self.deleted}
+
+
+def task_hash(task):
+    """Stable content hash of a task dict (or Task record)."""
+    if hasattr(task, "to_dict"):
+        task = task.to_dict()
+    raw = json.dumps(task, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def diff_tasks(old_tasks, new_tasks):
+    """CanvasDelta between two task lists, matched by id and compared by content hash."""
+    old = {t.get("id"): task_hash(t) for t in old_tasks}
+    delta = CanvasDelta()
+    seen = set()
+    for t in new_tasks:
+        tid = t.get("id")
+        seen.add(tid)
+        if tid not in old:
+            delta.inserted.append(tid)
+        elif old[tid] != task_hash(t):
+            delta.updated.append(tid)
+    delta.deleted = [tid for tid in old if tid not in seen]
+    return delta
+
+
+class CanvasMirror:
+    """
+    Local copy of every Canvas assignment we know about, keyed by Canvas id.
+
+    Each entry stores the assignment's `updated_at`, its group weight, a
+    content hash and the task dict we built from it. apply_course() compares
+    a fresh listing against the mirror and only rebuilds entries whose
+    updated_at / group weight moved, so unchanged assignments cost a dict
+    lookup. The result is a CanvasDelta of inserted, updated and deleted ids.
+
+    With path=None the mirror is in-memory only (full sync mode).
+    """
+
+    def __init__(self, path=MIRROR_PATH):
+        self.path = path
+        self.entries = {}     # str(canvas id) -> entry dict
+        self.synced_at = None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    # ---------- persistence ---------- #
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != MIRROR_FORMAT:
+                print("Ignoring Canvas mirror with old format:", self.path)
+                return
+            self.entries = data.get("entries", {})
+            self.synced_at = data.get("synced_at")
+        except Exception as e:
+            print("Error loading Canvas mirror, starting empty:", e)
+            self.entries = {}
+
+    def save(self):
+        """Write the mirror to disk if anything changed (atomic replace)."""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            data = {"format": MIRROR_FORMAT, "synced_at": self.synced_at, "entries": self.entries}
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+    # ---------- sync ---------- #
+
+    def apply_course(self, course, raw_assignments, groups):
+        """
+        Merge a complete listing of one course's assignments into the mirror.
+        Assignments of this course that are no longer listed are deleted.
+        """
+        cid = course["id"]
+        delta = CanvasDelta()
+        seen = set()
+
+        with self._lock:
+            for a in raw_assignments:
+                key = str(a.get("id"))
+                seen.add(key)
+                weight = groups.get(a.get("assignment_group_id"), 0)
+                entry = self.entries.get(key)
+
+                if (entry is not None
+                        and entry["updated_at"] == a.get("updated_at")
+                        and entry["group_weight"] == weight
+                        and entry["course_id"] == cid
+                        and entry["task"].get("course_name") == course["name"]):
+                    continue   # unchanged since last sync
+
+                task = assignment_to_task(a, groups)
+                task["course_id"] = cid
+                task["course_name"] = course["name"]
+                h = task_hash(task)
+
+                if entry is None:
+                    delta.inserted.append(task["id"])
+                elif entry["hash"] != h:
+                    delta.updated.append(task["id"])
+
+                self.entries[key] = {
+                    "course_id": cid,
+                    "updated_at": a.get("updated_at"),
+                    "group_weight": weight,
+                    "hash": h,
+                    "task": task,
+                }
+                self._dirty = True
+
+            for key in [k for k, e in self.entries.items() if e["course_id"] == cid and k not in seen]:
+                delta.deleted.append(self.entries.pop(key)["task"]["id"])
+                self._dirty = True
+
+        return delta
+
+    def retain_courses(self, course_ids):
+        """Drop every assignment whose course isn't in course_ids (unenrolled courses)."""
+        keep = set(course_ids)
+        delta = CanvasDelta()
+        with self._lock:
+            for key in [k for k, e in self.entries.items() if e["course_id"] not in keep]:
+                delta.deleted.append(self.entries.pop(key)["task"]["id"])
+                self._dirty = True
+        return delta
+
+    def mark_synced(self):
+        # not marked dirty: a sync with no changes shouldn't rewrite the file
+        self.synced_at = time.time()
+
+    def tasks(self):
+        """All mirrored tasks (insertion order, i.e. grouped by course)."""
+        return [e["task"] for e in self.entries.values()]
@@ -0,0 +1,315 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+from canvas_ingest import CourseIngest
+from canvas_mirror import CanvasDelta, diff_tasks
+from metrics import stage
+from task_model import Task
+
+# How often the background worker refreshes Canvas (seconds), and how much
+# random jitter (as a fraction of the interval) to add so workers don't all
+# hit Canvas at the same moment.
+SYNC_INTERVAL = float(os.getenv("CANVAS_SYNC_INTERVAL", "300"))
+SYNC_JITTER = float(os.getenv("CANVAS_SYNC_JITTER", "0.1"))
+
+# Minimum gap between attempts triggered by stale reads, so a Canvas outage
+# doesn't turn every request into another refresh attempt.
+SYNC_MIN_RETRY = float(os.getenv("CANVAS_SYNC_MIN_RETRY", "30"))
+
+# Canvas client for the shared worker: "sync" (requests + thread pools) or
+# "async" (aiohttp on one event loop; what asgi.py runs with)
+CANVAS_CLIENT = os.getenv("CANVAS_CLIENT", "sync")
+
+
+def default_fetch():
+    if CANVAS_CLIENT == "async":
+        from canvas_async import AsyncCourseIngest  # aiohttp is only needed in async mode
+        return AsyncCourseIngest()
+    return CourseIngest()
+
+
+class CanvasSnapshot:
+    """
+    Immutable view of the Canvas tasks (Task records) at one point in time.
+    A new snapshot (with a higher version) is published whenever a sync
+    changes something; `delta` lists the ids that changed since the previous
+    version. Failures only update the error fields and keep the old tasks.
+    """
+
+    __slots__ = ("version", "tasks", "fetched_at", "last_error", "last_error_at", "delta", "_by_id")
+
+    def __init__(self, version=0, tasks=(), fetched_at=None, last_error=None, last_error_at=None,
+                 delta=None):
+        self.version = version
+        self.tasks = tuple(tasks)
+        self.fetched_at = fetched_at
+        self.last_error = last_error
+        self.last_error_at = last_error_at
+        self.delta = delta if delta is not None else CanvasDelta()
+        self._by_id = None
+
+    def by_id(self):
+        """Canvas id -> Task, built on first use."""
+        if self._by_id is None:
+            self._by_id = {t.id: t for t in self.tasks}
+        return self._by_id
+
+    def _with(self, **changes):
+        fields = {name: getattr(self, name) for name in self.__slots__ if name != "_by_id"}
+        fields.update(changes)
+        return CanvasSnapshot(**fields)
+
+    def age(self, now=None):
+        """Seconds since the tasks were fetched, or None if never fetched."""
+        if self.fetched_at is None:
+            return None
+        return (now or time.time()) - self.fetched_at
+
+
+def to_tasks(raw_tasks, old=None, delta=None):
+    """
+    Canvas task dicts -> Task records. With the previous snapshot and the
+    delta, unchanged tasks reuse their existing record instead of being
+    rebuilt (and their due dates re-parsed).
+    """
+    reuse = {}
+    if old is not None and delta is not None:
+        changed = set(delta.inserted) | set(delta.updated)
+        reuse = {t.id: t for t in old.tasks if t.id not in changed}
+    return [reuse.get(t.get("id")) or Task.from_dict(t, "canvas") for t in raw_tasks]
+
+
+class CanvasSync:
+    """
+    Background worker that keeps a CanvasSnapshot fresh.
+
+    Request handlers only ever call snapshot(), which returns immediately
+    (stale-while-revalidate): if the data is older than the interval, the
+    worker is woken up to refresh it, but the caller still gets the old data.
+
+    Downstream caches can subscribe(callback); callbacks get (delta, snapshot)
+    after every sync that changed something, so they only redo work for
+    delta.changed_ids.
+
+    Refreshes are single-flight: callers that ask while one is running
+    share its outcome instead of starting another round against Canvas.
+    """
+
+    def __init__(self, fetch=None, interval=SYNC_INTERVAL, jitter=SYNC_JITTER):
+        self.fetch = fetch or default_fetch()
+        self.interval = interval
+        self.jitter = jitter
+        self._snapshot = CanvasSnapshot()
+        self._lock = threading.Lock()      # guards publishing + starting the thread
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_attempt = 0.0
+        self._listeners = []
+        self._refresh_lock = threading.Lock()   # one sync refresh at a time
+        self._refreshes = 0                     # finished sync refreshes
+        self._last_ok = False
+        self._job = None                        # async refresh in flight (concurrent Future)
+        self._job_waiters = 0
+        self._job_lock = threading.Lock()
+        # snapshot version the fetcher's last round produced: its last_delta
+        # only describes the step from there, not from a POST /canvas list
+        self._fetched_version = 0
+
+        # Warm start from the local mirror so the first requests aren't empty
+        cached = getattr(self.fetch, "cached_tasks", None)
+        if cached is not None:
+            tasks, synced_at = cached()
+            if tasks:
+                self._snapshot = CanvasSnapshot(1, to_tasks(tasks), synced_at)
+                self._fetched_version = 1
+
+    # ---------- reads (never do network I/O) ---------- #
+
+    def snapshot(self):
+        snap = self._snapshot
+        age = snap.age()
+        if age is None or age > self.interval:
+            if time.time() - self._last_attempt >= min(self.interval, SYNC_MIN_RETRY):
+                self.request_refresh()
+        return snap
+
+    def status(self):
+        snap = self._snapshot
+        age = snap.age()
+        return {
+            "version": snap.version,
+            "tasks": len(snap.tasks),
+            "last_delta": {k: len(v) for k, v in snap.delta.to_dict().items()},
+            "fetched_at": snap.fetched_at,
+            "age_seconds": round(age, 1) if age is not None else None,
+            "stale": age is None or age > self.interval,
+            "last_error": snap.last_error,
+            "last_error_at": snap.last_error_at,
+            # per-course failures from the last round (those courses kept old tasks)
+            "course_errors": dict(getattr(self.fetch, "last_errors", {})),
+            # Canvas client's circuit breaker / rate-limit throttle (CourseIngest fetchers)
+            "client": self.fetch.client_status() if hasattr(self.fetch, "client_status") else None,
+            "running": self.running,
+        }
+
+    # ---------- writes ---------- #
+
+    def refresh_now(self):
+        """Fetch from Canvas and publish a new snapshot. Returns True on success."""
+        if self.is_async:
+            job = self.refresh_job()
+            try:
+                return job.result()
+            finally:
+                self.release_job(job)
+
+        seen = self._refreshes
+        with self._refresh_lock:
+            if self._refreshes != seen:
+                # a refresh finished while we waited for the lock: share it
+                return self._last_ok
+            self._last_ok = self._refresh()
+            self._refreshes += 1
+            return self._last_ok
+
+    def _refresh(self):
+        self._last_attempt = time.time()
+        try:
+            with stage("canvas_fetch"):
+                tasks = self.fetch()
+        except Exception as e:
+            self._record_error(e)
+            return False
+
+        # Incremental fetchers report their own delta; otherwise diff by content
+        self.replace(tasks, getattr(self.fetch, "last_delta", None), fetched=True)
+        return True
+
+    def _record_error(self, e):
+        print("Error refreshing Canvas snapshot:", e)
+        with self._lock:
+            self._snapshot = self._snapshot._with(last_error=str(e), last_error_at=time.time())
+
+    # ---------- async fetchers (canvas_async.AsyncCourseIngest) ---------- #
+
+    @property
+    def is_async(self):
+        return hasattr(self.fetch, "fetch_async")
+
+    def refresh_job(self):
+        """
+        The refresh in flight (one is started on the fetcher's loop if
+        none is), as a concurrent Future resolving to True/False. Every
+        caller must hand it back with release_job() when done waiting.
+        """
+        with self._job_lock:
+            if self._job is None or self._job.done():
+                self._job = self.fetch.loop.submit(self._refresh_async())
+                self._job_waiters = 0
+            self._job_waiters += 1
+            return self._job
+
+    def release_job(self, job):
+        """Stop waiting on `job`; when nobody is left waiting, it is cancelled."""
+        with self._job_lock:
+            if job is not self._job:
+                return
+            self._job_waiters -= 1
+            if self._job_waiters <= 0 and not job.done():
+                job.cancel()
+
+    async def _refresh_async(self):
+        self._last_attempt = time.time()
+        try:
+            with stage("canvas_fetch"):
+                tasks = await self.fetch.fetch_async()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._record_error(e)
+            return False
+        # listeners take user write locks: keep that off the Canvas loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.replace(tasks, getattr(self.fetch, "last_delta", None), fetched=True))
+        return True
+
+    def replace(self, tasks, delta=None, fetched=False):
+        """
+        Publish `tasks` as the new snapshot (also used by POST /canvas).
+        The version only moves when something actually changed.
+
+        `fetched` marks a refresh's result. The fetcher's delta is only
+        used while the snapshot is still the one its previous round made;
+        after a POST /canvas the fetched tasks are diffed in full, so
+        whatever was posted gets corrected on the next sync.
+        """
+        tasks = tasks or []
+        with self._lock:
+            old = self._snapshot
+            if delta is None or old.version != self._fetched_version:
+                delta = diff_tasks(old.tasks, tasks)
+            if not delta and old.version:
+                if fetched:
+                    self._fetched_version = old.version
+                self._snapshot = old._with(fetched_at=time.time(), last_error=None, last_error_at=None)
+                return self._snapshot
+            snap = CanvasSnapshot(old.version + 1, to_tasks(tasks, old, delta), time.time(), delta=delta)
+            self._snapshot = snap
+            if fetched:
+                self._fetched_version = snap.version
+
+        for callback in list(self._listeners):
+            try:
+                callback(delta, snap)
+            except Exception as e:
+                print("Error in Canvas sync listener:", e)
+        return snap
+
+    def subscribe(self, callback):
+        """Call callback(delta, snapshot) after each sync that changed something."""
+        self._listeners.append(callback)
+
+    def request_refresh(self):
+        self._wake.set()
+
+    # ---------- worker thread ---------- #
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the worker thread (safe to call many times)."""
+        if self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="canvas-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _next_delay(self):
+        spread = self.interval * self.jitter
+        return max(1.0, self.interval + random.uniform(-spread, spread))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.refresh_now()
+            self._wake.wait(self._next_delay())
+
+
+# Shared worker used by api.py
+canvas_sync = CanvasSync()
@@ -0,0 +1,251 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+# Canvas throttles with a leaky bucket per token: every request adds its
+# X-Request-Cost, the bucket drains over time, and X-Rate-Limit-Remaining
+# says how much room is left. An overflowing request gets 403 "Rate Limit
+# Exceeded" (some proxies in front of Canvas answer 429 instead).
+
+# Below this much remaining budget, slow down
+RATE_LOW_WATER = float(os.getenv("CANVAS_RATE_LOW_WATER", "300"))
+# Budget Canvas gives back per second (used to pace requests when low)
+RATE_LEAK = float(os.getenv("CANVAS_RATE_LEAK", "10"))
+# Longest pause between request starts while pacing
+MAX_PACE = float(os.getenv("CANVAS_MAX_PACE", "5"))
+
+# Retries per request on throttling, 5xx and network errors
+RETRIES = int(os.getenv("CANVAS_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("CANVAS_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("CANVAS_BACKOFF_MAX", "30"))
+
+# Failed requests in a row (after retries) that open the breaker, and how
+# long it stays open before one probe request is let through
+BREAKER_FAILURES = int(os.getenv("CANVAS_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("CANVAS_BREAKER_COOLDOWN", "60"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def is_throttled(status, body=""):
+    return status == 429 or (status == 403 and "rate limit exceeded" in (body or "").lower())
+
+
+def is_retryable(status, body=""):
+    """status None = no response at all (connection error, timeout)."""
+    return status is None or status in RETRY_STATUSES or is_throttled(status, body)
+
+
+def retry_after(headers):
+    """Seconds from a Retry-After header (delta-seconds form only), else None."""
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt, wait_at_least=None):
+    """Exponential backoff with full jitter, never shorter than Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+    return max(delay, wait_at_least or 0.0)
+
+
+def _header_float(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimit:
+    """
+    How many Canvas requests may be in flight, and how soon the next one
+    may start, from what Canvas says about its budget (AIMD, like TCP):
+
+      - plenty of budget left: the limit grows by about one per round of
+        requests, up to max_concurrency;
+      - below RATE_LOW_WATER, or throttled outright: the limit halves
+        (down to 1), and starts are spaced so the bucket can drain, at
+        RATE_LEAK per second.
+
+    Only the bookkeeping; Throttle / AsyncThrottle add the waiting.
+    """
+
+    def __init__(self, max_concurrency, low_water=RATE_LOW_WATER, leak_rate=RATE_LEAK):
+        self.max_concurrency = max_concurrency
+        self.low_water = low_water
+        self.leak_rate = leak_rate
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.remaining = None      # last X-Rate-Limit-Remaining seen
+        self.spacing = 0.0         # seconds between starts while pacing
+        self.not_before = 0.0      # monotonic time the next start has to wait for
+        self.throttled = 0         # 403/429 rate-limit answers seen
+
+    def _wait(self):
+        """0 if a request may start now, else seconds to wait (inf = until a release)."""
+        if self.in_flight >= int(self.limit):
+            return float("inf")
+        return max(0.0, self.not_before - time.monotonic())
+
+    def _started(self):
+        self.in_flight += 1
+        if self.spacing:
+            self.not_before = max(self.not_before, time.monotonic()) + self.spacing
+
+    def _finished(self, status, headers, body=""):
+        self.in_flight -= 1
+        headers = headers or {}
+        remaining = _header_float(headers, "X-Rate-Limit-Remaining")
+        cost = _header_float(headers, "X-Request-Cost") or 1.0
+        if remaining is not None:
+            self.remaining = remaining
+
+        if status is not None and is_throttled(status, body):
+            self.throttled += 1
+            self.limit = max(1.0, self.limit / 2)
+            self.spacing = min(MAX_PACE, max(self.spacing * 2, cost / self.leak_rate))
+            pause = retry_after(headers) or self.spacing
+            self.not_before = max(self.not_before, time.monotonic() + pause)
+        elif remaining is not None and remaining < self.low_water:
+            self.limit = max(1.0, self.limit / 2)
+            # no faster than the bucket drains, so it stops filling up
+            self.spacing = min(MAX_PACE, max(self.spacing, cost / self.leak_rate))
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self.spacing = 0.0
+
+    def status(self):
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "rate_limit_remaining": self.remaining,
+            "spacing_seconds": round(self.spacing, 3),
+            "throttled": self.throttled,
+        }
+
+
+class Throttle(AdaptiveLimit):
+    """AdaptiveLimit for threads: acquire() blocks, release() reports the response."""
+
+    def __init__(self, max_concurrency, **kwargs):
+        super().__init__(max_concurrency, **kwargs)
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self._wait()
+                if wait <= 0:
+                    self._started()
+                    return
+                self._cond.wait(None if wait == float("inf") else wait)
+
+    def release(self, status, headers=None, body=""):
+        with self._cond:
+            self._finished(status, headers, body)
+            self._cond.notify_all()
+
+
+class AsyncThrottle(AdaptiveLimit):
+    """
+    AdaptiveLimit for one event loop: `await acquire()`, then release()
+    (plain call, so it is safe in a finally block of a cancelled task).
+    """
+
+    def __init__(self, max_concurrency, **kwargs):
+        super().__init__(max_concurrency, **kwargs)
+        self._changed = None   # set (and replaced) on every release
+
+    async def acquire(self):
+        while True:
+            wait = self._wait()
+            if wait <= 0:
+                self._started()
+                return
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._changed.wait(), None if wait == float("inf") else wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, status, headers=None, body=""):
+        self._finished(status, headers, body)
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+
+class CircuitBreaker:
+    """
+    Stops calling Canvas once it keeps failing.
+
+    closed    - requests go through; `failures` failed requests in a row open it
+    open      - requests fail at once (no network) for `cooldown` seconds
+    half_open - one probe request goes through: success closes the breaker,
+                failure opens it for another cooldown
+
+    Only outages count as failures (throttling, 5xx, no response); a 404 or
+    401 is Canvas answering, so it counts as a success here.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.time() - self.opened_at < self.cooldown:
+                    return False
+                self.state = "half_open"
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def abandon(self):
+        """A request let through by allow() ended without an answer (cancelled)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.max_failures:
+                if self.state != "open":
+                    self.opens += 1
+                self.state = "open"
+                self.opened_at = time.time()
+            self._probing = False
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through (0 otherwise)."""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.time())
+
+    def status(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opens": self.opens,
+            "retry_in_seconds": round(self.retry_in(), 1),
+        }
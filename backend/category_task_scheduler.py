@@ -1,5 +1,10 @@
 
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+import heapq
+import os
+
+from task_estimation import parse_due
+from task_model import Task
 
 # Lower weight = more important in sorting
 CATEGORY_WEIGHTS = {
@@ -15,7 +20,9 @@ def get_category(task):
     Safely get category string from dict- or object-like task.
     Defaults to 'General' if missing.
     """
-    if isinstance(task, dict):
+    if type(task) is Task:
+        cat = task.category or "General"
+    elif isinstance(task, dict):
         cat = task.get("category") or "General"
     else:
         cat = getattr(task, "category", "General")
@@ -26,6 +33,8 @@ def get_priority(task):
     Priority: 1 = Critical, 2 = High, 3 = Medium, 4 = Low, 5+ = None.
     Defaults to 3 (Medium) if missing/invalid.
     """
+    if type(task) is Task:
+        return task.prio
     try:
         if isinstance(task, dict):
             val = task.get("priority", 3)
@@ -40,7 +49,10 @@ def get_due_date(task):
     Parse due_date as datetime.
     - If missing or invalid: return datetime.max so it goes last.
     - Accepts 'YYYY-MM-DD' or ISO strings, uses first 10 chars.
+    - Task objects already carry it parsed (due_day).
     """
+    if type(task) is Task:
+        return task.due_day
     if isinstance(task, dict):
         due_str = task.get("due_date")
     else:
@@ -67,7 +79,7 @@ def estimate_minutes(task):
         if task has 'points' or 'points_possible', scale up to max 180.
     """
     # Manual override
-    if isinstance(task, dict):
+    if isinstance(task, (dict, Task)):
         est = task.get("estimated_minutes")
         points = task.get("points") or task.get("points_possible")
     else:
@@ -99,6 +111,13 @@ def estimate_minutes(task):
 
     return base
 
+def sort_key(t):
+    """(category weight, due date, priority) - the order sort_tasks() uses."""
+    cat_weight = CATEGORY_WEIGHTS.get(get_category(t), 5)
+    due_dt = get_due_date(t)
+    prio = get_priority(t)
+    return (cat_weight, due_dt, prio)
+
 def sort_tasks(tasks):
     """
     Sort tasks by:
@@ -106,17 +125,231 @@ def sort_tasks(tasks):
       2) due date (earlier first)
       3) priority (1 critical → 5 none)
     """
-    def sort_key(t):
-        cat_weight = CATEGORY_WEIGHTS.get(get_category(t), 5)
-        due_dt = get_due_date(t)
-        prio = get_priority(t)
-        return (cat_weight, due_dt, prio)
-
     return sorted(tasks, key=sort_key)
 
+# ---------- Scheduling engine ---------- #
+
+# Defaults for plan_schedule(); the /summary roadmap uses these as-is
+SCHEDULE_HORIZON_DAYS = int(os.getenv("SCHEDULE_HORIZON_DAYS", "4"))
+SCHEDULE_BLOCK_MINUTES = float(os.getenv("SCHEDULE_BLOCK_MINUTES", "30"))
+SCHEDULE_BREAK_MINUTES = float(os.getenv("SCHEDULE_BREAK_MINUTES", "10"))
+SCHEDULE_DAILY_CAPACITY = float(os.getenv("SCHEDULE_DAILY_CAPACITY", "120"))  # work minutes/day
+SCHEDULE_WINDOWS = os.getenv("SCHEDULE_WINDOWS", "10:00-22:00")               # "HH:MM-HH:MM,..."
+
+# Never start a work block shorter than this at the end of a window
+MIN_BLOCK_MINUTES = 10
+
+
+def parse_windows(spec):
+    """ "09:00-12:00,13:00-17:30" -> [(time(9), time(12)), (time(13), time(17, 30))] """
+    windows = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, end = part.split("-")
+        windows.append((time.fromisoformat(start.strip()), time.fromisoformat(end.strip())))
+    return windows
+
+
+def get_deadline(task):
+    """
+    When the work has to be done by: the due datetime, or the end of the
+    due day for date-only due dates. None if there's no due date.
+    """
+    if type(task) is Task:
+        due = task.due
+    else:
+        due = parse_due(task.get("due_date") if isinstance(task, dict) else getattr(task, "due_date", None))
+    if due is None:
+        return None
+    if not (due.hour or due.minute or due.second or due.microsecond):
+        return due + timedelta(days=1)
+    return due
+
+def edf_key(task):
+    """
+    Earliest-deadline-first order with category weights:
+    (due day, category weight, priority, exact deadline).
+    Same fields as sort_key(), with the due day moved to the front.
+    """
+    deadline = get_deadline(task)
+    cat_weight = CATEGORY_WEIGHTS.get(get_category(task), 5)
+    return (get_due_date(task), cat_weight, get_priority(task), deadline or datetime.max)
+
+def _work_days(start, horizon_days, windows):
+    """Per day of the horizon, the (start, end) datetimes of its working windows after `start`."""
+    days = []
+    for offset in range(horizon_days):
+        day = start.date() + timedelta(days=offset)
+        spans = []
+        for w_start, w_end in windows:
+            s = max(start, datetime.combine(day, w_start))
+            e = datetime.combine(day, w_end) if w_end != time.max else datetime.combine(day + timedelta(days=1), time.min)
+            if e > s:
+                spans.append((s, e))
+        days.append(spans)
+    return days
+
+def plan_start(now, block_minutes=SCHEDULE_BLOCK_MINUTES):
+    """
+    `now` rounded up to the next whole `block_minutes` of the day (21:17 ->
+    21:30 with 30-minute blocks), so a plan made now stays in the future
+    until that time and can be reused until then.
+    """
+    midnight = datetime(now.year, now.month, now.day)
+    step = timedelta(minutes=block_minutes)
+    return midnight + -(-(now - midnight) // step) * step
+
+def plan_schedule(items, start=None, horizon_days=SCHEDULE_HORIZON_DAYS,
+                  block_minutes=SCHEDULE_BLOCK_MINUTES, break_minutes=SCHEDULE_BREAK_MINUTES,
+                  daily_capacity=SCHEDULE_DAILY_CAPACITY, windows=None):
+    """
+    The one scheduler. Places work for `items` ((task, minutes) pairs, e.g.
+    tasks with their PERT expected minutes) into the working windows of the
+    next `horizon_days` days, starting at `start` (default: now).
+
+    - Tasks come off a heap in edf_key() order (earliest deadline first,
+      then category weight and priority); completed tasks are skipped.
+    - Work is cut into blocks of up to `block_minutes`, each followed by a
+      `break_minutes` break, never more than `daily_capacity` work minutes
+      a day, only inside `windows` ([(time, time), ...]; default
+      SCHEDULE_WINDOWS).
+    - A task that can't be finished before its deadline isn't placed at all
+      (so it doesn't eat time other tasks could use) and is reported in
+      "unschedulable". Later tasks still get whatever time is left, so a
+      big task that doesn't fit never crowds out small ones that do.
+    - A task due past the horizon may take the rest of it; tasks after it
+      in EDF order are due even later and are left for a later plan.
+
+    Each task is popped once and its blocks are walked once, so this is
+    O(n log n) plus the number of blocks in the plan.
+
+    Returns {
+        "schedule": [work / break blocks],
+        "unschedulable": [{"task_id", "title", "category", "due_date", "minutes"}],
+        "considered": item indices in the order they were popped,
+        "open": True if every task was considered (so any new one matters),
+        "horizon_end": end of the last planned day,
+    }
+    """
+    start = start or datetime.now()
+    windows = parse_windows(SCHEDULE_WINDOWS) if windows is None else windows
+    days = _work_days(start, horizon_days, windows)
+    horizon_end = datetime.combine(start.date() + timedelta(days=horizon_days), time.min)
+
+    heap = []
+    for i, (task, minutes) in enumerate(items):
+        if task.get("completed"):
+            continue
+        heap.append((edf_key(task), i, task, minutes))
+    heapq.heapify(heap)
+
+    schedule = []
+    unschedulable = []
+    considered = []
+    # where the next block can go: day, window within the day, time, work minutes used that day
+    day, win, cursor, used = 0, 0, start, 0.0
+    full = False            # a task due past the horizon took the rest of it
+    too_big = float("inf")  # fewest minutes that already ran out of horizon
+
+    def report(task, minutes):
+        unschedulable.append({
+            "task_id": task.get("id"),
+            "title": task.get("title") or task.get("name") or "Task",
+            "category": task.get("category") or "General",
+            "due_date": task.get("due_date"),
+            "minutes": round(float(minutes)),
+        })
+
+    while heap:
+        key, i, task, minutes = heapq.heappop(heap)
+        considered.append(i)
+        deadline = key[3] if key[3] != datetime.max else None
+
+        if full:
+            if deadline is None or deadline > horizon_end:
+                break       # everything after this is due past the horizon
+            report(task, minutes)
+            continue
+        due_inside = deadline is not None and deadline <= horizon_end
+        if due_inside and minutes >= too_big:
+            # time left only shrinks, so this can't fit either
+            report(task, minutes)
+            continue
+
+        # walk the blocks this task would take from the current position
+        title = task.get("title") or task.get("name") or "Task"
+        category = task.get("category") or "General"
+        blocks = []
+        state = (day, win, cursor, used)
+        remaining = float(minutes)
+        finish = None
+        while remaining > 0:
+            if day >= len(days):
+                break
+            spans = days[day]
+            if win >= len(spans) or used >= daily_capacity:
+                day, win, used = day + 1, 0, 0.0
+                continue
+            w_start, w_end = spans[win]
+            cursor = max(cursor, w_start)
+            room = min(block_minutes, remaining, daily_capacity - used,
+                       (w_end - cursor).total_seconds() / 60)
+            if room < min(remaining, MIN_BLOCK_MINUTES):
+                win += 1
+                continue
+
+            work_end = cursor + timedelta(minutes=room)
+            break_end = work_end + timedelta(minutes=break_minutes)
+            blocks.append({
+                "type": "work",
+                "task_id": task.get("id"),
+                "title": title,
+                "category": category,
+                "start": cursor.isoformat(),
+                "end": work_end.isoformat(),
+            })
+            blocks.append({
+                "type": "break",
+                "title": "Break",
+                "category": "Break",
+                "start": work_end.isoformat(),
+                "end": break_end.isoformat(),
+            })
+            remaining -= room
+            used += room
+            cursor = break_end
+            finish = work_end
+
+        if remaining > 0:
+            # ran out of horizon part-way through
+            if due_inside:
+                day, win, cursor, used = state
+                too_big = min(too_big, minutes)
+                report(task, minutes)
+            else:
+                full = True
+                schedule.extend(blocks)
+            continue
+
+        if deadline is not None and finish > deadline:
+            day, win, cursor, used = state     # give the time back
+            report(task, minutes)
+            continue
+        schedule.extend(blocks)
+
+    return {
+        "schedule": schedule,
+        "unschedulable": unschedulable,
+        "considered": considered,
+        "open": not heap and not full,
+        "horizon_end": horizon_end,
+    }
+
 def build_schedule(tasks, daily_limit=240, work_block=50, break_block=10, day_start_hour=9):
     """
-    Build a roadmap-like schedule.
+    Build a roadmap-like schedule from the heuristic estimate_minutes() above.
 
     Returns a list of blocks:
       {
@@ -128,98 +361,72 @@ def build_schedule(tasks, daily_limit=240, work_block=50, break_block=10, day_st
         "end": ISO_STRING,
       }
 
-    - Schedules tasks in order of sort_tasks().
-    - Splits work into 50-minute blocks with 10-minute breaks between.
-    - Limits to 'daily_limit' minutes of work per day, then spills into the next day.
+    Same engine as the /summary roadmap (plan_schedule), with 50-minute
+    blocks, 10-minute breaks and up to 'daily_limit' minutes of work per day
+    from 'day_start_hour' on, spilling over as many days as the work takes.
+    A task that can't be finished before its due date is left out (it
+    doesn't push the others back); plan_schedule() lists those in
+    "unschedulable".
     """
-    sorted_tasks = sort_tasks(tasks)
-    schedule = []
-
-    now = datetime.now()
-    current = now.replace(hour=day_start_hour, minute=0, second=0, microsecond=0)
-    if current < now:
-        current = now
-
-    remaining_today = daily_limit
-
-    for task in sorted_tasks:
-        duration = estimate_minutes(task)
-
-        while duration > 0:
-            if remaining_today < work_block:
-                # Move to next day morning
-                current = (current + timedelta(days=1)).replace(
-                    hour=day_start_hour, minute=0, second=0, microsecond=0
-                )
-                remaining_today = daily_limit
-
-            this_block = min(work_block, duration)
-            start = current
-            end = current + timedelta(minutes=this_block)
-
-            schedule.append({
-                "type": "work",
-                "task_id": task.get("id") if isinstance(task, dict) else getattr(task, "id", None),
-                "title": (task.get("title") or task.get("name"))
-                    if isinstance(task, dict)
-                    else (getattr(task, "title", None) or getattr(task, "name", None)),
-                "category": get_category(task),
-                "start": start.isoformat(),
-                "end": end.isoformat(),
-            })
-
-            duration -= this_block
-            current = end
-            remaining_today -= this_block
-
-            # insert a break if this task still has remaining duration
-            if duration > 0 and remaining_today >= break_block:
-                b_start = current
-                b_end = current + timedelta(minutes=break_block)
-                schedule.append({
-                    "type": "break",
-                    "start": b_start.isoformat(),
-                    "end": b_end.isoformat(),
-                })
-                current = b_end
-                remaining_today -= break_block
-
-    return schedule
+    items = [(t, estimate_minutes(t)) for t in tasks]
+    # enough days for all of it: a day holds at least daily_limit minus one
+    # block too short to start, plus what's left of today and a spare day
+    work = sum(minutes for t, minutes in items if not t.get("completed"))
+    horizon_days = int(work // max(daily_limit - MIN_BLOCK_MINUTES, 1)) + 2
+    plan = plan_schedule(
+        items,
+        horizon_days=horizon_days,
+        block_minutes=work_block,
+        break_minutes=break_block,
+        daily_capacity=daily_limit,
+        windows=[(time(day_start_hour), time.max)],
+    )
+    return plan["schedule"]
+
+# Focus points are kept as integer "units" of 1/300 point: minutes, category
+# weight and priority are all ints, so every task is a whole number of
+# units and running totals can be added to / subtracted from exactly.
+FOCUS_UNITS_PER_POINT = 300
+
+def focus_units(task):
+    """
+    One task's focus points, in 1/FOCUS_UNITS_PER_POINT units.
+    Focus points reward doing more urgent + important work.
+    """
+    cat_weight = CATEGORY_WEIGHTS.get(get_category(task), 5)
+    prio = get_priority(task)
+    minutes = estimate_minutes(task)
+
+    # base points: 10 pts per 30 minutes, i.e. minutes / 3 points
+    #   = minutes * 100 units
+    # category importance boost: Assignments > Career > Health > Fun > General
+    #   (6 - cat_weight) * 0.2   -> 0.2..1.0   = 20 units/point each
+    # priority boost: Critical > High > Medium > Low
+    #   (6 - prio) * 0.15        -> 0.15..0.75 = 15 units/point each
+    # pts = base * (1 + importance_boost + priority_boost)
+    return int(minutes) * (100 + 20 * (6 - cat_weight) + 15 * (6 - prio))
+
+def is_completed(task):
+    if isinstance(task, (dict, Task)):
+        return bool(task.get("completed"))
+    return bool(getattr(task, "completed", False))
 
 def compute_focus_points(tasks):
     """
     Focus points reward doing more urgent + important work.
+    The one formula for focus points; /summary keeps the same sums running
+    (see task_summary.TaskAggregates) instead of calling this.
 
     Returns:
       (earned_points, total_points)
     """
-    total = 0.0
-    earned = 0.0
+    total = 0
+    earned = 0
 
     for t in tasks:
-        cat_weight = CATEGORY_WEIGHTS.get(get_category(t), 5)
-        prio = get_priority(t)
-        minutes = estimate_minutes(t)
-
-        # base points: 10 pts per 30 minutes
-        base = (minutes / 30.0) * 10.0
-
-        # category importance boost: Assignments > Career > Health > Fun > General
-        importance_boost = (6 - cat_weight) * 0.2   # 0.2..1.0
-
-        # priority boost: Critical > High > Medium > Low
-        priority_boost = (6 - prio) * 0.15          # 0.15..0.75
-
-        pts = base * (1 + importance_boost + priority_boost)
-        total += pts
-
-        completed = False
-        if isinstance(t, dict):
-            completed = bool(t.get("completed"))
-        else:
-            completed = bool(getattr(t, "completed", False))
-
-        if completed:
-            earned += pts
+        units = focus_units(t)
+        total += units
+        if is_completed(t):
+            earned += units
 
-    return round(earned), round(total)
+    return round(earned / FOCUS_UNITS_PER_POINT), round(total / FOCUS_UNITS_PER_POINT)
@@ -0,0 +1,180 @@
+import os
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from category_task_scheduler import (
+    SCHEDULE_BLOCK_MINUTES,
+    SCHEDULE_BREAK_MINUTES,
+    SCHEDULE_DAILY_CAPACITY,
+    SCHEDULE_WINDOWS,
+    edf_key,
+    get_deadline,
+    parse_windows,
+)
+from metrics import stage
+from task_estimation import estimate_batch
+
+# Trials per /summary/risk request (and the most a request may ask for)
+RISK_TRIALS = int(os.getenv("RISK_TRIALS", "10000"))
+RISK_MAX_TRIALS = int(os.getenv("RISK_MAX_TRIALS", "50000"))
+
+# Tasks simulated (the first N in scheduling order)
+RISK_MAX_TASKS = int(os.getenv("RISK_MAX_TASKS", "500"))
+
+# Samples drawn per chunk (trials x tasks), to keep memory flat
+RISK_CHUNK_SAMPLES = 2_000_000
+
+# Never plan further out than this when building the work calendar
+MAX_CALENDAR_DAYS = 366
+
+SLACK_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def work_calendar(start, total_minutes, block_minutes=SCHEDULE_BLOCK_MINUTES,
+                  break_minutes=SCHEDULE_BREAK_MINUTES, daily_capacity=SCHEDULE_DAILY_CAPACITY,
+                  windows=None):
+    """
+    Piecewise-linear map from wall-clock time to work done, for someone
+    working back to back in the scheduler's blocks from `start`.
+
+    Returns (minutes since start, cumulative work minutes) breakpoint
+    arrays, long enough to fit `total_minutes` of work (or a year).
+    np.interp(t, *calendar) is then the work that fits before time t.
+    """
+    windows = parse_windows(SCHEDULE_WINDOWS) if windows is None else windows
+    xs = [0.0]
+    ys = [0.0]
+    done = 0.0
+    for offset in range(MAX_CALENDAR_DAYS):
+        day = start.date() + timedelta(days=offset)
+        used = 0.0
+        for w_start, w_end in windows:
+            cursor = max(start, datetime.combine(day, w_start))
+            end = (datetime.combine(day + timedelta(days=1), time.min)
+                   if w_end == time.max else datetime.combine(day, w_end))
+            while used < daily_capacity:
+                room = min(block_minutes, daily_capacity - used, (end - cursor).total_seconds() / 60)
+                if room <= 0:
+                    break
+                t0 = (cursor - start).total_seconds() / 60
+                xs.extend((t0, t0 + room))
+                ys.extend((done, done + room))
+                done += room
+                used += room
+                cursor += timedelta(minutes=room + break_minutes)
+        if done >= total_minutes:
+            break
+    return np.array(xs), np.array(ys)
+
+
+def simulate(O, M, P, work_deadlines, trials=RISK_TRIALS, seed=None):
+    """
+    Monte Carlo over a fixed task order.
+
+    O, M, P: PERT optimistic / most likely / pessimistic minutes per task
+    (in the order the tasks get worked on). work_deadlines: work minutes
+    that fit before each task's deadline (inf = no deadline).
+
+    Durations are drawn from the Beta-PERT distribution
+        O + (P - O) * Beta(1 + 4(M - O)/(P - O), 1 + 4(P - M)/(P - O))
+    with Beta sampled as a ratio of two float32 gamma draws, for a whole
+    chunk of trials at once. Finish times are a cumsum along each trial.
+
+    Returns (per-task on-time probability, per-trial worst slack in
+    minutes: how much earlier than needed the tightest deadline was met,
+    negative when something was late; NaN if no task has a deadline).
+    """
+    O = np.asarray(O, dtype=np.float32)
+    M = np.asarray(M, dtype=np.float32)
+    P = np.asarray(P, dtype=np.float32)
+    W = np.asarray(work_deadlines, dtype=np.float32)
+    n = len(O)
+    rng = np.random.default_rng(seed)
+
+    span = P - O
+    flat = span <= 0                       # degenerate: always M
+    safe_span = np.where(flat, 1, span)
+    alpha = (1 + 4 * (M - O) / safe_span).astype(np.float32)
+    beta = (1 + 4 * (P - M) / safe_span).astype(np.float32)
+    has_deadline = np.isfinite(W)
+
+    on_time = np.zeros(n, dtype=np.int64)
+    worst_slack = np.full(trials, np.nan, dtype=np.float32)
+    if n == 0:
+        return on_time.astype(float), worst_slack
+
+    chunk = max(1, RISK_CHUNK_SAMPLES // n)
+    for lo in range(0, trials, chunk):
+        k = min(chunk, trials - lo)
+        ga = rng.standard_gamma(alpha, size=(k, n), dtype=np.float32)
+        gb = rng.standard_gamma(beta, size=(k, n), dtype=np.float32)
+        durations = O + span * (ga / (ga + gb))
+        durations[:, flat] = M[flat]
+
+        finish = np.cumsum(durations, axis=1)
+        slack = W - finish
+        on_time += (slack >= 0).sum(axis=0)
+        if has_deadline.any():
+            worst_slack[lo:lo + k] = slack[:, has_deadline].min(axis=1)
+
+    return on_time / trials, worst_slack
+
+
+def deadline_risk(tasks, now=None, trials=RISK_TRIALS, max_tasks=RISK_MAX_TASKS, seed=None):
+    """
+    Deadline risk for the upcoming, not completed tasks, worked on in
+    scheduling order (edf_key) from `now` in the scheduler's work blocks.
+
+    Returns {
+        "trials", "tasks_simulated",
+        "p_all_on_time": share of trials where every deadline was met,
+        "slack_minutes": {"p5": ..., ...} of the per-trial worst slack,
+        "tasks": [{"task_id", "origin", "title", "category", "due_date",
+                   "expected_minutes", "p_on_time"}, ...],
+    }
+    """
+    now = now or datetime.now()
+    todo = sorted((t for t in tasks if not t.completed), key=edf_key)[:max_tasks]
+
+    pert = estimate_batch(todo, now)
+    calendar = work_calendar(now, float(pert["pessimistic"].sum()))
+    work_deadlines = np.full(len(todo), np.inf)
+    for i, t in enumerate(todo):
+        deadline = get_deadline(t)
+        if deadline is not None:
+            minutes = (deadline - now).total_seconds() / 60
+            work_deadlines[i] = np.interp(minutes, *calendar)
+
+    with stage("risk_simulation"):
+        p_on_time, worst_slack = simulate(
+            pert["optimistic"], pert["most_likely"], pert["pessimistic"],
+            work_deadlines, trials=trials, seed=seed,
+        )
+
+    if np.isnan(worst_slack).all():
+        slack = {f"p{q}": None for q in SLACK_PERCENTILES}
+        p_all = 1.0
+    else:
+        values = np.percentile(worst_slack, SLACK_PERCENTILES)
+        slack = {f"p{q}": round(float(v), 1) for q, v in zip(SLACK_PERCENTILES, values)}
+        p_all = float((worst_slack >= 0).mean())
+
+    return {
+        "trials": trials,
+        "tasks_simulated": len(todo),
+        "p_all_on_time": round(p_all, 4),
+        "slack_minutes": slack,
+        "tasks": [
+            {
+                "task_id": t.id,
+                "origin": t.origin,
+                "title": t.title or "Task",
+                "category": t.category or "General",
+                "due_date": t.due_date,
+                "expected_minutes": round(float(e), 1),
+                "p_on_time": round(float(p), 4),
+            }
+            for t, e, p in zip(todo, pert["expected"], p_on_time)
+        ],
+    }
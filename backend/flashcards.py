@@ -0,0 +1,331 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Port of app/api/flashcards/generate/route.js that works line by line as
+# the note arrives, so a note of any size is read once and never held in
+# memory as a whole.
+
+# Bump when the rules below change (cached cards are keyed on it)
+FLASHCARD_RULES_VERSION = 1
+
+# Bullet points per "List key points" card before another card is started
+MAX_POINTS = int(os.getenv("FLASHCARD_MAX_POINTS", "50"))
+
+# Characters kept of a single line (the rest of an endless line is skipped)
+MAX_LINE = int(os.getenv("FLASHCARD_MAX_LINE", "65536"))
+
+# Memory for cached cards, all notes together, and the most one note may use
+CACHE_BYTES = int(os.getenv("FLASHCARD_CACHE_MB", "128")) * 2 ** 20
+CACHE_ENTRY_BYTES = int(os.getenv("FLASHCARD_CACHE_ENTRY_MB", "16")) * 2 ** 20
+
+# Characters of the note used when no rule produced a card
+FALLBACK_CHARS = 200
+
+# NDJSON is sent in pieces of about this many bytes (every piece costs a
+# write / an ASGI message, so not one per card); the first card goes alone
+OUT_CHUNK = 16 * 1024
+
+# ---------- rules ---------- #
+
+HEADING_RE = re.compile(r"#{1,6}\s*")              # "# Title", "### Title"
+TITLE_LINE_RE = re.compile(r"[A-Z][A-Za-z\s&]+")   # "Cell Biology", "Supply & Demand"
+IS_RE = re.compile(r" is ", re.IGNORECASE)
+VERSUS_RE = re.compile(r"\b(?:vs|versus)\b", re.IGNORECASE | re.ASCII)
+BECAUSE_RE = re.compile(r" because ", re.IGNORECASE)
+# /advantages?| disadvantages?|pros|cons/i comes down to these substrings
+PROS_CONS = ("advantage", "pros", "cons")
+BULLET_RE = re.compile(r"[-•*+]\s*")
+
+
+def read_lines(chunks, max_line=MAX_LINE):
+    """
+    Lines of a note that arrives in chunks (str, or UTF-8 bytes), split
+    on \\n. A \\r before it is left on the line (every rule strips it with
+    the other whitespace, and the no-cards fallback quotes the note as
+    sent). Only one line is held at a time, at most max_line characters.
+    """
+    decode = codecs.getincrementaldecoder("utf-8")(errors="replace").decode
+    partial = ""
+    skipping = False     # in the rest of a line that went over max_line
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = decode(chunk)
+        start = 0
+        while True:
+            end = chunk.find("\n", start)
+            if not skipping:
+                partial += chunk[start:] if end < 0 else chunk[start:end]
+                if len(partial) > max_line:
+                    yield partial[:max_line]
+                    partial, skipping = "", True
+                elif end >= 0:
+                    yield partial
+                    partial = ""
+            if end < 0:
+                break
+            skipping = False
+            start = end + 1
+    if not skipping:
+        yield partial + decode(b"", final=True)
+
+
+def generate_flashcards(lines, title=None):
+    """
+    Yield flashcards ({question, answer, section}) for a note given as
+    lines, as soon as each one is known. The same rules, tried in the same
+    order, as the JS route:
+
+      "# Heading" or a Capitalized Line    starts a section
+      "Something:"                        starts a subsection
+      "term - definition"                 What is term?
+      "X is Y" (under 20 words)           What is X?
+      "A vs B" / "A versus B"             difference between A and B
+      "effect because cause"              Why effect?
+      pros / cons / advantages            List the ...
+      "- point" / "* point" ...           collected into "List key points of"
+      anything else over 60 characters    Summarize: ...
+
+    Unlike the JS route, a long run of bullets is split into cards of
+    MAX_POINTS points, so no card (and no buffer) grows with the note.
+    """
+    section = title or "General"
+    subsection = None
+    points = []
+    head, head_len = [], 0     # start of the note, for the no-cards fallback
+    count = 0
+
+    def card(question, answer):
+        return {"question": question, "answer": answer, "section": subsection or section}
+
+    for line in lines:
+        if head_len < FALLBACK_CHARS:
+            head.append(line)
+            head_len += len(line) + 1
+        text = line.strip()
+        if not text:
+            continue
+
+        # ---------- sections ---------- #
+        heading = HEADING_RE.match(text)
+        if heading or TITLE_LINE_RE.fullmatch(text):
+            if points:
+                yield card(f"List key points of {subsection or section}", ", ".join(points))
+                count += 1
+                points = []
+            section = (text[heading.end():] if heading else text).strip()
+            subsection = None
+            continue
+
+        if text.endswith(":"):
+            if points:
+                yield card(f"List key points of {subsection or section}", ", ".join(points))
+                count += 1
+                points = []
+            subsection = text.replace(":", "", 1).strip()
+            continue
+
+        # case-insensitive tests are substring checks on this (like the
+        # JS route's toLowerCase().includes()); a regex only confirms "vs"
+        lower = text.lower()
+
+        # ---------- definitions ---------- #
+        if " - " in text and not text.startswith("-"):
+            term, definition = text.split(" - ", 2)[:2]
+            yield card(f"What is {term.strip()}?", definition.strip())
+            count += 1
+            continue
+
+        if " is " in lower and text.count(" ") < 19:
+            parts = IS_RE.split(text, 2)
+            yield card(f"What is {parts[0].strip()}?", parts[1].strip())
+            count += 1
+            continue
+
+        # ---------- comparison, cause and effect ---------- #
+        if ("vs" in lower or "versus" in lower) and VERSUS_RE.search(text):
+            a, b = VERSUS_RE.split(text, 1)
+            yield card(f"What is the difference between {a.strip()} and {b.strip()}?",
+                       "Compare their definitions or features.")
+            count += 1
+            continue
+
+        if " because " in lower:
+            parts = BECAUSE_RE.split(text, 2)
+            yield card(f"Why {parts[0].strip()}?", f"Because {parts[1].strip()}")
+            count += 1
+            continue
+
+        if any(word in lower for word in PROS_CONS):
+            yield card(f"List the {text}", "Summarize the pros and cons mentioned in the section.")
+            count += 1
+            continue
+
+        # ---------- bullets and paragraphs ---------- #
+        bullet = BULLET_RE.match(text)
+        if bullet:
+            points.append(text[bullet.end():].strip())
+            if len(points) >= MAX_POINTS:
+                yield card(f"List key points of {subsection or section}", ", ".join(points))
+                count += 1
+                points = []
+            continue
+
+        if len(text) > 60:
+            yield card(f"Summarize: {' '.join(text.split(' ')[:5])}....", text)
+            count += 1
+
+    if points:
+        yield card(f"List key points of {subsection or section}", ", ".join(points))
+        count += 1
+
+    if count == 0:
+        yield {"question": "Summarize this note:", "answer": "\n".join(head)[:FALLBACK_CHARS],
+               "section": section}
+
+
+# ---------- cache ---------- #
+
+def note_hasher(title):
+    """sha256 to feed a note's content into; the digest is its cache key."""
+    return hashlib.sha256(f"{FLASHCARD_RULES_VERSION}\0{title or ''}\0".encode())
+
+
+def note_hash(title, content):
+    h = note_hasher(title)
+    h.update(content.encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+class FlashcardCache:
+    """
+    LRU of generated cards (each already JSON-encoded) by note hash,
+    bounded by the bytes they take. Notes whose cards go over
+    CACHE_ENTRY_BYTES aren't kept.
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES, max_entry=CACHE_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry = max_entry
+        self._entries = OrderedDict()   # hash -> (encoded cards, bytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, cards, size):
+        if size > self.max_entry:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (cards, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.bytes -= dropped
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "notes": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+flashcard_cache = FlashcardCache()
+
+
+# ---------- output ---------- #
+
+def encode_card(card):
+    return json.dumps(card, ensure_ascii=False).encode()
+
+
+def _hashed(chunks, hasher):
+    for chunk in chunks:
+        hasher.update(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8", "surrogatepass"))
+        yield chunk
+
+
+def _cards(chunks, title, key):
+    """
+    (encoded cards as they're made, function giving the note's hash once
+    they're all out). Pass `key` if the hash is already known, else the
+    note is hashed on the way through.
+    """
+    if key is not None:
+        return (encode_card(c) for c in generate_flashcards(read_lines(chunks), title)), lambda: key
+    hasher = note_hasher(title)
+    cards = generate_flashcards(read_lines(_hashed(chunks, hasher)), title)
+    return (encode_card(c) for c in cards), hasher.hexdigest
+
+
+def done_line(key, count, cached):
+    return encode_card({"done": True, "count": count, "hash": key, "cached": cached}) + b"\n"
+
+
+def stream_ndjson(chunks, title=None, key=None):
+    """
+    NDJSON for a note arriving in `chunks`: one card per line, sent in
+    OUT_CHUNK pieces as they're made, then done_line(). The cards are
+    cached once the note has been read to the end (unless they took more
+    than CACHE_ENTRY_BYTES, in which case they stop being held on to).
+    """
+    cards, digest = _cards(chunks, title, key)
+    kept, size, count = [], 0, 0
+    pending, pending_size = [], 0
+    for data in cards:
+        count += 1
+        if kept is not None:
+            size += len(data)
+            if size > flashcard_cache.max_entry:
+                kept = None     # too big to cache; stop holding on to it
+            else:
+                kept.append(data)
+        pending.append(data)
+        pending_size += len(data) + 1
+        if count == 1 or pending_size >= OUT_CHUNK:
+            yield b"".join(c + b"\n" for c in pending)
+            pending, pending_size = [], 0
+    key = digest()
+    if kept is not None:
+        flashcard_cache.put(key, kept, size)
+    yield b"".join(c + b"\n" for c in pending) + done_line(key, count, False)
+
+
+def collect_cards(chunks, title=None, key=None):
+    """(note hash, encoded cards) for the whole note, cached like stream_ndjson()."""
+    cards, digest = _cards(chunks, title, key)
+    cards = list(cards)
+    key = digest()
+    flashcard_cache.put(key, cards, sum(len(c) for c in cards))
+    return key, cards
+
+
+def ndjson_body(key, cards):
+    """The NDJSON answer for cards that came from the cache."""
+    return b"".join(c + b"\n" for c in cards) + done_line(key, len(cards), True)
+
+
+def json_body(cards):
+    """{"success": true, "flashcards": [...]}, the JS route's answer."""
+    return b'{"success": true, "flashcards": [' + b", ".join(cards) + b"]}"
@@ -0,0 +1,103 @@
+import re
+from collections import deque
+
+# Same tokenizer estimate_minutes has always used
+TOKEN_RE = re.compile(r"[a-zA-Z]+")
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick automaton over word tokens, built once from the keyword rules.
+
+    Working on tokens instead of characters gives word boundaries for free
+    ("call" never matches inside "recall", "phone call" never inside
+    "microphone call") and lets one pass over the text find every phrase and
+    every single-word rule at the same time, however many rules there are.
+
+    match(text) keeps the old estimate_minutes() semantics:
+      - a phrase rule counts once if it appears anywhere,
+      - a single-word rule counts once per occurrence,
+      - phrases come first (in rule order), then words (in text order).
+    """
+
+    def __init__(self, rules):
+        # Node 0 is the root. _goto[node] maps token -> child node.
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]         # node -> [(rule index, is_phrase), ...] ending here
+        self.infos = []          # rule index -> info dict
+
+        word_index = {}          # word -> rule index (last definition wins, like a dict)
+        for key, info in rules:
+            tokens = TOKEN_RE.findall(key.lower())
+            if not tokens:
+                continue
+            is_phrase = " " in key.strip()
+            if not is_phrase and tokens != [key.lower().strip()]:
+                # single "words" with punctuation/digits never matched a token before
+                continue
+
+            idx = len(self.infos)
+            self.infos.append(info)
+            if not is_phrase:
+                if tokens[0] in word_index:
+                    self.infos[word_index[tokens[0]]] = info
+                    self.infos.pop()
+                    continue
+                word_index[tokens[0]] = idx
+
+            node = 0
+            for tok in tokens:
+                nxt = self._goto[node].get(tok)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][tok] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((idx, is_phrase))
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for tok, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(tok, 0)
+                # inherit matches that end at the fallback node (suffix patterns)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def __len__(self):
+        return len(self.infos)
+
+    def match(self, text):
+        """
+        Return (applied rule infos, token count) for already-lowercased text.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        phrases = set()
+        words = []
+        count = 0
+        node = 0
+
+        for tok in TOKEN_RE.findall(text):
+            count += 1
+            while node and tok not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(tok, 0)
+            for idx, is_phrase in out[node]:
+                if is_phrase:
+                    phrases.add(idx)
+                else:
+                    words.append(idx)
+
+        infos = self.infos
+        applied = [infos[i] for i in sorted(phrases)]
+        applied.extend(infos[i] for i in words)
+        return applied, count
@@ -0,0 +1,163 @@
+import bisect
+import contextlib
+import threading
+import time
+
+# Seconds; request latency and the stages inside a request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels: c.inc(status="200")."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels: h.observe(0.12, route="/all")."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}   # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def collect(self):
+        with self._lock:
+            values = sorted((k, list(row)) for k, row in self._values.items())
+        lines = []
+        for key, row in values:
+            running = 0
+            for le, count in zip(self.buckets + (float("inf"),), row):
+                running += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(le))])} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(row[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+
+class Callback:
+    """
+    Value read at scrape time from existing state (cache stats etc.).
+    fn() returns [(labels dict, value), ...]; kind is "gauge" or "counter".
+    """
+
+    def __init__(self, name, help, fn, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+        _registry.append(self)
+
+    def collect(self):
+        lines = []
+        for labels, value in self.fn():
+            if value is None:
+                continue
+            names = tuple(labels)
+            lines.append(f"{self.name}{_labels(names, [labels[n] for n in names])} {_number(value)}")
+        return lines
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    out = []
+    for metric in _registry:
+        try:
+            lines = metric.collect()
+        except Exception as e:
+            print(f"Error collecting metric {metric.name}:", e)
+            continue
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
+
+
+# ---------- app-wide metrics ---------- #
+
+REQUEST_SECONDS = Histogram(
+    "manageable_request_duration_seconds", "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "manageable_stage_duration_seconds", "Time spent in each stage of request handling and sync.",
+    ("stage",), buckets=STAGE_BUCKETS,
+)
+CANVAS_REQUESTS = Counter(
+    "manageable_canvas_requests_total", "Canvas API requests by HTTP status (\"error\" = no response).",
+    ("status",),
+)
+CANVAS_REQUEST_SECONDS = Histogram(
+    "manageable_canvas_request_duration_seconds", "Latency of single Canvas API requests.",
+)
+CANVAS_RETRIES = Counter(
+    "manageable_canvas_retries_total", "Canvas requests retried, by the status that caused it.",
+    ("status",),
+)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Time the block into manageable_stage_duration_seconds{stage=name}."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=name)
@@ -0,0 +1,153 @@
+import gc
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+# Compiled keyword rules (rule dicts + KeywordMatcher automaton) are pickled
+# here, one file per rules file, so a restart or a new worker process loads
+# them in one read instead of parsing JSON and rebuilding the automaton.
+# Only this app writes these files; don't point it at a shared directory.
+RULE_CACHE_DIR = os.getenv("KEYWORD_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".rule_cache"))
+
+# Seconds between checks of the rules file for edits (0 = no hot reload)
+RULE_WATCH_INTERVAL = float(os.getenv("KEYWORD_WATCH_INTERVAL", "2"))
+
+# Bump when the compiled layout (KeywordMatcher internals, keys of the
+# compiled dict) changes, so old artifacts are rebuilt instead of loaded
+ARTIFACT_VERSION = 1
+
+
+def read_source(path):
+    """
+    (file bytes, fingerprint) for the rules file, or None if it doesn't
+    exist. The fingerprint (mtime, size, sha256) is what an artifact has to
+    match to be reused.
+    """
+    try:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    fingerprint = {
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+    return data, fingerprint
+
+
+def artifact_path(path):
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]
+    return os.path.join(RULE_CACHE_DIR, f"{os.path.basename(path)}.{key}.pickle")
+
+
+def load_artifact(path, fingerprint, salt=""):
+    """
+    The compiled rules saved for `path`, or None when there are none or
+    they were built from another version of the file, of the code, or of
+    `salt` (whatever else went into compiling, e.g. the built-in rules).
+    """
+    # unpickling makes ~100k small dicts and lists; with the cyclic GC
+    # scanning them over and over on the way, loading takes 3x as long
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(artifact_path(path), "rb") as f:
+            artifact = pickle.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable keyword rule cache for {os.path.basename(path)}:", e)
+        return None
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    if (not isinstance(artifact, dict) or artifact.get("version") != ARTIFACT_VERSION
+            or artifact.get("salt") != salt or artifact.get("source") != fingerprint):
+        return None
+    return artifact["compiled"]
+
+
+def save_artifact(path, fingerprint, compiled, salt=""):
+    """Write the compiled rules for `path` (atomically: readers never see half a file)."""
+    target = artifact_path(path)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    artifact = {"version": ARTIFACT_VERSION, "salt": salt, "source": fingerprint,
+                "built_at": time.time(), "compiled": compiled}
+    try:
+        os.makedirs(RULE_CACHE_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(pickle.dumps(artifact, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, target)
+    except OSError as e:
+        print(f"Could not write keyword rule cache for {os.path.basename(path)}:", e)
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+# ---------- hot reload ---------- #
+
+class RuleWatcher:
+    """
+    Polls the rules file every `interval` seconds and calls on_change(path)
+    when its mtime or size changes (or it appears / disappears). One daemon
+    thread; start() is idempotent, so it can sit in a request hook.
+
+    A change is only acted on once the file has held still for one more
+    interval, so an editor still writing it isn't loaded half-way.
+    """
+
+    def __init__(self, path, on_change, interval=RULE_WATCH_INTERVAL):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.reloads = 0
+        self._seen = self._stat()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return self
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="keyword-rules-watcher", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """One poll. Returns True if on_change() ran."""
+        current = self._stat()
+        if current == self._seen:
+            return False
+        # wait for the writer to finish
+        while not self._stop.wait(self.interval):
+            settled = self._stat()
+            if settled == current:
+                break
+            current = settled
+        self._seen = current
+        try:
+            if self.on_change(self.path) is not False:
+                self.reloads += 1
+        except Exception as e:
+            print(f"Error reloading {os.path.basename(self.path)}:", e)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
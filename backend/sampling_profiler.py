@@ -0,0 +1,75 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Off unless PROFILE_ENABLED=1; then a request opts in with the header
+# (whose value must equal PROFILE_TOKEN when one is set).
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "0") == "1"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_HEADER = "X-Profile"
+
+# Seconds between samples, and where the collapsed stacks are written
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(__file__), "profiles"))
+
+
+def requested(header_value):
+    """Should a request with this X-Profile header value be profiled?"""
+    if not PROFILE_ENABLED or not header_value:
+        return False
+    return not PROFILE_TOKEN or header_value == PROFILE_TOKEN
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a
+    helper thread (sys._current_frames), so the profiled code runs
+    untouched: no tracing hooks, and nothing at all when not profiling.
+
+    stop() returns {"file:function;file:function;...": samples}, root
+    first: the collapsed format flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def dump(self, label):
+        """Write the collapsed stacks to PROFILE_DIR; returns the file name."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe = "".join(c if c.isalnum() else "_" for c in label).strip("_") or "request"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}-{os.getpid()}-{self.thread_id}.folded"
+        with open(os.path.join(PROFILE_DIR, name), "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return name
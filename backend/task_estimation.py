@@ -0,0 +1,478 @@
+from collections import OrderedDict
+from datetime import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from keyword_matcher import KeywordMatcher
+from metrics import stage
+from rule_cache import RuleWatcher, load_artifact, read_source, save_artifact
+
+
+# ---------- KEYWORD KNOWLEDGE BASE ---------- #
+
+DEFAULT_KEYWORD_RULES = {
+    "email":        {"minutes": 25, "type": "communication", "weight": 1.0},
+    "emails":       {"minutes": 25, "type": "communication", "weight": 1.0},
+    "call":         {"minutes": 10, "type": "communication", "weight": 1.0},
+    "phone call":   {"minutes": 15, "type": "communication", "weight": 1.2},
+    "meeting":      {"minutes": 30, "type": "communication", "weight": 1.0},
+
+    "homework":     {"minutes": 60, "type": "deep_work", "weight": 1.5},
+    "hw":           {"minutes": 60, "type": "deep_work", "weight": 1.5},
+    "problem set":  {"minutes": 75, "type": "deep_work", "weight": 1.8},
+    "assignment":   {"minutes": 60, "type": "deep_work", "weight": 1.3},
+    "project":      {"minutes": 90, "type": "deep_work", "weight": 2.0},
+    "paper":        {"minutes": 90, "type": "deep_work", "weight": 2.0},
+    "essay":        {"minutes": 90, "type": "deep_work", "weight": 2.0},
+    "report":       {"minutes": 75, "type": "deep_work", "weight": 1.6},
+    "study":        {"minutes": 45, "type": "study",     "weight": 1.2},
+    "reading":      {"minutes": 30, "type": "study",     "weight": 1.0},
+    "review":       {"minutes": 35, "type": "study",     "weight": 1.0},
+
+    "quiz":         {"minutes": 30, "type": "assessment", "weight": 1.2},
+    "exam":         {"minutes": 90, "type": "assessment", "weight": 2.0},
+    "midterm":      {"minutes": 90, "type": "assessment", "weight": 2.0},
+    "final":        {"minutes": 120, "type": "assessment","weight": 2.2},
+
+    "application":  {"minutes": 45, "type": "career",   "weight": 1.5},
+    "apply":        {"minutes": 45, "type": "career",   "weight": 1.5},
+    "resume":       {"minutes": 30, "type": "career",   "weight": 1.2},
+    "cover letter": {"minutes": 60, "type": "career",   "weight": 1.6},
+    "network":      {"minutes": 30, "type": "career",   "weight": 1.2},
+    "linkedin":     {"minutes": 30, "type": "career",   "weight": 1.2},
+
+    "clean":        {"minutes": 20, "type": "life",     "weight": 1.0},
+    "laundry":      {"minutes": 30, "type": "life",     "weight": 1.2},
+    "groceries":    {"minutes": 30, "type": "life",     "weight": 1.0},
+    "workout":      {"minutes": 40, "type": "health",   "weight": 1.2},
+    "exercise":     {"minutes": 40, "type": "health",   "weight": 1.2},
+    "walk":         {"minutes": 20, "type": "health",   "weight": 1.0},
+}
+
+KEYWORD_RULES = {}
+PHRASE_RULES = []
+WORD_RULES = {}
+
+# Compiled matcher for all of the above, rebuilt by load_keyword_rules()
+KEYWORD_MATCHER = KeywordMatcher([])
+
+# Where the rules in use came from (for /stats/cache)
+KEYWORD_RULES_INFO = {}
+
+# Custom rules file (merged over the defaults above)
+KEYWORD_RULES_PATH = os.getenv("KEYWORD_RULES_PATH",
+                               os.path.join(os.path.dirname(__file__), "task_keywords.json"))
+
+# Compiled artifacts depend on the built-in rules too
+_DEFAULTS_HASH = hashlib.sha256(json.dumps(DEFAULT_KEYWORD_RULES, sort_keys=True).encode()).hexdigest()
+
+
+def compile_keyword_rules(user_rules):
+    """Merge custom rules over the defaults and build the matcher for them."""
+    rules = DEFAULT_KEYWORD_RULES.copy()
+    rules.update(user_rules)
+
+    # split into phrases vs single words for faster matching
+    phrase_rules = []
+    word_rules = {}
+    for key, info in rules.items():
+        key_norm = key.lower().strip()
+        if " " in key_norm:
+            phrase_rules.append((key_norm, info))
+        else:
+            word_rules[key_norm] = info
+
+    # one automaton for everything, so matching cost doesn't grow with rule count
+    matcher = KeywordMatcher(
+        [(key, info) for key, info in phrase_rules]
+        + [(key, info) for key, info in word_rules.items() if info]
+    )
+    return {"rules": rules, "phrase_rules": phrase_rules, "word_rules": word_rules,
+            "matcher": matcher, "custom": len(user_rules)}
+
+
+def _read_keyword_rules(path):
+    """
+    (compiled rules, how) for the rules file at `path`: from its compiled
+    artifact when the file is unchanged, else parsed and compiled (and the
+    artifact rewritten). Raises if the file can't be parsed.
+    """
+    source = read_source(path)
+    if source is None:
+        return compile_keyword_rules({}), "missing"
+    data, fingerprint = source
+    compiled = load_artifact(path, fingerprint, _DEFAULTS_HASH)
+    if compiled is not None:
+        return compiled, "cache"
+    user_rules = json.loads(data)
+    if not isinstance(user_rules, dict):
+        raise ValueError("expected a JSON object of keyword -> rule")
+    compiled = compile_keyword_rules(user_rules)
+    save_artifact(path, fingerprint, compiled, _DEFAULTS_HASH)
+    return compiled, "compiled"
+
+
+def _install_keyword_rules(compiled, path, how, seconds):
+    global KEYWORD_RULES, PHRASE_RULES, WORD_RULES, KEYWORD_MATCHER, KEYWORD_RULES_INFO
+
+    # estimate code only ever reads KEYWORD_MATCHER, once per task, so
+    # requests in flight finish with the old rules or the new ones, never a mix
+    KEYWORD_RULES = compiled["rules"]
+    PHRASE_RULES = compiled["phrase_rules"]
+    WORD_RULES = compiled["word_rules"]
+    KEYWORD_MATCHER = compiled["matcher"]
+    KEYWORD_RULES_INFO = {
+        "path": path,
+        "rules": len(KEYWORD_RULES),
+        "custom": compiled["custom"],
+        "source": how,
+        "load_ms": round(seconds * 1000, 1),
+        "loaded_at": time.time(),
+    }
+
+    # cached estimates were computed with the old rules
+    estimate_cache.clear()
+
+
+def load_keyword_rules(path=None):
+    """
+    Load rules from task_keywords.json (or `path`) if it exists.
+    Lets you maintain a giant JSON with 1000+ patterns later: the compiled
+    form is kept next to it (rule_cache.py) and reused while the file is
+    unchanged, so only the first start after an edit pays for compiling.
+    """
+    path = path or KEYWORD_RULES_PATH
+    name = os.path.basename(path)
+    t0 = time.perf_counter()
+
+    try:
+        compiled, how = _read_keyword_rules(path)
+        if how == "missing":
+            print(f"{name} not found, using built-in keyword rules.")
+        else:
+            print(f"Loaded {compiled['custom']} custom keyword rules from {name}"
+                  + (" (compiled cache)" if how == "cache" else ""))
+    except Exception as e:
+        print(f"Error loading {name}, using built-in keyword rules:", e)
+        compiled, how = compile_keyword_rules({}), "error"
+
+    _install_keyword_rules(compiled, path, how, time.perf_counter() - t0)
+
+
+def reload_keyword_rules(path=None):
+    """
+    load_keyword_rules() for a running server: if the file can't be read or
+    parsed (say, saved half-way), the rules in use stay. Returns True when
+    new rules were swapped in.
+    """
+    path = path or KEYWORD_RULES_PATH
+    name = os.path.basename(path)
+    t0 = time.perf_counter()
+    try:
+        compiled, how = _read_keyword_rules(path)
+    except Exception as e:
+        print(f"Error reloading {name}, keeping the current keyword rules:", e)
+        return False
+    _install_keyword_rules(compiled, path, how, time.perf_counter() - t0)
+    print(f"Reloaded keyword rules from {name}: {len(KEYWORD_RULES)} rules")
+    return True
+
+
+_watcher = None
+
+
+def keyword_rules_status():
+    """Where the rules in use came from, and how long loading them took."""
+    return dict(KEYWORD_RULES_INFO, reloads=_watcher.reloads if _watcher is not None else 0)
+
+
+def watch_keyword_rules():
+    """Start hot-reloading KEYWORD_RULES_PATH (see rule_cache.RuleWatcher); idempotent."""
+    global _watcher
+    if _watcher is None:
+        _watcher = RuleWatcher(KEYWORD_RULES_PATH, reload_keyword_rules)
+    return _watcher.start()
+
+
+# ---------- ESTIMATE CACHE ---------- #
+
+# Max number of distinct task contents to remember
+ESTIMATE_CACHE_SIZE = int(os.getenv("ESTIMATE_CACHE_SIZE", "20000"))
+
+# Task fields static_features() reads; anything else can change freely
+ESTIMATE_FIELDS = ("title", "name", "description", "category", "Category", "due_date")
+
+
+class EstimateCache:
+    """
+    LRU cache of static_features() keyed by the task's content.
+
+    The key is the tuple of ESTIMATE_FIELDS values, so an edited task simply
+    misses and gets recomputed, and the entry for its old content is never
+    looked up again: it ages out of the LRU like any other. The cached part
+    (keyword hits, word count, category base, parsed due date) never depends
+    on the clock; urgency is applied afterwards per day, and the final
+    minutes are remembered for the day they were computed on.
+    """
+
+    def __init__(self, maxsize=ESTIMATE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()   # content key -> [features, day ordinal, minutes]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # bumped by clear(): features computed before it are not cached
+        self.generation = 0
+
+    @staticmethod
+    def content_key(task):
+        return tuple(task.get(f) for f in ESTIMATE_FIELDS)
+
+    def entry(self, task):
+        """Cache entry for `task`, computing static_features() on a miss."""
+        key = self.content_key(task)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is None:
+            generation = self.generation
+            entry = [static_features(task), None, None]
+            with self._lock:
+                self.misses += 1
+                if generation != self.generation:
+                    # rules were reloaded while we computed; don't cache old-rule features
+                    return entry
+                self._entries[key] = entry
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return entry
+
+    def features(self, task):
+        return self.entry(task)[0]
+
+    def minutes(self, task, today):
+        """estimate_minutes() for `task` on day `today` (a date)."""
+        entry = self.entry(task)
+        day = today.toordinal()
+        if entry[1] != day:
+            base, _, due = entry[0]
+            if due:
+                base *= urgency_factor((due.date() - today).days)
+            entry[2] = max(10, min(int(round(base)), 180))
+            entry[1] = day
+        return entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+estimate_cache = EstimateCache()
+
+
+load_keyword_rules()
+
+
+def parse_due(due_str):
+    """
+    Parse many date formats into a naive datetime, or None. A trailing "Z"
+    is dropped as before; any other UTC offset ("+05:00") is converted to
+    the server's local time, so every due date compares with every other.
+    """
+    if not due_str:
+        return None
+
+    try:
+        ds = due_str.replace("Z", "")
+        if len(ds) == 10:
+            return datetime.strptime(ds, "%Y-%m-%d")
+        due = datetime.fromisoformat(ds)
+        if due.tzinfo is not None:
+            due = due.astimezone().replace(tzinfo=None)
+        return due
+    except Exception:
+        try:
+            return datetime.strptime(due_str[:10], "%Y-%m-%d")
+        except Exception:
+            return None
+
+
+# Titles with these words get a wider PERT spread
+BIG_WORK_WORDS = ("exam", "midterm", "final", "project", "paper", "essay")
+
+
+def static_features(task):
+    """
+    The part of estimate_minutes() that only changes when the task is edited:
+    (base minutes before urgency, is_big_work, parsed due datetime or None).
+    """
+    title = (task.get("title") or task.get("name") or "").lower()
+    desc = (task.get("description") or "").lower()
+    text = f"{title} {desc}".strip()
+    cat = (task.get("category") or task.get("Category") or "General")
+
+    # -----  Base by category ----- #
+    if cat == "Assignments":
+        base = 60
+    elif cat == "Career":
+        base = 45
+    elif cat in ("Fun", "Health"):
+        base = 25
+    else:
+        base = 30
+
+    # ----- Keyword contributions ----- #
+    #  phrases like "phone call", "problem set" and single words, in one pass
+    applied, word_count = KEYWORD_MATCHER.match(text)
+
+    if applied:
+        
+        num = float(base)
+        den = 1.0
+        for info in applied:
+            m = info.get("minutes", base)
+            w = info.get("weight", 1.0)
+            num += m * w
+            den += w
+        keyword_estimate = num / den
+        base = max(base, keyword_estimate)
+
+    # ----- text complexity adjustment ----- #
+    if word_count > 8:
+        base *= 1.1
+    if word_count > 20:
+        base *= 1.25
+
+    is_big = any(k in title for k in BIG_WORK_WORDS)
+    return base, is_big, parse_due(task.get("due_date"))
+
+
+def urgency_factor(days):
+    """Multiplier for a task due in `days` days (None = no due date)."""
+    if days is None:
+        return 1.0
+    if days <= 1:
+        return 1.5      # due today/tomorrow
+    if days <= 3:
+        return 1.2      # 2–3 days
+    if days >= 10:
+        return 0.8      # far away, less urgent
+    return 1.0
+
+
+def estimate_minutes(task):
+    """
+    Smart, efficient estimate of how long a task should take (in minutes),
+    using:
+      - Category priors
+      - Keyword knowledge base (phrases + words)
+      - Text complexity
+      - Urgency (due date)
+    """
+    # static part comes from the cache; urgency is applied per day on top
+    return estimate_cache.minutes(task, datetime.now().date())
+
+
+def pert_estimate_from_likely(task):
+    """
+    Soft PERT: use estimate_minutes(task) as 'most likely' (M),
+    derive optimistic (O) and pessimistic (P) from M,
+    then compute PERT expected time and std dev.
+
+    E = (O + 4M + P) / 6
+    σ = (P - O) / 6
+    """
+    M = float(estimate_minutes(task))
+    title = (task.get("title") or task.get("name") or "").lower()
+    return pert_from_likely(M, any(k in title for k in BIG_WORK_WORDS))
+
+
+def pert_from_likely(M, is_big):
+    """The PERT numbers for a most-likely estimate of M minutes."""
+    # Wider uncertainty for big/complex work (projects, exams, papers, etc.)
+    if is_big:
+        low_factor = 0.5   # 50% of M
+        high_factor = 2.0  # 200% of M
+    else:
+        low_factor = 0.7   # 70% of M
+        high_factor = 1.5  # 150% of M
+
+    O = max(5.0, low_factor * M)
+    P = min(240.0, high_factor * M)  # cap worst-case at 4 hours
+
+    E = (O + 4 * M + P) / 6.0
+    sigma = (P - O) / 6.0
+
+    return {
+        "optimistic": O,
+        "most_likely": M,
+        "pessimistic": P,
+        "expected": E,
+        "stddev": sigma,
+    }
+
+
+def estimate_batch(tasks, now=None):
+    """
+    Soft PERT for a whole task list at once.
+
+    Text features and due dates are extracted in one pass; the urgency
+    multiplier, rounding/clamping and PERT formulas then run as NumPy array
+    operations. Returns a dict of float arrays (same order as `tasks`):
+    optimistic, most_likely, pessimistic, expected, stddev.
+    Values match pert_estimate_from_likely() task for task.
+    """
+    with stage("estimation"):
+        return _estimate_batch(tasks, now)
+
+
+def _estimate_batch(tasks, now):
+    today = (now or datetime.now()).date()
+    n = len(tasks)
+    base = np.empty(n)
+    big = np.zeros(n, dtype=bool)
+    days = np.full(n, np.nan)
+
+    for i, t in enumerate(tasks):
+        b, is_big, due = estimate_cache.features(t)
+        base[i] = b
+        big[i] = is_big
+        if due:
+            days[i] = (due.date() - today).days
+
+    # NaN (no due date) fails every comparison, so it keeps the 1.0 default
+    with np.errstate(invalid="ignore"):
+        urgency = np.select([days <= 1, days <= 3, days >= 10], [1.5, 1.2, 0.8], 1.0)
+
+    M = np.clip(np.round(base * urgency), 10, 180)
+    O = np.maximum(5.0, np.where(big, 0.5, 0.7) * M)
+    P = np.minimum(240.0, np.where(big, 2.0, 1.5) * M)
+
+    return {
+        "optimistic": O,
+        "most_likely": M,
+        "pessimistic": P,
+        "expected": (O + 4 * M + P) / 6.0,
+        "stddev": (P - O) / 6.0,
+    }
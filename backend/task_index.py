@@ -0,0 +1,263 @@
+import base64
+import itertools
+import json
+import threading
+from datetime import datetime
+
+from sortedcontainers import SortedList
+
+from category_task_scheduler import sort_key
+from metrics import stage
+
+
+class TaskIndex:
+    """
+    Tasks kept permanently in sort_tasks() order.
+
+    Entries are keyed by a uid such as ("manual", 12) or ("canvas", 4411).
+    Each one sits in a SortedList under
+        (sort_key(task), rank, seq)
+    where rank groups sources (manual before Canvas, like combined_tasks())
+    and seq is the order the uid was first inserted. That makes ties come out
+    exactly as Python's stable sort would leave them, so iterating the index
+    gives the same order as sort_tasks() over the tasks in insertion order.
+
+    upsert() and remove() are O(log n); top-k and key-range reads don't
+    touch the rest of the index.
+
+    A second SortedList of (due, uid) answers "when does the next task
+    become past-due", which tells callers how long an "upcoming" view stays
+    valid without scanning anything.
+
+    subscribe(cb) registers cb(uid, task, old_key, new_key), called after
+    every change while the index lock is still held (so callbacks see
+    changes in order and must be quick). task is None for a removal;
+    old_key / new_key are None when the uid wasn't / isn't indexed. clear()
+    calls cb(None, None, None, None).
+    """
+
+    def __init__(self):
+        self._sorted = SortedList()        # (key tuple, uid)
+        self._by_due = SortedList()        # (due datetime, uid) for tasks with a due date
+        self._entries = {}                 # uid -> (key tuple, task, due at insert time)
+        self._seq = itertools.count()
+        self._seqs = {}                    # uid -> first-insert seq
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.version = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, uid):
+        return uid in self._entries
+
+    def get(self, uid):
+        entry = self._entries.get(uid)
+        return entry[1] if entry else None
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, uid, task, old_key, new_key):
+        for cb in self._listeners:
+            try:
+                cb(uid, task, old_key, new_key)
+            except Exception as e:
+                print("Task index listener failed:", e)
+
+    # ---------- writes ---------- #
+
+    def upsert(self, uid, task, rank=0):
+        """Insert or reposition one task."""
+        task_key = self._check(task)
+        with stage("sort"), self._lock:
+            self._upsert(uid, task, rank, task_key)
+            self.version += 1
+
+    def upsert_many(self, items, rank=0):
+        """
+        Insert or reposition many (uid, task) pairs as one change: a single
+        lock hold and a single version bump, so readers see all or none.
+        If any task can't be indexed, none of them are.
+        """
+        checked = [(uid, task, self._check(task)) for uid, task in items]
+        with stage("sort"), self._lock:
+            for uid, task, task_key in checked:
+                self._upsert(uid, task, rank, task_key)
+            self.version += 1
+
+    @staticmethod
+    def _check(task):
+        """
+        sort_key(task), or ValueError if the task can't go in the index,
+        raised before anything is changed.
+        """
+        due = getattr(task, "due", None)
+        if due is not None and due.tzinfo is not None:
+            # would fail comparing against the naive due dates mid-insert
+            raise ValueError(f"due date {due.isoformat()} has a timezone; the index keeps naive local times")
+        return sort_key(task)
+
+    def _upsert(self, uid, task, rank, task_key):
+        seq = self._seqs.get(uid)
+        if seq is None:
+            seq = self._seqs[uid] = next(self._seq)
+        key = (task_key, rank, seq)
+
+        # the stored key/due are what the task had when it was indexed,
+        # so this works even if the caller mutated the same Task object
+        old = self._entries.get(uid)
+        if old is not None:
+            if old[2] is not None:
+                self._by_due.remove((old[2], uid))
+            if old[0] != key:
+                self._sorted.remove((old[0], uid))
+                self._sorted.add((key, uid))
+        else:
+            self._sorted.add((key, uid))
+
+        due = getattr(task, "due", None)
+        self._entries[uid] = (key, task, due)
+        if due is not None:
+            self._by_due.add((due, uid))
+        self._notify(uid, task, old[0] if old else None, key)
+
+    def remove(self, uid):
+        with self._lock:
+            old = self._entries.pop(uid, None)
+            if old is None:
+                return False
+            self._sorted.remove((old[0], uid))
+            if old[2] is not None:
+                self._by_due.remove((old[2], uid))
+            self._seqs.pop(uid, None)
+            self.version += 1
+            self._notify(uid, None, old[0], None)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._sorted.clear()
+            self._by_due.clear()
+            self._entries.clear()
+            self._seqs.clear()
+            self.version += 1
+            self._notify(None, None, None, None)
+
+    # ---------- reads ---------- #
+
+    def __iter__(self):
+        return iter(self.items())
+
+    def items(self, predicate=None):
+        """All tasks in order (optionally filtered)."""
+        with self._lock:
+            tasks = [self._entries[uid][1] for _, uid in self._sorted]
+        if predicate is None:
+            return tasks
+        return [t for t in tasks if predicate(t)]
+
+    def top(self, k, predicate=None):
+        """First k tasks in order that pass `predicate`."""
+        out = []
+        with self._lock:
+            for _, uid in self._sorted:
+                task = self._entries[uid][1]
+                if predicate is None or predicate(task):
+                    out.append(task)
+                    if len(out) >= k:
+                        break
+        return out
+
+    def range(self, min_key=None, max_key=None, inclusive=(True, True)):
+        """
+        Tasks whose sort key (category weight, due date, priority) falls in
+        [min_key, max_key]. Either bound may be None (open).
+        """
+        # Bounds never equal a stored entry: (key,) sorts before every entry
+        # with that key, (key, inf) after all of them.
+        def before(key):
+            return ((tuple(key),),)
+
+        def after(key):
+            return ((tuple(key), float("inf")),)
+
+        lo = None if min_key is None else (before(min_key) if inclusive[0] else after(min_key))
+        hi = None if max_key is None else (after(max_key) if inclusive[1] else before(max_key))
+        with self._lock:
+            return [
+                self._entries[uid][1]
+                for _, uid in self._sorted.irange(lo, hi, inclusive=(True, False))
+            ]
+
+    def page(self, after=None, limit=None, predicate=None):
+        """
+        Up to `limit` tasks (all if None) that come after index key `after`
+        and pass `predicate`. Returns (tasks, key of the last task returned,
+        or None when the end was reached).
+
+        Keys are positions in sort order, not offsets, so a cursor built
+        from one stays valid when tasks are inserted or removed before it.
+        """
+        entries, more = self.page_entries(after, limit, predicate)
+        if not more:
+            return [task for _, _, task in entries], None
+        return [task for _, _, task in entries], entries[-1][0]
+
+    def page_entries(self, after=None, limit=None, predicate=None):
+        """
+        Like page(), but returns ([(key, uid, task), ...], more) where `more`
+        says whether anything past the last entry passes `predicate`.
+        """
+        out = []
+        with self._lock:
+            if after is None:
+                start = 0
+            else:
+                # first entry strictly after `after` (seqs are ints, so +0.5
+                # lands between `after` and anything that follows it)
+                sort_k, rank, seq = after
+                start = self._sorted.bisect_left(((sort_k, rank, seq + 0.5),))
+            for key, uid in self._sorted.islice(start):
+                task = self._entries[uid][1]
+                if predicate is not None and not predicate(task):
+                    continue
+                if limit is not None and len(out) >= limit:
+                    return out, True
+                out.append((key, uid, task))
+        return out, False
+
+    def export(self):
+        """
+        (version, [(key, uid, task), ...] in order, sorted due datetimes),
+        read in one go so the three agree with each other.
+        """
+        with self._lock:
+            entries = [(key, uid, self._entries[uid][1]) for key, uid in self._sorted]
+            return self.version, entries, [due for due, _ in self._by_due]
+
+    def next_due_after(self, now):
+        """Earliest due datetime at or after `now` (None if there isn't one)."""
+        with self._lock:
+            i = self._by_due.bisect_left((now,))
+            return self._by_due[i][0] if i < len(self._by_due) else None
+
+
+# ---------- opaque cursors ---------- #
+
+def encode_cursor(key):
+    """Index key -> URL-safe opaque string."""
+    (cat_weight, due, prio), rank, seq = key
+    raw = json.dumps([cat_weight, due.isoformat(), prio, rank, seq], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); raises ValueError on anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cat_weight, due, prio, rank, seq = json.loads(base64.urlsafe_b64decode(padded))
+        return (int(cat_weight), datetime.fromisoformat(due), int(prio)), int(rank), int(seq)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
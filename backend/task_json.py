@@ -0,0 +1,72 @@
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output
+    orjson = None
+
+# Serialized forms kept per task (the full one plus a few field projections)
+MAX_CACHED_FORMS = 4
+
+# Per-task form lookups by encode_tasks() (for /metrics)
+cache_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def dumps(obj):
+    """
+    Compact JSON bytes with sorted keys (same key order as jsonify()),
+    non-ASCII left as UTF-8. orjson when installed, else the json module.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass  # e.g. ints over 64 bits: let the json module have a go
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+                      default=str).encode()
+
+
+def parse_fields(spec):
+    """`fields=` query value -> tuple of field names (None = every field)."""
+    if not spec:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in spec.split(",") if f.strip()))
+    return fields or None
+
+
+def encode_task(task, fields=None):
+    """
+    One task's JSON bytes, projected to `fields`. The result is kept on the
+    task (Task._json, dropped whenever the task changes), so a task that
+    didn't change since the last response is never encoded again.
+    """
+    forms = task._json
+    if forms is None:
+        forms = task._json = {}
+    out = forms.get(fields)
+    if out is None:
+        data = task.to_dict()
+        if fields is not None:
+            data = {k: data[k] for k in fields if k in data}
+        out = dumps(data)
+        if len(forms) < MAX_CACHED_FORMS:
+            forms[fields] = out
+    return out
+
+
+def encode_tasks(tasks, fields=None):
+    """JSON array bytes for a task list, stitched from the per-task forms."""
+    parts = []
+    misses = 0
+    for t in tasks:
+        out = t._json.get(fields) if t._json is not None else None
+        if out is None:
+            out = encode_task(t, fields)
+            misses += 1
+        parts.append(out)
+    with _stats_lock:
+        cache_stats["hits"] += len(parts) - misses
+        cache_stats["misses"] += misses
+    return b"[" + b",".join(parts) + b"]"
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from task_estimation import parse_due
+
+# JSON key -> slot, for the fields every task may have. "name" and "Category"
+# are older spellings that title / category fall back on.
+FIELDS = ("id", "title", "description", "due_date", "category", "priority", "completed", "origin")
+ALIASES = {"name": "title", "Category": "category"}
+_BIT = {name: 1 << i for i, name in enumerate(FIELDS)}
+
+
+class Task:
+    """
+    Compact task record (manual or Canvas).
+
+    Resolves title/name and category/Category once, and parses the due
+    date once at creation, so sorting, estimating and scheduling never
+    re-parse strings:
+      - title, category: the value sent, or the "name" / "Category" one
+                 when that's empty (like the old `t.get("title") or
+                 t.get("name")` lookups)
+      - due:     full datetime from parse_due(), or None
+      - due_day: midnight of the due date (what sort_tasks() orders by),
+                 or datetime.max when there's no usable date
+      - prio:    priority as an int, 3 (Medium) when missing/invalid
+
+    to_dict() gives back the same JSON shape the API always returned:
+    the keys the source had, with the values it sent. Any other keys
+    ("name", "Category", group_weight, html_url, course_id, ...) are kept
+    in `extra`. get() lets older dict-style code keep working unchanged.
+    """
+
+    __slots__ = FIELDS + ("due", "due_day", "prio", "extra", "_present", "_shadowed", "_json")
+
+    def __init__(self, data=None):
+        self._present = 0
+        self.extra = None
+        self._shadowed = None   # slot -> value sent, where an alias stands in for it
+        self._json = None
+        for name in FIELDS:
+            setattr(self, name, None)
+        self._assign(data or {})
+
+    @classmethod
+    def from_dict(cls, data, origin=None):
+        task = cls(data)
+        if origin is not None and task.origin is None:
+            task.origin = origin
+            task._present |= _BIT["origin"]
+        return task
+
+    def _assign(self, data):
+        self._json = None   # cached serialized forms (task_json) are now stale
+        for key, value in data.items():
+            bit = _BIT.get(key)
+            if bit is None:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+            else:
+                setattr(self, key, value)
+                self._present |= bit
+                if self._shadowed:
+                    self._shadowed.pop(key, None)
+
+        # "name" / "Category" stand in when title / category are empty
+        for alias, slot in ALIASES.items():
+            if self.extra is None or alias not in self.extra:
+                continue
+            if self._shadowed and slot in self._shadowed:
+                sent = self._shadowed.pop(slot)
+            else:
+                sent = getattr(self, slot) if self._present & _BIT[slot] else None
+            setattr(self, slot, sent or self.extra[alias])
+            if sent is not None and not sent:
+                if self._shadowed is None:
+                    self._shadowed = {}
+                self._shadowed[slot] = sent    # still what to_dict() gives back
+
+        due = parse_due(self.due_date) if isinstance(self.due_date, str) else self.due_date
+        self.due = due if isinstance(due, datetime) else None
+        if self.due is None:
+            self.due_day = datetime.max
+        elif self.due.hour or self.due.minute or self.due.second or self.due.microsecond:
+            self.due_day = datetime(self.due.year, self.due.month, self.due.day)
+        else:
+            self.due_day = self.due   # date-only due dates: share the object
+        try:
+            self.prio = int(self.priority if self.priority is not None else 3)
+        except Exception:
+            self.prio = 3
+
+    def update(self, data):
+        """Apply a partial update (PATCH body) and re-derive parsed fields."""
+        self._assign(data)
+
+    def get(self, key, default=None):
+        slot = ALIASES.get(key, key)
+        if slot in _BIT:
+            value = getattr(self, slot)
+            return default if value is None and not (self._present & _BIT[slot]) else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def to_dict(self):
+        out = {name: getattr(self, name) for name in FIELDS if self._present & _BIT[name]}
+        if self._shadowed:
+            out.update(self._shadowed)
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def __repr__(self):
+        return f"Task(id={self.id!r}, title={self.title!r}, origin={self.origin!r})"
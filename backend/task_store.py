@@ -0,0 +1,238 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+
+from task_model import Task
+
+# SQLite file for manual tasks. Use ":memory:" for a throwaway store (tests).
+DB_PATH = os.getenv("MANAGEABLE_DB", os.path.join(os.path.dirname(__file__), "manageable.db"))
+
+# Owner of tasks written before tasks had owners, and of requests that
+# don't say who they're for
+DEFAULT_USER = os.getenv("MANAGEABLE_DEFAULT_USER", "default")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    title       TEXT,
+    due_date    TEXT,               -- as sent by the client
+    due_ts      TEXT,               -- parsed, 'YYYY-MM-DD HH:MM:SS', NULL if none
+    category    TEXT,
+    priority    INTEGER NOT NULL,   -- normalized (Task.prio)
+    completed   INTEGER NOT NULL DEFAULT 0,
+    origin      TEXT NOT NULL DEFAULT 'manual',
+    data        TEXT NOT NULL,      -- full task JSON (without id)
+    user_id     TEXT NOT NULL DEFAULT 'default'
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_due_ts ON tasks (due_ts);
+CREATE INDEX IF NOT EXISTS idx_tasks_category ON tasks (category);
+CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed);
+CREATE INDEX IF NOT EXISTS idx_tasks_origin ON tasks (origin);
+"""
+
+# Databases created before tasks had owners get the column added in place
+MIGRATE_USER_SQL = "ALTER TABLE tasks ADD COLUMN user_id TEXT NOT NULL DEFAULT 'default'"
+USER_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_tasks_user_due ON tasks (user_id, due_ts)"
+
+# Statements are constant strings so sqlite3's per-connection statement
+# cache compiles each one once and reuses it.
+INSERT_SQL = (
+    "INSERT INTO tasks (title, due_date, due_ts, category, priority, completed, origin, data, user_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+UPDATE_SQL = (
+    "UPDATE tasks SET title = ?, due_date = ?, due_ts = ?, category = ?, priority = ?, "
+    "completed = ?, origin = ?, data = ? WHERE id = ? AND user_id = ?"
+)
+SELECT_ONE_SQL = "SELECT id, data FROM tasks WHERE id = ? AND user_id = ?"
+SELECT_ALL_SQL = "SELECT id, data FROM tasks WHERE user_id = ? ORDER BY id"
+SELECT_UPCOMING_SQL = (
+    "SELECT id, data FROM tasks WHERE user_id = ? AND (due_ts IS NULL OR due_ts >= ?) ORDER BY id"
+)
+COUNT_SQL = "SELECT COUNT(*) FROM tasks WHERE user_id = ?"
+DELETE_SQL = "DELETE FROM tasks WHERE id = ? AND user_id = ?"
+
+
+class TaskNotFound(LookupError):
+    """Raised by update_many() when some ids aren't the user's tasks; `ids` lists them."""
+
+    def __init__(self, ids):
+        super().__init__(f"tasks not found: {ids}")
+        self.ids = ids
+
+
+def _due_ts(task):
+    return task.due.strftime("%Y-%m-%d %H:%M:%S") if task.due else None
+
+
+def _row_params(task):
+    data = task.to_dict()
+    data.pop("id", None)
+    return (
+        task.title,
+        task.due_date if isinstance(task.due_date, str) else None,
+        _due_ts(task),
+        task.category,
+        task.prio,
+        1 if task.completed else 0,
+        task.origin or "manual",
+        json.dumps(data, default=str),
+    )
+
+
+def _row_to_task(row):
+    data = json.loads(row[1])
+    data["id"] = row[0]
+    return Task.from_dict(data)
+
+
+class TaskStore:
+    """
+    SQLite-backed store for manual tasks, partitioned by user.
+
+    - Stable AUTOINCREMENT ids (never reused, even after deletes).
+    - Indexed on id (primary key), due date, category, completed and origin,
+      so get/update by id and the upcoming-tasks query don't scan the table.
+    - WAL mode with one connection per thread: readers never wait on the
+      writer. Writes are serialized by a lock.
+    - path=":memory:" gives a private in-memory database for tests: one
+      shared connection, with reads and writes taking turns.
+    - Every method works on one user's tasks (`user`, DEFAULT_USER if not
+      given); ids are unique across users, but a user can't read or change
+      another user's task by id.
+
+    `version` goes up on every write, so callers can tell cheaply whether
+    anything changed.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.version = 0
+
+        if path == ":memory:":
+            self._shared = sqlite3.connect(":memory:", check_same_thread=False)
+            self._read_lock = self._write_lock
+        else:
+            self._shared = None
+            self._read_lock = contextlib.nullcontext()
+
+        conn = self._conn
+        conn.executescript(SCHEMA)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(tasks)")]
+        if "user_id" not in columns:
+            with conn:
+                conn.execute(MIGRATE_USER_SQL)
+        conn.execute(USER_INDEX_SQL)
+
+    @property
+    def _conn(self):
+        if self._shared is not None:
+            return self._shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- reads ---------- #
+
+    def get(self, task_id, user=DEFAULT_USER):
+        with self._read_lock:
+            row = self._conn.execute(SELECT_ONE_SQL, (task_id, user)).fetchone()
+        return _row_to_task(row) if row else None
+
+    def all(self, user=DEFAULT_USER):
+        with self._read_lock:
+            rows = self._conn.execute(SELECT_ALL_SQL, (user,)).fetchall()
+        return [_row_to_task(r) for r in rows]
+
+    def upcoming(self, now, user=DEFAULT_USER):
+        """Tasks with no due date or due at/after `now`."""
+        cutoff = now.strftime("%Y-%m-%d %H:%M:%S")
+        with self._read_lock:
+            rows = self._conn.execute(SELECT_UPCOMING_SQL, (user, cutoff)).fetchall()
+        return [_row_to_task(r) for r in rows]
+
+    def count(self, user=DEFAULT_USER):
+        with self._read_lock:
+            return self._conn.execute(COUNT_SQL, (user,)).fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    # ---------- writes ---------- #
+
+    # on_write(tasks), if given, runs with the written Tasks just before
+    # the transaction commits (the API indexes them there). If it raises,
+    # nothing is stored, so a task is never saved without being indexed.
+
+    def add(self, data, user=DEFAULT_USER, on_write=None):
+        """Insert a task dict (any "id" in it is ignored) and return the stored Task."""
+        return self.add_many([data], user, on_write)[0]
+
+    def add_many(self, items, user=DEFAULT_USER, on_write=None):
+        """Insert task dicts in one transaction; returns the stored Tasks in order."""
+        tasks = []
+        for data in items:
+            data = dict(data)
+            data.pop("id", None)
+            tasks.append(Task.from_dict(data))
+        with self._write_lock:
+            conn = self._conn
+            with conn:
+                ids = [conn.execute(INSERT_SQL, _row_params(task) + (user,)).lastrowid for task in tasks]
+                for task, task_id in zip(tasks, ids):
+                    task.update({"id": task_id})
+                if on_write is not None:
+                    on_write(tasks)
+            self.version += 1
+        return tasks
+
+    def update(self, task_id, data, user=DEFAULT_USER, on_write=None):
+        """Apply a partial update; returns the updated Task, or None if not found."""
+        try:
+            return self.update_many([(task_id, data)], user, on_write)[0]
+        except TaskNotFound:
+            return None
+
+    def update_many(self, changes, user=DEFAULT_USER, on_write=None):
+        """
+        Apply partial updates [(task_id, data), ...] in one transaction and
+        return the updated Tasks in order. If any id isn't one of the
+        user's tasks, nothing is written and TaskNotFound lists them all.
+        """
+        tasks = []
+        missing = []
+        with self._write_lock:
+            conn = self._conn
+            with conn:
+                for task_id, data in changes:
+                    row = conn.execute(SELECT_ONE_SQL, (task_id, user)).fetchone()
+                    if not row:
+                        missing.append(task_id)
+                        continue
+                    task = _row_to_task(row)
+                    task.update({k: v for k, v in data.items() if k != "id"})
+                    conn.execute(UPDATE_SQL, _row_params(task) + (task_id, user))
+                    tasks.append(task)
+                if missing:
+                    raise TaskNotFound(missing)   # rolls the whole batch back
+                if on_write is not None:
+                    on_write(tasks)
+            self.version += 1
+        return tasks
+
+    def delete(self, task_id, user=DEFAULT_USER):
+        with self._write_lock:
+            conn = self._conn
+            with conn:
+                deleted = conn.execute(DELETE_SQL, (task_id, user)).rowcount
+            if deleted:
+                self.version += 1
+        return bool(deleted)
@@ -0,0 +1,356 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sortedcontainers import SortedList
+
+from category_task_scheduler import FOCUS_UNITS_PER_POINT, edf_key, focus_units, plan_schedule, plan_start
+from metrics import stage
+from task_estimation import estimate_batch, estimate_cache
+
+# Seconds between full recounts that check the running aggregates
+RECONCILE_INTERVAL = float(os.getenv("SUMMARY_RECONCILE_INTERVAL", "600"))
+
+
+def is_upcoming(task, now):
+    return not task.due or task.due >= now
+
+
+def upcoming_entries(view, now):
+    """(uid, task) of the upcoming tasks in a TaskView, in order."""
+    return [(uid, task) for _, uid, task in view.iter_upcoming(now)]
+
+
+class TaskAggregates:
+    """
+    Dashboard counters over the upcoming tasks, kept up to date one task at
+    a time so reading them never depends on how many tasks there are:
+      - tasks_total, tasks_completed
+      - focus points, total and earned (compute_focus_points()' formula,
+        summed in exact integer units so adding and removing never drifts)
+      - per-category totals, plus the due dates per category so
+        "next_two_days" is two bisects
+
+    Every insert / update / complete / delete is one apply(): the task's
+    old contribution comes off, the new one goes on. Counters change in
+    O(1); the due-date lists in O(log n). Tasks whose due date passes drop
+    out in expire(), earliest first. reconcile() recounts from scratch and
+    reports (and repairs) anything that had drifted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False      # False until the first rebuild()
+        self._reset()
+
+    def _reset(self):
+        self._rows = {}                 # uid -> (category, due, completed, focus units)
+        self._by_due = SortedList()     # (due, uid) for counted tasks with a due date
+        self._cat_due = {}              # category -> SortedList of due datetimes
+        self.per_category = {}          # category -> count
+        self.tasks_total = 0
+        self.tasks_completed = 0
+        self.focus_total = 0            # focus units
+        self.focus_earned = 0
+
+    def _add(self, uid, task):
+        cat = task.category or "General"
+        due = task.due
+        done = bool(task.completed)
+        units = focus_units(task)
+        self._rows[uid] = (cat, due, done, units)
+        self.tasks_total += 1
+        self.tasks_completed += done
+        self.focus_total += units
+        if done:
+            self.focus_earned += units
+        self.per_category[cat] = self.per_category.get(cat, 0) + 1
+        if due is not None:
+            self._by_due.add((due, uid))
+            self._cat_due.setdefault(cat, SortedList()).add(due)
+
+    def _discard(self, uid):
+        row = self._rows.pop(uid, None)
+        if row is None:
+            return
+        cat, due, done, units = row
+        self.tasks_total -= 1
+        self.tasks_completed -= done
+        self.focus_total -= units
+        if done:
+            self.focus_earned -= units
+        self.per_category[cat] -= 1
+        if not self.per_category[cat]:
+            del self.per_category[cat]
+        if due is not None:
+            self._by_due.remove((due, uid))
+            dues = self._cat_due[cat]
+            dues.remove(due)
+            if not dues:
+                del self._cat_due[cat]
+
+    def rebuild(self, entries):
+        """Recount from scratch from (uid, task) pairs of upcoming tasks."""
+        with self._lock:
+            self._reset()
+            for uid, task in entries:
+                self._add(uid, task)
+            self.ready = True
+
+    def reconcile(self, entries, now):
+        """
+        Recount from (uid, task) pairs of upcoming tasks and compare with the
+        running numbers. Returns the names of the fields that didn't match
+        (empty when all is well); either way the recount is kept.
+        """
+        fresh = TaskAggregates()
+        fresh.rebuild(entries)
+        with self._lock:
+            self._expire(now)
+            mine = self._numbers(now)
+            theirs = fresh._numbers(now)
+            mismatched = [k for k in mine if mine[k] != theirs[k]]
+            if mismatched:
+                for name in ("_rows", "_by_due", "_cat_due", "per_category", "tasks_total",
+                             "tasks_completed", "focus_total", "focus_earned"):
+                    setattr(self, name, getattr(fresh, name))
+            self.ready = True
+            return mismatched
+
+    def apply(self, uid, task, now):
+        """Replace one task's contribution (task=None removes it)."""
+        with self._lock:
+            if not self.ready:
+                return                  # rebuild() will count it
+            self._discard(uid)
+            if task is not None and is_upcoming(task, now):
+                self._add(uid, task)
+
+    def invalidate(self):
+        with self._lock:
+            self.ready = False
+
+    def expire(self, now):
+        """Drop tasks that became past-due since they were counted."""
+        with self._lock:
+            self._expire(now)
+
+    def _expire(self, now):
+        while self._by_due and self._by_due[0][0] < now:
+            self._discard(self._by_due[0][1])
+
+    def _numbers(self, now):
+        two_days = now + timedelta(days=2)
+        per_category = {}
+        for cat, total in self.per_category.items():
+            dues = self._cat_due.get(cat)
+            soon = dues.bisect_right(two_days) - dues.bisect_left(now) if dues else 0
+            per_category[cat] = {"total": total, "next_two_days": soon}
+        return {
+            "tasks_total": self.tasks_total,
+            "tasks_completed": self.tasks_completed,
+            "focus_points_total": round(self.focus_total / FOCUS_UNITS_PER_POINT),
+            "focus_points_earned": round(self.focus_earned / FOCUS_UNITS_PER_POINT),
+            "per_category": per_category,
+        }
+
+    def snapshot(self, now):
+        with self._lock:
+            return self._numbers(now)
+
+
+class SummaryCache:
+    """
+    Memoized /summary for one TaskIndex, computed from TaskViews of it.
+
+    - The whole response is kept under an ETag made of the view version,
+      where the roadmap starts (plan_start(): now, rounded up to the next
+      block), and the next due date (when the upcoming set shrinks). Same
+      tag -> same body, no work at all.
+    - When the tag changes, the stats come from TaskAggregates, which the
+      index keeps current through its change callbacks. Writers recount
+      them from the view they publish when they need it, and check them
+      against a full recount every RECONCILE_INTERVAL seconds.
+    - The roadmap (plan_schedule() over every upcoming task) is rebuilt
+      only when a change can reach it: a task it looked at changed,
+      something landed ahead of the last task it looked at or is due inside
+      its horizon, it didn't fill the horizon, one of its tasks went
+      past-due, or its start time was reached.
+
+    A miss is cached(), then capture() with no write in progress (the
+    caller holds the user's write lock; quick), then build() from what
+    capture() returned once the write lock is free. Hold `lock` across the
+    three.
+    """
+
+    def __init__(self, index, tag=""):
+        self.index = index
+        self.tag = tag
+        self.aggregates = TaskAggregates()
+        self.lock = threading.Lock()
+        self._response = None       # (etag, result)
+        self._roadmap = None        # see _build_roadmap()
+        self._roadmap_dirty = True
+        self.hits = 0
+        self.misses = 0
+        self.aggregate_rebuilds = 0
+        self.roadmap_builds = 0
+        self.reconciliations = 0
+        self.reconcile_mismatches = 0
+        self._reconciled_at = time.monotonic()
+        index.subscribe(self._on_change)
+
+    def _on_change(self, uid, task, old_key, new_key):
+        if uid is None:     # index cleared
+            self.aggregates.invalidate()
+            self._roadmap_dirty = True
+            return
+
+        self.aggregates.apply(uid, task, datetime.now())
+
+        rm = self._roadmap
+        if rm is None or rm["open"] or uid in rm["uids"]:
+            self._roadmap_dirty = True
+        elif task is not None and not task.completed:
+            key = edf_key(task)
+            if key <= rm["frontier"] or key[3] <= rm["horizon_end"]:
+                self._roadmap_dirty = True
+
+    def etag(self, view, now):
+        next_due = view.next_due_after(now)
+        due_part = int(next_due.timestamp()) if next_due else 0
+        # estimate_cache.generation: new keyword rules mean new estimates
+        # plan_start(): the roadmap starts there, so a new one is due when it moves
+        return f"{self.tag}-{view.version}.{estimate_cache.generation}-{plan_start(now):%Y%m%d%H%M}-{due_part}"
+
+    def cached(self, view, now):
+        """The memoized (result, etag) if it is still current for `view` at `now`, else None."""
+        response = self._response
+        if response is not None and response[0] == self.etag(view, now):
+            self.hits += 1
+            return response[1], response[0]
+        return None
+
+    def capture(self, view, now):
+        """
+        What build() needs from the live state besides `view`: the aggregate
+        numbers at `now` and whether a change has reached the roadmap. Only
+        call with no write in progress, so both match `view`.
+        """
+        agg = self.aggregates
+        if not agg.ready:
+            agg.rebuild(upcoming_entries(view, now))
+            self.aggregate_rebuilds += 1
+        agg.expire(now)
+        dirty, self._roadmap_dirty = self._roadmap_dirty, False
+        return {"view": view, "stats": agg.snapshot(now), "roadmap_dirty": dirty}
+
+    def build(self, inputs, now):
+        """(result dict, etag) for /summary at `now` from what capture() returned."""
+        view = inputs["view"]
+        etag = self.etag(view, now)
+        self.misses += 1
+        result = inputs["stats"]
+        result.update(self._roadmap_for(view, now, inputs["roadmap_dirty"]))
+        self._response = (etag, result)
+        return result, etag
+
+    def last(self):
+        """The last (result, etag) handed out, or None."""
+        response = self._response
+        return (response[1], response[0]) if response is not None else None
+
+    # ---------- stats ---------- #
+
+    def after_write(self, view, now=None):
+        """
+        Called by a writer (holding the user's write lock) with the view it
+        just published: recounts the aggregates from it if they need it or
+        are due a reconcile(), so readers never pay for a recount.
+        """
+        now = now or datetime.now()
+        if not self.aggregates.ready:
+            self.aggregates.rebuild(upcoming_entries(view, now))
+            self.aggregate_rebuilds += 1
+        elif time.monotonic() - self._reconciled_at >= RECONCILE_INTERVAL:
+            self.reconcile(now, view)
+
+    def _recount(self, now, apply):
+        # a change landing between reading the index and the recount would
+        # be lost, so go again until the version holds still
+        for _ in range(3):
+            version = self.index.version
+            entries = [(uid, task) for _, uid, task in
+                       self.index.page_entries(predicate=lambda t: is_upcoming(t, now))[0]]
+            result = apply(entries)
+            if self.index.version == version:
+                return result
+        return result
+
+    def reconcile(self, now=None, view=None):
+        """
+        Full recount of the aggregates against `view` (a writer's, with the
+        write lock held) or else the live index. Returns the fields that had
+        drifted (they are repaired either way).
+        """
+        now = now or datetime.now()
+        if view is not None:
+            mismatched = self.aggregates.reconcile(upcoming_entries(view, now), now)
+        else:
+            mismatched = self._recount(now, lambda entries: self.aggregates.reconcile(entries, now))
+        self._reconciled_at = time.monotonic()
+        self.reconciliations += 1
+        if mismatched:
+            self.reconcile_mismatches += 1
+            print("Summary aggregates were out of sync, repaired:", mismatched)
+        return mismatched
+
+    # ---------- roadmap ---------- #
+
+    def _roadmap_for(self, view, now, dirty):
+        start = plan_start(now)
+        rm = self._roadmap
+        if (rm is None or dirty or rm["start"] != start
+                or rm["rules"] != estimate_cache.generation
+                or (rm["min_due"] is not None and rm["min_due"] < now)):
+            # changes that arrive while building mark the new one dirty
+            self._roadmap = None
+            rm = self._build_roadmap(view, start, now)
+            self._roadmap = rm
+            self.roadmap_builds += 1
+        return {"schedule": rm["schedule"], "unschedulable": rm["unschedulable"]}
+
+    def _build_roadmap(self, view, start, now):
+        generation = estimate_cache.generation
+        entries = upcoming_entries(view, now)
+        tasks = [t for _, t in entries]
+        expected = estimate_batch(tasks, now)["expected"].tolist()
+        with stage("schedule"):
+            plan = plan_schedule(list(zip(tasks, expected)), start=start)
+
+        looked_at = [entries[i] for i in plan["considered"]]
+        dues = [t.due for _, t in looked_at if t.due is not None]
+        return {
+            "start": start,
+            "rules": generation,
+            "schedule": plan["schedule"],
+            "unschedulable": plan["unschedulable"],
+            "uids": {uid for uid, _ in looked_at},
+            "frontier": edf_key(looked_at[-1][1]) if looked_at else None,
+            "open": plan["open"],
+            "horizon_end": plan["horizon_end"],
+            "min_due": min(dues) if dues else None,
+        }
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "aggregate_rebuilds": self.aggregate_rebuilds,
+            "reconciliations": self.reconciliations,
+            "reconcile_mismatches": self.reconcile_mismatches,
+            "roadmap_builds": self.roadmap_builds,
+        }
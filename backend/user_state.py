@@ -0,0 +1,363 @@
+import bisect
+import contextlib
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from canvasAPI_utils import CanvasError
+from canvas_sync import CanvasSync
+from metrics import stage
+from task_index import TaskIndex
+from task_store import DEFAULT_USER
+from task_summary import SummaryCache, is_upcoming
+
+# Header naming the user a request is for (no header -> DEFAULT_USER).
+# Nothing checks it: it separates users' state, it doesn't authenticate
+# them, so the API must only be reachable through a frontend or proxy that
+# sets it for the signed-in user.
+USER_HEADER = "X-User"
+MAX_USER_ID = 128
+
+# Users whose state is kept in memory at once. Past that, the least
+# recently seen user idle for USER_IDLE_SECONDS is dropped; if nobody is
+# idle, new users are turned away (TooManyUsers) until someone is.
+MAX_USERS = int(os.getenv("MAX_USER_STATES", "1000"))
+USER_IDLE_SECONDS = float(os.getenv("USER_IDLE_SECONDS", "300"))
+
+# Tie-break rank inside the index: manual tasks before Canvas ones
+MANUAL_RANK = 0
+CANVAS_RANK = 1
+
+
+class TooManyUsers(Exception):
+    """Every user state slot is taken by a user who isn't idle yet."""
+
+
+def _no_canvas_account():
+    raise CanvasError("no Canvas account is linked for this user")
+
+
+class TaskView:
+    """
+    Immutable copy of one user's index at one version, for readers.
+
+    Same reads as TaskIndex (items, page, next_due_after), but over plain
+    tuples, so nothing a writer does afterwards can change what a reader
+    is looking at.
+    """
+
+    __slots__ = ("version", "entries", "keys", "dues")
+
+    def __init__(self, version=-1, entries=(), dues=()):
+        self.version = version
+        self.entries = tuple(entries)           # (key, uid, task) in sort order
+        self.keys = [e[0] for e in self.entries]
+        self.dues = tuple(dues)                 # sorted due datetimes
+
+    def __len__(self):
+        return len(self.entries)
+
+    def items(self, predicate=None):
+        return [t for _, _, t in self.entries if predicate is None or predicate(t)]
+
+    def upcoming(self, now):
+        """Tasks not past-due at `now`, in order."""
+        return [t for _, _, t in self.iter_upcoming(now)]
+
+    def iter_upcoming(self, now, start=0):
+        """
+        (key, uid, task) of the tasks not past-due at `now`, from position
+        `start` on. The order is category, then due day, so each category's
+        past-due tasks sit together at its start: they are skipped with one
+        bisect per category, not looked at one by one.
+        """
+        today = datetime(now.year, now.month, now.day)
+        entries, keys = self.entries, self.keys
+        i, n = start, len(entries)
+        while i < n:
+            entry = entries[i]
+            (cat_weight, due_day, _), _, _ = entry[0]
+            if due_day < today:
+                i = bisect.bisect_left(keys, ((cat_weight, today),), i + 1)
+                continue
+            if is_upcoming(entry[2], now):
+                yield entry
+            i += 1
+
+    def _start(self, after):
+        if after is None:
+            return 0
+        sort_k, rank, seq = after
+        return bisect.bisect_left(self.keys, (sort_k, rank, seq + 0.5))
+
+    def page(self, after=None, limit=None, predicate=None):
+        """Same contract as TaskIndex.page()."""
+        entries = itertools.islice(self.entries, self._start(after), None)
+        if predicate is not None:
+            entries = (e for e in entries if predicate(e[2]))
+        return self._page(entries, limit)
+
+    def upcoming_page(self, now, after=None, limit=None):
+        """page() of the tasks not past-due at `now` (see iter_upcoming())."""
+        return self._page(self.iter_upcoming(now, self._start(after)), limit)
+
+    @staticmethod
+    def _page(entries, limit):
+        out = []
+        last_key = None
+        for key, _, task in entries:
+            if limit is not None and len(out) >= limit:
+                return out, last_key
+            out.append(task)
+            last_key = key
+        return out, None
+
+    def next_due_after(self, now):
+        i = bisect.bisect_left(self.dues, now)
+        return self.dues[i] if i < len(self.dues) else None
+
+
+class UserState:
+    """
+    Everything one user's requests touch: their manual tasks (in the shared
+    store, filtered by user), their Canvas snapshot, their task index,
+    /summary memo and /summary/risk memo.
+
+    - Writes (task routes, Canvas deltas) hold this user's `write_lock` for
+      the whole operation, so other users never wait on them. Before letting
+      go of it, the writer publishes a new TaskView of the index (the O(n)
+      copy is the writer's cost, not a reader's).
+    - Readers get the last published TaskView and never wait: a write in
+      progress isn't visible until it has finished, so they never see half
+      of a Canvas sync or import. A writer reading after its own write
+      always sees it.
+    """
+
+    def __init__(self, user_id, store, canvas, boot_id=""):
+        self.user_id = user_id
+        self.store = store
+        self.canvas = canvas
+        # short, stable per-user part for ETags (user ids may be emails)
+        self.tag = f"{boot_id}{hashlib.sha1(user_id.encode()).hexdigest()[:6]}"
+        self.index = TaskIndex()
+        self.summary = SummaryCache(self.index, self.tag)
+        self.write_lock = threading.RLock()
+        self._writers_waiting = 0   # writers queued for write_lock; readers step aside
+        self._waiting_lock = threading.Lock()
+        self.risk_memo = None       # (key, result) of the last /summary/risk
+        self._ready = False
+        self._canvas_version = 0    # Canvas snapshot version the index holds
+        self._view = TaskView()
+        canvas.subscribe(self._on_canvas_change)
+
+    # ---------- loading ---------- #
+
+    def ensure_ready(self):
+        """Load the index from the store + Canvas snapshot on first use."""
+        if self._ready:
+            return
+        with self.write_lock:
+            if self._ready:
+                return
+            with stage("combine"):
+                manual = [(("manual", t.id), t) for t in self.store.all(self.user_id)]
+                self.index.upsert_many(manual, rank=MANUAL_RANK)
+                snapshot = self.canvas.snapshot()
+                canvas = [(("canvas", t.id), t) for t in snapshot.tasks]
+                self.index.upsert_many(canvas, rank=CANVAS_RANK)
+            self._canvas_version = snapshot.version
+            self._publish()
+            self._ready = True
+
+    def _on_canvas_change(self, delta, snapshot):
+        # only the Canvas tasks that changed move in the index, all under
+        # the write lock so readers see the whole sync or none of it.
+        # Listeners run outside CanvasSync's lock, so two syncs (POST
+        # /canvas and the worker) can arrive out of order: a delta only
+        # applies on top of the version right before it.
+        with self.write_lock:
+            if not self._ready:
+                return  # ensure_ready() will load this snapshot
+            if snapshot.version <= self._canvas_version:
+                return  # a newer snapshot is already in
+            if snapshot.version == self._canvas_version + 1:
+                by_id = snapshot.by_id()
+                for task_id in delta.deleted:
+                    self.index.remove(("canvas", task_id))
+                changed = delta.inserted + delta.updated
+                self.index.upsert_many([(("canvas", i), by_id[i]) for i in changed], rank=CANVAS_RANK)
+            else:
+                self._resync_canvas(snapshot)
+            self._canvas_version = snapshot.version
+            self._publish()
+
+    def _resync_canvas(self, snapshot):
+        """Make the index's Canvas tasks exactly `snapshot`'s (a delta was missed)."""
+        _, entries, _ = self.index.export()
+        by_id = snapshot.by_id()
+        for _, uid, _ in entries:
+            if uid[0] == "canvas" and uid[1] not in by_id:
+                self.index.remove(uid)
+        self.index.upsert_many([(("canvas", t.id), t) for t in snapshot.tasks], rank=CANVAS_RANK)
+
+    # ---------- writes ---------- #
+
+    @contextlib.contextmanager
+    def writing(self):
+        """Hold this user's write lock (and make sure the index is loaded)."""
+        self.ensure_ready()
+        with self._waiting_lock:
+            self._writers_waiting += 1
+        try:
+            self.write_lock.acquire()
+        finally:
+            with self._waiting_lock:
+                self._writers_waiting -= 1
+        try:
+            yield self
+        finally:
+            try:
+                self._publish()
+            finally:
+                self.write_lock.release()
+
+    def _publish(self):
+        """
+        Copy the index into a new TaskView for readers (caller holds
+        write_lock), and let the /summary cache recount from it if needed.
+        """
+        if self._view.version == self.index.version:
+            return
+        with stage("combine"):
+            version, entries, dues = self.index.export()
+            self._view = TaskView(version, entries, dues)
+        self.summary.after_write(self._view)
+
+    # ---------- reads ---------- #
+
+    @contextlib.contextmanager
+    def reading(self):
+        """
+        Yields True when the caller may read the live index consistently
+        (no write in progress; writers wait until the block ends), or False
+        when a write is in progress or queued and the caller should use
+        something already published instead. Readers never hold up a writer
+        that is already waiting.
+        """
+        self.ensure_ready()
+        acquired = not self._writers_waiting and self.write_lock.acquire(blocking=False)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.write_lock.release()
+
+    def view(self):
+        """The TaskView of the last finished write (never waits on one in progress)."""
+        self.ensure_ready()
+        return self._view
+
+    def upcoming(self, now):
+        """Upcoming tasks in sort_tasks() order, from the current view."""
+        return self.view().upcoming(now)
+
+    def summary_result(self, now=None):
+        """
+        /summary (result, etag) for the current view. The live numbers it
+        needs are copied while no write is in progress (quick); the summary
+        and roadmap are then built from that copy with the write lock free.
+        While a write is in progress, or another request is already building
+        the summary, the last result is served as-is.
+        """
+        now = now or datetime.now()
+        self.ensure_ready()
+        summary = self.summary
+        hit = summary.cached(self._view, now)
+        if hit is not None:
+            return hit
+        last = summary.last()
+        if not summary.lock.acquire(blocking=last is None):
+            return last
+        try:
+            hit = summary.cached(self._view, now)
+            if hit is not None:
+                return hit
+            with self.reading() as fresh:
+                inputs = summary.capture(self._view, now) if fresh else None
+            if inputs is None:
+                if last is not None:
+                    return last
+                # nothing computed yet: this once, wait for the writer
+                with self.write_lock:
+                    inputs = summary.capture(self._view, now)
+            return summary.build(inputs, now)
+        finally:
+            summary.lock.release()
+
+
+class UserRegistry:
+    """
+    user id -> UserState, created on first request, at most MAX_USERS.
+
+    The configured Canvas account (the background worker) belongs to
+    `canvas_user`, whose state is never dropped; everyone else starts with
+    an empty Canvas snapshot that POST /canvas can fill. A dropped user's
+    manual tasks are in the store and load again on their next request,
+    but their POST /canvas tasks are gone until the frontend posts them
+    again.
+    """
+
+    def __init__(self, store, canvas_sync, boot_id="", canvas_user=DEFAULT_USER,
+                 max_users=MAX_USERS, idle_seconds=USER_IDLE_SECONDS):
+        self.store = store
+        self.canvas_sync = canvas_sync
+        self.boot_id = boot_id
+        self.canvas_user = canvas_user
+        self.max_users = max_users
+        self.idle_seconds = idle_seconds
+        self._users = OrderedDict()     # user id -> (UserState, last seen), least recent first
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def states(self):
+        return [state for state, _ in list(self._users.values())]
+
+    def get(self, user_id=None):
+        user_id = (user_id or "").strip()[:MAX_USER_ID] or DEFAULT_USER
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                self._users[user_id] = (entry[0], now)
+                self._users.move_to_end(user_id)
+                return entry[0]
+            if user_id == self.canvas_user:
+                canvas = self.canvas_sync
+            else:
+                self._make_room(now)
+                canvas = CanvasSync(fetch=_no_canvas_account)
+            state = UserState(user_id, self.store, canvas, self.boot_id)
+            self._users[user_id] = (state, now)
+            return state
+
+    def _make_room(self, now):
+        """Drop idle users, least recently seen first, until a new one fits."""
+        if len(self._users) < self.max_users:
+            return
+        for user_id, (_, seen) in list(self._users.items()):
+            if now - seen < self.idle_seconds:
+                break       # everyone after this was seen even more recently
+            if user_id == self.canvas_user:
+                continue
+            del self._users[user_id]
+            self.evictions += 1
+            if len(self._users) < self.max_users:
+                return
+        raise TooManyUsers(f"{len(self._users)} users are active; try again later")